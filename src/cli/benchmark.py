@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк скорости конвертации на синтетическом наборе файлов
+Запуск: python src/cli/benchmark.py run -o report.json
+        python src/cli/benchmark.py compare baseline.json report.json
+"""
+
+import sys
+import json
+import argparse
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+import logging
+
+# Добавляем путь к модулям
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.benchmark import (DEFAULT_TOLERANCE, Measurement, compare_reports,
+                            environment_info, generate_corpus, load_manifest)
+from core.log_setup import setup_logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CORPUS_DIR = Path.home() / ".umconverter" / "benchmark_corpus"
+
+# Сценарии: конвертер CLI (MediaConverter) и общий FFmpegConverter GUI и сервиса
+CASES = ['cli_images', 'cli_videos', 'ffmpeg_images', 'ffmpeg_videos']
+
+
+def _output_bytes(directory: Path) -> int:
+    return sum(path.stat().st_size for path in directory.iterdir() if path.is_file())
+
+
+def _run_case(case: str, corpus_dir: Path, quality: int) -> Dict:
+    """
+    Один сценарий в текущем процессе (вызывается в отдельном процессе из run)
+
+    Returns:
+        Dict: Метрики сценария; skipped, если в наборе нет подходящих файлов
+    """
+    manifest = load_manifest(corpus_dir)
+    if manifest is None:
+        raise SystemExit(f"Набор файлов не найден или устарел: {corpus_dir}")
+
+    entries = manifest['images'] if case.endswith('_images') else manifest['videos']
+    if not entries:
+        return {'skipped': True}
+
+    # Сообщения о каждом файле не должны попадать в замер
+    logging.getLogger().setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory(prefix='umc-bench-') as tmp:
+        output_dir = Path(tmp) / 'out'
+        output_dir.mkdir()
+        progress_fps: List[float] = []
+
+        if case.startswith('cli_'):
+            from cli.convert_media import MediaConverter
+
+            input_dir = corpus_dir / Path(entries[0]['path']).parent
+            # Отдельная история скорости, чтобы бенчмарк не менял оценки пользователя
+            converter = MediaConverter(str(input_dir), str(output_dir), quality,
+                                       stats_path=str(Path(tmp) / 'stats.json'))
+            with Measurement() as measurement:
+                if case == 'cli_images':
+                    successful, failed = converter.convert_images()
+                else:
+                    successful, failed = converter.convert_videos()
+        else:
+            from core.ffmpeg_converter import FFmpegConverter
+
+            converter = FFmpegConverter()
+            extension = '.webp' if case == 'ffmpeg_images' else '.webm'
+            successful = failed = 0
+            with Measurement() as measurement:
+                for entry in entries:
+                    last_progress = {}
+                    input_path = corpus_dir / entry['path']
+                    if converter.convert_file(str(input_path), str(output_dir / f"{input_path.stem}{extension}"),
+                                              quality=quality, callback=last_progress.update):
+                        successful += 1
+                    else:
+                        failed += 1
+                    if last_progress.get('fps'):
+                        progress_fps.append(last_progress['fps'])
+
+        metrics = measurement.metrics()
+        metrics['output_bytes'] = _output_bytes(output_dir)
+
+    seconds = max(metrics['seconds'], 1e-9)
+    frames = sum(entry.get('frames', 1) for entry in entries)
+    pixels = sum(entry['width'] * entry['height'] * entry.get('frames', 1) for entry in entries)
+    metrics.update({
+        'files': len(entries),
+        'successful': successful,
+        'failed': failed,
+        'input_bytes': sum(entry['bytes'] for entry in entries),
+        'files_per_s': round(len(entries) / seconds, 3),
+        'pixels_per_s': round(pixels / seconds),
+    })
+    if case.endswith('_videos'):
+        metrics['encode_fps'] = round(frames / seconds, 2)
+        if progress_fps:
+            # Скорость, которую FFmpeg сообщает сам, без запуска процесса и проверки
+            metrics['progress_fps'] = round(sum(progress_fps) / len(progress_fps), 2)
+    if failed:
+        # Скорость с ошибками конвертации сравнивать нельзя
+        metrics['error'] = f"Не сконвертировано файлов: {failed} из {len(entries)}"
+    return metrics
+
+
+def _spawn_case(case: str, corpus_dir: Path, quality: int) -> Dict:
+    """Запуск сценария в новом процессе: пиковая память не зависит от предыдущих сценариев"""
+    cmd = [sys.executable, str(Path(__file__).resolve()), 'case', case,
+           '--corpus', str(corpus_dir), '--quality', str(quality)]
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        logger.error(f"❌ Сценарий {case} завершился с ошибкой: {result.stderr.strip()[-1000:]}")
+        return {'error': result.stderr.strip()[-1000:]}
+    return json.loads(result.stdout)
+
+
+def _print_metrics(cases: Dict):
+    columns = ['files', 'files_per_s', 'pixels_per_s', 'encode_fps', 'peak_rss_mb', 'output_bytes']
+    print(f"{'case':<16}" + ''.join(f"{column:>15}" for column in columns))
+    for case, metrics in cases.items():
+        if metrics.get('skipped'):
+            print(f"{case:<16}{'skipped':>15}")
+            continue
+        if metrics.get('error') and 'files' not in metrics:
+            print(f"{case:<16}{'error':>15}")
+            continue
+        values = ['-' if metrics.get(column) is None else metrics[column] for column in columns]
+        print(f"{case:<16}" + ''.join(f"{value:>15}" for value in values))
+
+
+def command_run(args) -> int:
+    corpus_dir = Path(args.corpus)
+    manifest = generate_corpus(corpus_dir, args.ffmpeg, force=args.regenerate)
+    logger.info(f"📁 Набор: {corpus_dir} ({len(manifest['images'])} изображений, "
+                f"{len(manifest['videos'])} видео)")
+
+    cases = {}
+    for case in args.cases or CASES:
+        runs = []
+        for attempt in range(max(1, args.repeat)):
+            logger.info(f"⏱️ {case}: запуск {attempt + 1}/{max(1, args.repeat)}")
+            metrics = _spawn_case(case, corpus_dir, args.quality)
+            runs.append(metrics)
+            if metrics.get('skipped') or metrics.get('error'):
+                break
+        # Лучший из повторов меньше всего зависит от фоновой нагрузки
+        cases[case] = max(runs, key=lambda metrics: metrics.get('files_per_s', 0))
+
+    report = {
+        'version': 1,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'quality': args.quality,
+        'environment': environment_info(args.ffmpeg),
+        'corpus': {'version': manifest['version'], 'seed': manifest['seed'],
+                   'images': len(manifest['images']), 'videos': len(manifest['videos'])},
+        'cases': cases,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    _print_metrics(cases)
+    for case, metrics in cases.items():
+        if metrics.get('error'):
+            logger.error(f"❌ {case}: {metrics['error']}")
+    logger.info(f"📝 Отчет сохранен: {args.output}")
+    return 1 if any(metrics.get('error') for metrics in cases.values()) else 0
+
+
+def command_compare(args) -> int:
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.current, 'r', encoding='utf-8') as f:
+        current = json.load(f)
+
+    if (baseline.get('environment', {}) != current.get('environment', {})
+            or baseline.get('quality') != current.get('quality')):
+        logger.warning("⚠️ Отчеты получены в разных средах или с разным качеством, сравнение может быть неточным")
+
+    rows = compare_reports(baseline, current, args.tolerance)
+    regressions = 0
+    print(f"{'case':<16}{'metric':<15}{'baseline':>15}{'current':>15}{'change':>10}")
+    for row in rows:
+        if row.get('missing'):
+            print(f"{row['case']:<16}{'(нет в отчете)':<15}")
+            continue
+        if row['metric'] == 'error':
+            regressions += 1
+            print(f"{row['case']:<16}{'error':<15}  ⚠️ {row['current']}")
+            continue
+        mark = '  ⚠️ регрессия' if row['regression'] else ''
+        regressions += row['regression']
+        print(f"{row['case']:<16}{row['metric']:<15}{row['baseline']:>15}{row['current']:>15}"
+              f"{row['change'] * 100:>+9.1f}%{mark}")
+
+    if regressions:
+        logger.error(f"❌ Регрессий: {regressions} (допуск {args.tolerance * 100:.0f}%)")
+        return 1
+    logger.info("✅ Регрессий не найдено")
+    return 0
+
+
+def main():
+    """Главная функция"""
+    parser = argparse.ArgumentParser(description='Бенчмарк скорости конвертации')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    corpus = subparsers.add_parser('corpus', help='Создать набор файлов для бенчмарка')
+    corpus.add_argument('--corpus', default=str(DEFAULT_CORPUS_DIR),
+                        help='Папка набора (по умолчанию ~/.umconverter/benchmark_corpus)')
+    corpus.add_argument('--ffmpeg', default='ffmpeg', help='Путь к FFmpeg для создания видео')
+    corpus.add_argument('--regenerate', action='store_true', help='Пересоздать набор')
+
+    run = subparsers.add_parser('run', help='Запустить бенчмарк и сохранить JSON отчет')
+    run.add_argument('--corpus', default=str(DEFAULT_CORPUS_DIR),
+                     help='Папка набора (по умолчанию ~/.umconverter/benchmark_corpus)')
+    run.add_argument('--ffmpeg', default='ffmpeg', help='Путь к FFmpeg для создания видео')
+    run.add_argument('--regenerate', action='store_true', help='Пересоздать набор перед запуском')
+    run.add_argument('-o', '--output', default='benchmark-report.json',
+                     help='Файл отчета (по умолчанию benchmark-report.json)')
+    run.add_argument('-q', '--quality', type=int, default=80, help='Качество (по умолчанию 80)')
+    run.add_argument('--repeat', type=int, default=1,
+                     help='Повторов каждого сценария, в отчет попадает лучший (по умолчанию 1)')
+    run.add_argument('--case', dest='cases', action='append', choices=CASES,
+                     help='Запустить только этот сценарий (можно несколько раз)')
+
+    compare = subparsers.add_parser('compare', help='Сравнить отчет с базовым')
+    compare.add_argument('baseline', help='Базовый отчет')
+    compare.add_argument('current', help='Новый отчет')
+    compare.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                         help='Допустимое ухудшение метрики, доля (по умолчанию 0.1)')
+
+    case = subparsers.add_parser('case', help=argparse.SUPPRESS)
+    case.add_argument('name', choices=CASES)
+    case.add_argument('--corpus', required=True)
+    case.add_argument('--quality', type=int, default=80)
+
+    args = parser.parse_args()
+    setup_logging()
+
+    if args.command == 'corpus':
+        manifest = generate_corpus(Path(args.corpus), args.ffmpeg, force=args.regenerate)
+        logger.info(f"✅ Набор готов: {len(manifest['images'])} изображений, {len(manifest['videos'])} видео")
+        return
+    if args.command == 'case':
+        print(json.dumps(_run_case(args.name, Path(args.corpus), args.quality)))
+        return
+    if args.command == 'run':
+        sys.exit(command_run(args))
+    sys.exit(command_compare(args))
+
+
+if __name__ == '__main__':
+    main()
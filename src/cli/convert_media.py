@@ -9,23 +9,65 @@ import os
 import sys
 import argparse
 from pathlib import Path
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
 import subprocess
 import logging
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Добавляем путь к модулям
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.crf_search import (DEFAULT_SAMPLE_SECONDS, DEFAULT_SAMPLES, parse_target,
+                              search_crf)
+from core.distributed import SharedJobTable
+from core.ffmpeg_runner import DEFAULT_STALL_TIMEOUT, DEFAULT_TIMEOUT_FACTOR, job_timeout, run_ffmpeg
+from core.folder_watcher import FolderWatcher
+from core.image_quality import (WEBP_MODES, choose_webp_mode, encode_webp, image_statistics,
+                                 near_lossless, search_webp_quality, webp_options)
+from core.job_report import JobMetrics, RunReport
+from core.log_setup import DEFAULT_LOG_DIR, add_logging_arguments, setup_logging_from_args
+from core.media_probe import probe_image, probe_media
+from core.metrics import CONVERSION_METRICS, TextfileExporter, start_metrics_server
+from core.preflight import preflight, validate_file
+from core.profiler import PHASE_JOB, PHASE_REPORT, PHASE_SCAN, RunProfiler, profile_phase
+from core.quarantine import Quarantine
+from core.sharding import (merge_summaries, parse_shard, partition_balanced,
+                           partition_by_hash, write_summary)
+from core.throughput_stats import ThroughputStats, format_duration
+from core.tracing import Tracer, ffmpeg_attributes
 
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('conversion.log'),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
+# Параметры кодирования, по которым группируется статистика скорости
+IMAGE_CODEC = 'webp'
+IMAGE_PRESET = 'method6'
+VIDEO_CODEC = 'libvpx-vp9'
+VIDEO_PRESET = 'good-cpu2'
+VIDEO_SAFE_PRESET = 'realtime-cpu8'
+# CRF видео, если не включен подбор по фрагментам (--per-title)
+VIDEO_CRF = 30
+
+# Оценки по умолчанию, пока история конвертаций пуста
+DEFAULT_IMAGE_RATE = 2.0        # мегапикселей в секунду
+DEFAULT_IMAGE_SIZE_RATIO = 0.3
+DEFAULT_VIDEO_RATE = 0.5        # секунд видео в секунду
+DEFAULT_VIDEO_SIZE_RATIO = 0.5
+
 class MediaConverter:
-    def __init__(self, input_dir: str, output_dir: str = None, quality: int = 80):
+    def __init__(self, input_dir: str, output_dir: str = None, quality: int = 80,
+                 stats_path: str = None, shard: Tuple[int, int] = None,
+                 shard_balance: bool = False,
+                 timeout_factor: float = DEFAULT_TIMEOUT_FACTOR,
+                 stall_timeout: float = DEFAULT_STALL_TIMEOUT,
+                 quarantine_dir: str = None, preflight: bool = True,
+                 report_path: str = None, profiler: RunProfiler = None,
+                 trace_path: str = None, target_ssim: float = None,
+                 per_title: Tuple[str, float] = None, per_title_samples: int = DEFAULT_SAMPLES,
+                 per_title_seconds: float = DEFAULT_SAMPLE_SECONDS,
+                 webp_mode: str = 'lossy'):
         """
         Инициализация конвертера
         
@@ -33,10 +75,55 @@ class MediaConverter:
             input_dir: Папка с исходными файлами
             output_dir: Папка для сохранения конвертированных файлов (по умолчанию та же)
             quality: Качество сжатия (1-100)
+            stats_path: Файл истории скорости конвертации (по умолчанию ~/.umconverter)
+            shard: Обрабатывать только часть файлов (индекс, количество частей)
+            shard_balance: Балансировать части по длительности/размеру вместо хеша пути
+            timeout_factor: Ограничение времени видео: 60с + множитель * длительность (0 - без ограничения)
+            stall_timeout: Завершать FFmpeg, если прогресса нет столько секунд (0 - не следить)
+            quarantine_dir: Папка для файлов, не сконвертированных и в резервном профиле
+            preflight: Отклонять поврежденные файлы до начала конвертации
+            report_path: Файл отчета JSON Lines с замерами каждого задания
+            profiler: Профилировщик фаз поиска, заданий и отчета (--profile)
+            trace_path: Файл трасс заданий OTLP JSON (None - без трассировки)
+            target_ssim: Подбирать качество WebP для каждого изображения по целевому SSIM вместо quality
+            per_title: Подбирать CRF для каждого видео по цели (метрика ssim/psnr, значение)
+            per_title_samples: Количество фрагментов для подбора CRF
+            per_title_seconds: Длина фрагмента (секунды)
+            webp_mode: Режим WebP: lossy, lossless, near-lossless или auto (выбор по изображению)
         """
         self.input_dir = Path(input_dir)
         self.output_dir = Path(output_dir) if output_dir else self.input_dir
         self.quality = quality
+        self.target_ssim = target_ssim
+        self.webp_mode = webp_mode
+        # Режим и подбор качества меняют скорость кодирования, поэтому статистика ведется отдельно
+        self.image_preset = IMAGE_PRESET
+        if webp_mode != 'lossy':
+            self.image_preset += f"-{webp_mode}"
+        if target_ssim:
+            self.image_preset += f"-ssim{target_ssim}"
+        self.per_title = per_title
+        self.per_title_samples = per_title_samples
+        self.per_title_seconds = per_title_seconds
+        # Время подбора CRF входит в статистику скорости, поэтому она тоже ведется отдельно
+        self.video_preset = f"{VIDEO_PRESET}-pertitle" if per_title else VIDEO_PRESET
+        self.stats = ThroughputStats(stats_path)
+        self.shard = shard
+        self.shard_balance = shard_balance
+        self.timeout_factor = timeout_factor
+        self.stall_timeout = stall_timeout
+        self.quarantine = Quarantine(quarantine_dir)
+        self.preflight = preflight
+        self.invalid_count = 0
+        self.report = RunReport(report_path)
+        self.profiler = profiler
+        self.tracer = Tracer(trace_path) if trace_path else None
+        # Для трасс: интервал поиска файлов по типу и момент постановки файла в очередь (time_ns)
+        self._scan_spans: Dict[str, Tuple[int, int, int]] = {}
+        self._enqueued: Dict[Path, int] = {}
+        
+        # Результаты конвертации для итогового отчета
+        self.results = []
         
         # Создаем папку для выходных файлов, если её нет
         self.output_dir.mkdir(parents=True, exist_ok=True)
@@ -50,6 +137,12 @@ class MediaConverter:
         logger.info(f"Конвертер инициализирован:")
         logger.info(f"  Входная папка: {self.input_dir}")
         logger.info(f"  Выходная папка: {self.output_dir}")
+        if self.webp_mode != 'lossy':
+            logger.info(f"  Режим WebP: {self.webp_mode}")
+        if self.target_ssim:
+            logger.info(f"  Качество изображений: по SSIM >= {self.target_ssim}")
+        if self.per_title:
+            logger.info(f"  CRF видео: по {self.per_title[0].upper()} >= {self.per_title[1]}")
         logger.info(f"  Качество: {self.quality}")
 
     def check_dependencies(self) -> bool:
@@ -75,6 +168,13 @@ class MediaConverter:
             logger.error("FFmpeg не установлен. Скачайте с https://ffmpeg.org/")
             return False
         
+        try:
+            # ffprobe нужен для длительности видео (ограничение времени), проверки и подбора CRF
+            subprocess.run(['ffprobe', '-version'], capture_output=True, text=True)
+        except FileNotFoundError:
+            logger.warning("⚠️ ffprobe не найден: длительность видео неизвестна, ограничение времени "
+                           "отключено (остается сторож зависания), проверка файлов упрощена")
+        
         return True
 
     def find_files(self, extensions: set) -> List[Path]:
@@ -83,122 +183,547 @@ class MediaConverter:
         for ext in extensions:
             files.extend(self.input_dir.glob(f"*{ext}"))
             files.extend(self.input_dir.glob(f"*{ext.upper()}"))
+        
+        if self.shard:
+            files = self._select_shard(files)
         return files
 
-    def convert_image_to_webp(self, input_path: Path) -> bool:
+    def _shard_weight(self, input_path: Path) -> Optional[float]:
+        """
+        Вес файла для балансировки шардов: длительность видео или мегапиксели изображения
+        
+        None, если файл не удалось прочитать: такие файлы распределяются по хешу пути
+        """
+        if input_path.suffix.lower() in self.image_formats:
+            info = probe_image(input_path)
+            return info.get('width', 0) * info.get('height', 0) / 1e6 or None
+        # Разовый сбой ffprobe на одном узле изменил бы разбиение только у него - повторяем
+        for _ in range(2):
+            duration = probe_media(input_path).get('duration')
+            if duration:
+                return duration
+        return None
+
+    def _select_shard(self, files: List[Path]) -> List[Path]:
+        """Выбор файлов текущего шарда"""
+        index, count = self.shard
+        if self.shard_balance:
+            return partition_balanced(files, self.input_dir, index, count, self._shard_weight)
+        return partition_by_hash(files, self.input_dir, index, count)
+
+    def convert_image_to_webp(self, input_path: Path, output_path: Path = None,
+                              cancel_event: threading.Event = None) -> bool:
         """
         Конвертация изображения в WebP
         
         Args:
             input_path: Путь к исходному файлу
+            output_path: Путь к результату (по умолчанию в output_dir)
+            cancel_event: Событие отмены; проверяется перед записью результата
             
         Returns:
             bool: True если конвертация успешна
         """
+        metrics = self._start_job(input_path, 'image')
+        output_path = output_path or self.output_path(input_path)
+        success = False
+        error = None
         try:
             from PIL import Image
             
-            # Открываем изображение
-            with Image.open(input_path) as img:
-                # Конвертируем в RGB если нужно
-                if img.mode in ('RGBA', 'LA', 'P'):
-                    # Создаем белый фон для прозрачных изображений
-                    background = Image.new('RGB', img.size, (255, 255, 255))
-                    if img.mode == 'P':
-                        img = img.convert('RGBA')
-                    background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                    img = background
-                elif img.mode != 'RGB':
-                    img = img.convert('RGB')
-                
-                # Формируем имя выходного файла
-                output_path = self.output_dir / f"{input_path.stem}.webp"
-                
-                # Сохраняем в WebP
-                img.save(output_path, 'WEBP', quality=self.quality, method=6)
+            start_time = time.monotonic()
+            
+            # Открываем изображение (читается только заголовок)
+            with metrics.stage('probe', tool='pillow'):
+                img = Image.open(input_path)
+            with img:
+                width, height = img.size
                 
-                # Получаем размеры файлов
-                input_size = input_path.stat().st_size
-                output_size = output_path.stat().st_size
-                compression_ratio = (1 - output_size / input_size) * 100
+                alpha_used = False
+                with metrics.stage('decode'):
+                    img.load()
+                    # Конвертируем в RGB если нужно
+                    if img.mode in ('RGBA', 'LA', 'P'):
+                        # Создаем белый фон для прозрачных изображений
+                        background = Image.new('RGB', img.size, (255, 255, 255))
+                        if img.mode == 'P':
+                            img = img.convert('RGBA')
+                        if img.mode == 'RGBA' and self.webp_mode == 'auto':
+                            alpha_used = img.getchannel('A').getextrema()[0] < 255
+                        background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
+                        img = background
+                    elif img.mode != 'RGB':
+                        img = img.convert('RGB')
                 
-                logger.info(f"✅ {input_path.name} -> {output_path.name}")
-                logger.info(f"   Размер: {input_size / 1024:.1f}KB -> {output_size / 1024:.1f}KB")
-                logger.info(f"   Сжатие: {compression_ratio:.1f}%")
+                # Кодируем в память, чтобы отделить время кодирования от записи на диск
+                with metrics.stage('encode', encoder='pillow') as span:
+                    mode = self.webp_mode
+                    if mode == 'auto':
+                        image_stats = image_statistics(img, alpha_used)
+                        mode = choose_webp_mode(image_stats)
+                        metrics.extra['image_stats'] = image_stats
+                    options = webp_options(mode, width * height / 1e6, self.quality,
+                                           scale_effort=self.webp_mode == 'auto')
+                    metrics.extra.update({'webp_mode': mode, 'webp_method': options['method']})
+                    
+                    if mode == 'lossy' and self.target_ssim:
+                        # Кандидаты кодируются в памяти из уже декодированного исходника
+                        options.pop('quality')
+                        quality, data, score, attempts = search_webp_quality(img, self.target_ssim, **options)
+                        options['quality'] = quality
+                        metrics.extra.update({'webp_quality': quality, 'ssim': round(score, 5),
+                                              'ssim_attempts': attempts})
+                        span.update({'ssim': score, 'ssim.attempts': len(attempts)})
+                    elif mode == 'near-lossless':
+                        data = encode_webp(near_lossless(img), **options)
+                    else:
+                        data = encode_webp(img, **options)
+                    span.update(options, mode=mode)
                 
-                return True
+                if cancel_event is not None and cancel_event.is_set():
+                    error = "отменено"
+                    logger.info(f"⏹️ Конвертация отменена: {input_path.name}")
+                    return False
+                with metrics.stage('write'):
+                    with open(output_path, 'wb') as f:
+                        f.write(data)
+            
+            with metrics.stage('verify'):
+                with Image.open(output_path) as result:
+                    result.verify()
+            
+            # Получаем размеры файлов
+            input_size = input_path.stat().st_size
+            output_size = output_path.stat().st_size
+            compression_ratio = (1 - output_size / input_size) * 100
+            
+            # Сохраняем скорость для последующих оценок
+            self.stats.record(
+                self.stats.make_key(IMAGE_CODEC, width, height, self.image_preset),
+                time.monotonic() - start_time, width * height / 1e6,
+                input_size, output_size
+            )
+            
+            logger.info(
+                f"✅ {input_path.name} -> {output_path.name}: "
+                f"{input_size / 1024:.1f}KB -> {output_size / 1024:.1f}KB, сжатие {compression_ratio:.1f}%",
+                extra={'file': str(input_path), 'bytes_in': input_size, 'bytes_out': output_size}
+            )
+            
+            success = True
+            return True
                 
         except Exception as e:
+            error = str(e)
             logger.error(f"❌ Ошибка конвертации {input_path.name}: {str(e)}")
             return False
+        finally:
+            self._finish_job(metrics, success, output_path, error)
+
+    def _start_job(self, input_path: Path, kind: str) -> JobMetrics:
+        """Начало замеров задания"""
+        CONVERSION_METRICS.job_started(kind)
+        enqueued_ns = self._enqueued.pop(input_path, None)
+        trace = None
+        if self.tracer is not None:
+            trace = self.tracer.start_trace(f"convert {input_path.name}", {
+                'umconverter.input': str(input_path), 'umconverter.kind': kind,
+            })
+            scan = self._scan_spans.get(kind)
+            if scan is not None:
+                trace.add_span('scan', scan[0], scan[1], {'umconverter.scan.files': scan[2]})
+            if enqueued_ns is not None:
+                trace.add_span('queue', enqueued_ns, time.time_ns())
+        return JobMetrics(input_path, kind, trace)
+
+    def _mark_scanned(self, kind: str, start_ns: int, files: List[Path]):
+        """Интервал поиска файлов и постановка найденных файлов в очередь (для трасс)"""
+        if self.tracer is None:
+            return
+        now = time.time_ns()
+        self._scan_spans[kind] = (start_ns, now, len(files))
+        for input_path in files:
+            self._enqueued[input_path] = now
+
+    def _close_reports(self):
+        """Итоги по этапам в лог и закрытие файлов отчета и трасс"""
+        self.report.log_summary()
+        self.report.close()
+        if self.tracer is not None:
+            self.tracer.close()
+
+    def _finish_job(self, metrics: JobMetrics, success: bool, output_path: Path,
+                    error: str = None, fps: float = None):
+        """Запись задания в отчет запуска и метрики"""
+        record = metrics.finish(success, output_path, error)
+        self.report.add(metrics)
+        CONVERSION_METRICS.job_finished(metrics.kind, success, record['wall_seconds'],
+                                        record['bytes_in'], record['bytes_out'], fps)
+
+    def _video_command(self, input_path: Path, output_path: Path, safe_mode: bool = False,
+                       crf: int = VIDEO_CRF) -> List[str]:
+        """
+        Команда FFmpeg для конвертации видео в WebM
+        
+        Args:
+            input_path: Путь к исходному файлу
+            output_path: Путь к выходному файлу
+            safe_mode: Резервный профиль: пропуск поврежденных данных и быстрый пресет
+            crf: Качество VP9 (0-63, чем меньше тем лучше)
+        """
+        cmd = ['ffmpeg']
+        if safe_mode:
+            # Не останавливаемся на поврежденных пакетах
+            cmd.extend(['-fflags', '+genpts+discardcorrupt', '-err_detect', 'ignore_err'])
+        
+        cmd.extend([
+            '-i', str(input_path),
+            '-c:v', 'libvpx-vp9',  # Видеокодек VP9
+            '-c:a', 'libopus',      # Аудиокодек Opus
+            '-crf', str(crf),       # Качество (0-63, чем меньше тем лучше)
+            '-b:v', '0',            # Переменный битрейт
+        ])
+        
+        if safe_mode:
+            cmd.extend(['-deadline', 'realtime', '-cpu-used', '8'])
+        else:
+            cmd.extend([
+                '-deadline', 'good',     # Скорость кодирования
+                '-cpu-used', '2',       # Использование CPU
+            ])
+        
+        cmd.extend([
+            '-auto-alt-ref', '0',   # Отключаем альтернативные ссылки
+            '-f', 'webm',           # Формат вывода
+            '-y',                   # Перезаписывать существующие файлы
+            str(output_path)
+        ])
+        return cmd
 
-    def convert_video_to_webm(self, input_path: Path) -> bool:
+    def convert_video_to_webm(self, input_path: Path, output_path: Path = None,
+                              cancel_event: threading.Event = None) -> bool:
         """
         Конвертация видео в WebM
         
         Args:
             input_path: Путь к исходному файлу
+            output_path: Путь к результату (по умолчанию в output_dir)
+            cancel_event: Событие отмены; при установке процесс FFmpeg завершается
             
         Returns:
             bool: True если конвертация успешна
         """
+        metrics = self._start_job(input_path, 'video')
+        progress = {}
+        output_path = output_path or self.output_path(input_path)
+        success = False
+        error = None
         try:
-            # Формируем имя выходного файла
-            output_path = self.output_dir / f"{input_path.stem}.webm"
+            # Параметры видео нужны для статистики скорости и ограничения времени
+            with metrics.stage('probe', tool='ffprobe'):
+                info = probe_media(input_path)
+            timeout = job_timeout(info.get('duration', 0), self.timeout_factor)
+            crf, search_seconds = self._search_crf(input_path, info.get('duration', 0), metrics)
             
-            # Команда для FFmpeg
-            cmd = [
-                'ffmpeg',
-                '-i', str(input_path),
-                '-c:v', 'libvpx-vp9',  # Видеокодек VP9
-                '-c:a', 'libopus',      # Аудиокодек Opus
-                '-crf', '30',           # Качество (0-63, чем меньше тем лучше)
-                '-b:v', '0',            # Переменный битрейт
-                '-deadline', 'good',     # Скорость кодирования
-                '-cpu-used', '2',       # Использование CPU
-                '-auto-alt-ref', '0',   # Отключаем альтернативные ссылки
-                '-f', 'webm',           # Формат вывода
-                '-y',                   # Перезаписывать существующие файлы
-                str(output_path)
-            ]
-            
-            # Запускаем конвертацию
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
-            if result.returncode == 0:
-                # Получаем размеры файлов
-                input_size = input_path.stat().st_size
-                output_size = output_path.stat().st_size
-                compression_ratio = (1 - output_size / input_size) * 100
+            # Первая попытка - обычный профиль, вторая - резервный
+            # FFmpeg декодирует и кодирует в одном процессе, поэтому оба этапа учитываются в encode
+            for safe_mode in (False, True):
+                cmd = self._video_command(input_path, output_path, safe_mode, crf)
+                ffmpeg_start_ns = time.time_ns()
+                result = run_ffmpeg(cmd, timeout, self.stall_timeout, progress.update, cancel_event)
+                metrics.add_stage('encode', result.elapsed)
+                metrics.add_span('ffmpeg', ffmpeg_start_ns, time.time_ns(),
+                                 dict(ffmpeg_attributes(cmd, result), safe_mode=safe_mode),
+                                 None if result.success else result.error)
+                metrics.add_child_usage(result.cpu_seconds, result.peak_rss_mb)
                 
-                logger.info(f"✅ {input_path.name} -> {output_path.name}")
-                logger.info(f"   Размер: {input_size / 1024 / 1024:.1f}MB -> {output_size / 1024 / 1024:.1f}MB")
-                logger.info(f"   Сжатие: {compression_ratio:.1f}%")
+                if result.success:
+                    break
+                if result.cancelled:
+                    error = result.error
+                    logger.info(f"⏹️ Конвертация отменена: {input_path.name}")
+                    return False
                 
-                return True
+                logger.error(f"❌ Ошибка FFmpeg для {input_path.name} ({result.error}): {result.stderr_tail}")
+                if not safe_mode:
+                    logger.warning(f"🔁 Повтор с резервным профилем: {input_path.name}")
             else:
-                logger.error(f"❌ Ошибка FFmpeg для {input_path.name}: {result.stderr}")
+                error = result.error
+                self.quarantine.add(input_path, result.error, result.stderr_tail)
                 return False
+            
+            with metrics.stage('verify'):
+                output_info = probe_media(output_path)
+            if output_info:
+                metrics.extra['output_duration'] = output_info.get('duration', 0.0)
+            
+            # Получаем размеры файлов
+            input_size = input_path.stat().st_size
+            output_size = output_path.stat().st_size
+            compression_ratio = (1 - output_size / input_size) * 100
+            
+            self.stats.record(
+                self.stats.make_key(VIDEO_CODEC, info.get('width', 0), info.get('height', 0),
+                                    VIDEO_SAFE_PRESET if safe_mode else self.video_preset),
+                result.elapsed + search_seconds, info.get('duration', 0), input_size, output_size
+            )
+            
+            logger.info(
+                f"✅ {input_path.name} -> {output_path.name}: "
+                f"{input_size / 1024 / 1024:.1f}MB -> {output_size / 1024 / 1024:.1f}MB, "
+                f"сжатие {compression_ratio:.1f}%",
+                extra={'file': str(input_path), 'bytes_in': input_size, 'bytes_out': output_size}
+            )
+            
+            success = True
+            return True
                 
         except Exception as e:
+            error = str(e)
             logger.error(f"❌ Ошибка конвертации {input_path.name}: {str(e)}")
             return False
+        finally:
+            self._finish_job(metrics, success, output_path, error, progress.get('fps'))
 
-    def convert_images(self) -> Tuple[int, int]:
-        """Конвертация всех изображений в WebP"""
-        image_files = self.find_files(self.image_formats)
+    def _search_crf(self, input_path: Path, duration: float, metrics: JobMetrics) -> Tuple[int, float]:
+        """
+        Подбор CRF по фрагментам видео (--per-title)
+        
+        Returns:
+            Tuple[int, float]: (CRF, время подбора в секундах); без подбора - VIDEO_CRF
+        """
+        if not self.per_title:
+            return VIDEO_CRF, 0.0
+        
+        metric, target = self.per_title
+        with metrics.stage('search', metric=metric, target=target) as span:
+            search = search_crf(
+                lambda crf, path: self._video_command(input_path, Path(path), crf=crf),
+                str(input_path), '.webm', duration, metric, target,
+                samples=self.per_title_samples, length=self.per_title_seconds,
+                stall_timeout=self.stall_timeout
+            )
+            if search is not None:
+                span.update(crf=search.crf, value=search.value, reached=search.reached)
+        
+        if search is None:
+            logger.warning(f"⚠️ CRF не подобран, используется {VIDEO_CRF}: {input_path.name}")
+            return VIDEO_CRF, 0.0
+        
+        metrics.add_child_usage(search.cpu_seconds, search.peak_rss_mb)
+        metrics.extra.update(search.to_dict())
+        if not search.reached:
+            logger.warning(f"⚠️ {input_path.name}: {metric.upper()} {target} недостижим, CRF {search.crf}")
+        logger.info(f"🎯 {input_path.name}: CRF {search.crf} ({metric.upper()} {search.value:.4f}, "
+                    f"подбор {search.elapsed:.1f}с)", extra={'file': str(input_path)})
+        return search.crf, search.elapsed
+
+    def _preflight(self, files: List[Path]) -> List[Path]:
+        """Отсев поврежденных файлов до постановки в очередь конвертации"""
+        if not self.preflight or not files:
+            return files
+        
+        valid, invalid = preflight(files)
+        for input_path, error in invalid:
+            self.results.append({'input': str(input_path), 'success': False, 'error': error})
+        self.invalid_count += len(invalid)
+        if invalid:
+            logger.warning(f"⛔ Отклонено проверкой: {len(invalid)} из {len(files)}")
+        return valid
+
+    def output_path(self, input_path: Path) -> Path:
+        """Путь к результату конвертации файла"""
+        extension = '.webm' if input_path.suffix.lower() in self.video_formats else '.webp'
+        return self.output_dir / f"{input_path.stem}{extension}"
+
+    def convert_file(self, input_path: Path, output_path: Path = None,
+                     cancel_event: threading.Event = None) -> bool:
+        """
+        Конвертация одного файла в зависимости от его типа
+        
+        Args:
+            input_path: Путь к исходному файлу
+            output_path: Путь к результату (по умолчанию output_path())
+            cancel_event: Событие отмены
+        """
+        if self.preflight:
+            error = validate_file(input_path)
+            if error:
+                logger.warning(f"⛔ Отклонен проверкой: {input_path.name} ({error})")
+                return False
+        
+        suffix = input_path.suffix.lower()
+        if suffix in self.image_formats:
+            with profile_phase(self.profiler, PHASE_JOB, input_path.name):
+                return self.convert_image_to_webp(input_path, output_path, cancel_event)
+        if suffix in self.video_formats:
+            with profile_phase(self.profiler, PHASE_JOB, input_path.name):
+                return self.convert_video_to_webm(input_path, output_path, cancel_event)
+        logger.warning(f"Неподдерживаемый формат: {input_path.name}")
+        return False
+
+    def watch(self, convert_images: bool = True, convert_videos: bool = True,
+              workers: int = 2, settle_seconds: float = 2.0):
+        """
+        Режим службы: конвертация файлов по мере их появления во входной папке
+        
+        Args:
+            convert_images: Конвертировать изображения
+            convert_videos: Конвертировать видео
+            workers: Количество параллельных конвертаций
+            settle_seconds: Сколько размер файла должен быть неизменным перед конвертацией
+        """
+        if not self.check_dependencies():
+            logger.error("❌ Зависимости не найдены. Прерываем конвертацию.")
+            return
+        
+        extensions = set()
+        if convert_images:
+            extensions |= self.image_formats
+        if convert_videos:
+            extensions |= self.video_formats
+        
+        executor = ThreadPoolExecutor(max_workers=max(1, workers))
+        
+        def on_job_done(future):
+            if future.exception() is not None:
+                logger.error(f"❌ Ошибка конвертации: {future.exception()}")
+            self.stats.save()
+        
+        def run_job(input_path: Path) -> bool:
+            CONVERSION_METRICS.queue_depth.dec()
+            return self.convert_file(input_path)
+        
+        def submit(input_path: Path):
+            logger.info(f"📥 Новый файл: {input_path.name}", extra={'file': str(input_path)})
+            CONVERSION_METRICS.queue_depth.inc()
+            if self.tracer is not None:
+                self._enqueued[input_path] = time.time_ns()
+            executor.submit(run_job, input_path).add_done_callback(on_job_done)
+        
+        watcher = FolderWatcher(self.input_dir, extensions, submit, settle_seconds=settle_seconds)
+        try:
+            watcher.run()
+        except KeyboardInterrupt:
+            logger.info("⏹️ Наблюдение остановлено, ожидаем завершения текущих задач...")
+            watcher.stop()
+        finally:
+            executor.shutdown(wait=True)
+            with profile_phase(self.profiler, PHASE_REPORT):
+                self.stats.save()
+                self._close_reports()
+
+    def run_distributed(self, jobs_dir: str, convert_images: bool = True,
+                        convert_videos: bool = True, workers: int = 2,
+                        lease_seconds: float = 300, node_id: str = None):
+        """
+        Распределенный режим: узлы с общей папкой разбирают задания без координатора
         
-        if not image_files:
-            logger.info("Изображения для конвертации не найдены")
-            return 0, 0
+        Args:
+            jobs_dir: Общая папка таблицы заданий (на той же файловой системе у всех узлов)
+            convert_images: Конвертировать изображения
+            convert_videos: Конвертировать видео
+            workers: Количество параллельных конвертаций на этом узле
+            lease_seconds: Срок аренды задания; аренды упавших узлов перехватываются
+            node_id: Идентификатор узла
+        """
+        if not self.check_dependencies():
+            logger.error("❌ Зависимости не найдены. Прерываем конвертацию.")
+            return
         
-        logger.info(f"Найдено {len(image_files)} изображений для конвертации")
+        files = []
+        with profile_phase(self.profiler, PHASE_SCAN):
+            if convert_images:
+                scan_start_ns = time.time_ns()
+                image_files = self.find_files(self.image_formats)
+                self._mark_scanned('image', scan_start_ns, image_files)
+                files.extend(image_files)
+            if convert_videos:
+                scan_start_ns = time.time_ns()
+                video_files = self.find_files(self.video_formats)
+                self._mark_scanned('video', scan_start_ns, video_files)
+                files.extend(video_files)
+        
+        table = SharedJobTable(Path(jobs_dir), node_id, lease_seconds)
+        jobs = sorted((table.job_id(f, self.input_dir), f) for f in files)
+        logger.info(f"🌐 Узел {table.node_id}: {len(jobs)} заданий в общей таблице {jobs_dir}")
+        
+        counters = {'successful': 0, 'failed': 0}
+        counters_lock = threading.Lock()
+        
+        def worker(offset: int):
+            # Узлы и потоки начинают обход с разных позиций, чтобы реже сталкиваться
+            while True:
+                pending = [job for job in jobs if not table.is_finished(job[0])]
+                CONVERSION_METRICS.queue_depth.set(len(pending))
+                if not pending:
+                    return
+                
+                claimed_any = False
+                start = offset % len(pending)
+                for job_id, input_path in pending[start:] + pending[:start]:
+                    if not table.try_claim(job_id):
+                        continue
+                    claimed_any = True
+                    # Результат пишется во временный файл узла и переносится на место только
+                    # при действующей аренде: перехвативший задание узел пишет свой файл
+                    output_path = self.output_path(input_path)
+                    partial_path = output_path.with_name(
+                        f".{output_path.stem}.{table.node_id}{output_path.suffix}")
+                    success = self.convert_file(input_path, partial_path, table.cancel_event(job_id))
+                    if table.complete(job_id, input_path, success, (partial_path, output_path)):
+                        with counters_lock:
+                            counters['successful' if success else 'failed'] += 1
+                
+                if not claimed_any:
+                    # Остальные задания выполняются другими узлами - ждем завершения или истечения аренды
+                    time.sleep(min(lease_seconds / 4, 30))
+        
+        table.start_heartbeat()
+        node_offset = int(hashlib.sha1(table.node_id.encode('utf-8')).hexdigest(), 16)
+        threads = [threading.Thread(target=worker, args=(node_offset + i * 7919,))
+                   for i in range(max(1, workers))]
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            table.stop_heartbeat()
+            self.stats.save()
+        
+        with profile_phase(self.profiler, PHASE_REPORT):
+            logger.info("📊 Итоговый отчет узла:")
+            logger.info(f"   Успешно конвертировано: {counters['successful']}")
+            logger.info(f"   Ошибок: {counters['failed']}")
+            self._close_reports()
+
+    def convert_images(self) -> Tuple[int, int]:
+        """Конвертация всех изображений в WebP"""
+        with profile_phase(self.profiler, PHASE_SCAN):
+            scan_start = time.perf_counter()
+            scan_start_ns = time.time_ns()
+            image_files = self.find_files(self.image_formats)
+            self.report.record_scan('image', time.perf_counter() - scan_start, len(image_files))
+            
+            if not image_files:
+                logger.info("Изображения для конвертации не найдены")
+                return 0, 0
+            
+            logger.info(f"Найдено {len(image_files)} изображений для конвертации")
+            image_files = self._preflight(image_files)
+            self._mark_scanned('image', scan_start_ns, image_files)
+        CONVERSION_METRICS.queue_depth.inc(len(image_files))
         
         successful = 0
         failed = 0
         
         for image_file in image_files:
-            if self.convert_image_to_webp(image_file):
+            CONVERSION_METRICS.queue_depth.dec()
+            with profile_phase(self.profiler, PHASE_JOB, image_file.name):
+                success = self.convert_image_to_webp(image_file)
+            self.results.append({'input': str(image_file), 'success': success})
+            if success:
                 successful += 1
             else:
                 failed += 1
@@ -207,39 +732,120 @@ class MediaConverter:
 
     def convert_videos(self) -> Tuple[int, int]:
         """Конвертация всех видео в WebM"""
-        video_files = self.find_files(self.video_formats)
-        
-        if not video_files:
-            logger.info("Видео для конвертации не найдены")
-            return 0, 0
-        
-        logger.info(f"Найдено {len(video_files)} видео для конвертации")
+        with profile_phase(self.profiler, PHASE_SCAN):
+            scan_start = time.perf_counter()
+            scan_start_ns = time.time_ns()
+            video_files = self.find_files(self.video_formats)
+            self.report.record_scan('video', time.perf_counter() - scan_start, len(video_files))
+            
+            if not video_files:
+                logger.info("Видео для конвертации не найдены")
+                return 0, 0
+            
+            logger.info(f"Найдено {len(video_files)} видео для конвертации")
+            video_files = self._preflight(video_files)
+            self._mark_scanned('video', scan_start_ns, video_files)
+        CONVERSION_METRICS.queue_depth.inc(len(video_files))
         
         successful = 0
         failed = 0
         
         for video_file in video_files:
-            if self.convert_video_to_webm(video_file):
+            CONVERSION_METRICS.queue_depth.dec()
+            with profile_phase(self.profiler, PHASE_JOB, video_file.name):
+                success = self.convert_video_to_webm(video_file)
+            self.results.append({'input': str(video_file), 'success': success})
+            if success:
                 successful += 1
             else:
                 failed += 1
         
         return successful, failed
 
-    def run(self, convert_images: bool = True, convert_videos: bool = True):
+    def estimate_file(self, input_path: Path) -> Tuple[float, int]:
+        """
+        Оценка времени конвертации и размера результата по истории
+        
+        Returns:
+            Tuple[float, int]: (секунды, байты)
+        """
+        input_size = input_path.stat().st_size
+        
+        if input_path.suffix.lower() in self.image_formats:
+            info = probe_image(input_path)
+            width, height = info.get('width', 0), info.get('height', 0)
+            key = self.stats.make_key(IMAGE_CODEC, width, height, self.image_preset)
+            return self.stats.estimate(key, width * height / 1e6, input_size,
+                                       DEFAULT_IMAGE_RATE, DEFAULT_IMAGE_SIZE_RATIO)
+        
+        info = probe_media(input_path)
+        key = self.stats.make_key(VIDEO_CODEC, info.get('width', 0),
+                                  info.get('height', 0), self.video_preset)
+        return self.stats.estimate(key, info.get('duration', 0), input_size,
+                                   DEFAULT_VIDEO_RATE, DEFAULT_VIDEO_SIZE_RATIO)
+
+    def plan(self, convert_images: bool = True, convert_videos: bool = True) -> Dict:
+        """
+        Оценка времени и объема пакета без конвертации (dry-run)
+        
+        Args:
+            convert_images: Учитывать изображения
+            convert_videos: Учитывать видео
+            
+        Returns:
+            Dict: files, seconds, input_bytes, output_bytes
+        """
+        files = []
+        if convert_images:
+            files.extend(self.find_files(self.image_formats))
+        if convert_videos:
+            files.extend(self.find_files(self.video_formats))
+        
+        total_seconds = 0.0
+        total_input = 0
+        total_output = 0
+        
+        logger.info("🧮 План конвертации:")
+        for input_path in files:
+            seconds, output_bytes = self.estimate_file(input_path)
+            input_bytes = input_path.stat().st_size
+            total_seconds += seconds
+            total_input += input_bytes
+            total_output += output_bytes
+            logger.info(f"   {input_path.name}: ~{format_duration(seconds)}, "
+                        f"{input_bytes / 1024 / 1024:.1f}MB -> ~{output_bytes / 1024 / 1024:.1f}MB",
+                        extra={'file': str(input_path)})
+        
+        logger.info(f"📊 Файлов: {len(files)}")
+        logger.info(f"   Оценка времени: ~{format_duration(total_seconds)}")
+        logger.info(f"   Объем: {total_input / 1024 / 1024:.1f}MB -> ~{total_output / 1024 / 1024:.1f}MB")
+        
+        return {
+            'files': len(files),
+            'seconds': total_seconds,
+            'input_bytes': total_input,
+            'output_bytes': total_output,
+        }
+
+    def run(self, convert_images: bool = True, convert_videos: bool = True) -> Dict:
         """
         Запуск конвертации
         
         Args:
             convert_images: Конвертировать изображения
             convert_videos: Конвертировать видео
+            
+        Returns:
+            Dict: Итоговый отчет (shard, successful, failed, files, stages)
         """
         logger.info("🚀 Начинаем конвертацию медиафайлов...")
+        if self.shard:
+            logger.info(f"   Шард: {self.shard[0]}/{self.shard[1]}")
         
         # Проверяем зависимости
         if not self.check_dependencies():
             logger.error("❌ Зависимости не найдены. Прерываем конвертацию.")
-            return
+            return None
         
         total_successful = 0
         total_failed = 0
@@ -258,46 +864,197 @@ class MediaConverter:
             total_successful += vid_success
             total_failed += vid_failed
         
-        # Итоговый отчет
-        logger.info("📊 Итоговый отчет:")
-        logger.info(f"   Успешно конвертировано: {total_successful}")
-        logger.info(f"   Ошибок: {total_failed}")
-        logger.info(f"   Всего обработано: {total_successful + total_failed}")
+        with profile_phase(self.profiler, PHASE_REPORT):
+            # Сохраняем накопленную статистику скорости
+            self.stats.save()
+            
+            # Итоговый отчет
+            self._close_reports()
+            logger.info("📊 Итоговый отчет:")
+            logger.info(f"   Успешно конвертировано: {total_successful}")
+            logger.info(f"   Ошибок: {total_failed}")
+            if self.invalid_count:
+                logger.info(f"   Отклонено проверкой: {self.invalid_count}")
+            logger.info(f"   Всего обработано: {total_successful + total_failed + self.invalid_count}")
+            
+            if self.invalid_count:
+                logger.warning(f"⚠️  {self.invalid_count} файлов повреждены и пропущены")
+            if total_failed == 0:
+                logger.info("🎉 Все файлы успешно конвертированы!")
+            else:
+                logger.warning(f"⚠️  {total_failed} файлов не удалось конвертировать")
         
-        if total_failed == 0:
-            logger.info("🎉 Все файлы успешно конвертированы!")
-        else:
-            logger.warning(f"⚠️  {total_failed} файлов не удалось конвертировать")
+        return {
+            'shard': f"{self.shard[0]}/{self.shard[1]}" if self.shard else None,
+            'successful': total_successful,
+            'failed': total_failed,
+            'invalid': self.invalid_count,
+            'files': self.results,
+            'stages': self.report.summary(),
+        }
 
 
 def main():
     """Главная функция"""
     parser = argparse.ArgumentParser(description='Конвертер изображений в WebP и видео в WebM')
-    parser.add_argument('input_dir', help='Папка с исходными файлами')
+    parser.add_argument('input_dir', nargs='?', help='Папка с исходными файлами')
     parser.add_argument('-o', '--output', help='Папка для сохранения (по умолчанию та же)')
     parser.add_argument('-q', '--quality', type=int, default=80, 
                        help='Качество WebP (1-100, по умолчанию 80)')
+    parser.add_argument('--webp-mode', choices=WEBP_MODES, default='lossy',
+                       help='Режим WebP: lossy (по умолчанию), lossless, near-lossless или auto - выбор '
+                            'для каждого изображения по количеству цветов, прозрачности и энтропии')
+    parser.add_argument('--target-ssim', type=float, metavar='SSIM',
+                       help='Подбирать качество WebP для каждого изображения: наименьшее с SSIM не ниже '
+                            'заданного (например, 0.97); вместо --quality для изображений')
+    parser.add_argument('--per-title', metavar='METRIC:VALUE',
+                       help='Подбирать CRF каждого видео по коротким фрагментам: наибольший, при котором '
+                            'метрика не ниже цели (например, ssim:0.97 или psnr:42)')
+    parser.add_argument('--per-title-samples', type=int, default=DEFAULT_SAMPLES,
+                       help=f'Количество фрагментов для подбора CRF (по умолчанию {DEFAULT_SAMPLES})')
+    parser.add_argument('--per-title-seconds', type=float, default=DEFAULT_SAMPLE_SECONDS,
+                       help=f'Длина фрагмента, секунд (по умолчанию {DEFAULT_SAMPLE_SECONDS:g})')
     parser.add_argument('--images-only', action='store_true', 
                        help='Конвертировать только изображения')
     parser.add_argument('--videos-only', action='store_true', 
                        help='Конвертировать только видео')
+    parser.add_argument('--plan', '--dry-run', dest='plan', action='store_true',
+                       help='Только оценить время и размер результата, ничего не конвертируя')
+    parser.add_argument('--stats-file',
+                       help='Файл истории скорости конвертации (по умолчанию ~/.umconverter/throughput_stats.json)')
+    parser.add_argument('--watch', action='store_true',
+                       help='Режим службы: конвертировать новые файлы по мере появления в папке')
+    parser.add_argument('--workers', type=int, default=2,
+                       help='Количество параллельных конвертаций в режимах --watch и --distributed (по умолчанию 2)')
+    parser.add_argument('--settle', type=float, default=2.0,
+                       help='Сколько секунд размер файла должен быть неизменным перед конвертацией (по умолчанию 2)')
+    parser.add_argument('--distributed', metavar='JOBS_DIR',
+                       help='Распределенный режим: общая папка таблицы заданий для всех узлов')
+    parser.add_argument('--lease', type=float, default=300,
+                       help='Срок аренды задания в распределенном режиме, секунд (по умолчанию 300)')
+    parser.add_argument('--node-id',
+                       help='Идентификатор узла в распределенном режиме (по умолчанию имя хоста и PID)')
+    parser.add_argument('--shard', metavar='INDEX/COUNT',
+                       help='Обработать только часть INDEX (с нуля) из COUNT непересекающихся частей')
+    parser.add_argument('--shard-balance', action='store_true',
+                       help='Балансировать части по длительности видео и размеру изображений (требует ffprobe)')
+    parser.add_argument('--summary', metavar='PATH',
+                       help='Файл итогового JSON отчета (для --shard по умолчанию в выходной папке)')
+    parser.add_argument('--timeout-factor', type=float, default=DEFAULT_TIMEOUT_FACTOR,
+                       help='Ограничение времени видео: 60с + множитель * длительность (0 - без ограничения, по умолчанию 10)')
+    parser.add_argument('--stall-timeout', type=float, default=DEFAULT_STALL_TIMEOUT,
+                       help='Завершать FFmpeg, если прогресса нет столько секунд (0 - не следить, по умолчанию 60)')
+    parser.add_argument('--quarantine', metavar='DIR',
+                       help='Перемещать сюда файлы, которые не удалось конвертировать даже в резервном профиле')
+    parser.add_argument('--no-preflight', action='store_true',
+                       help='Не проверять файлы на повреждения перед конвертацией')
+    parser.add_argument('--report', metavar='PATH',
+                       help='Файл отчета JSON Lines: этапы, CPU, память и объем каждого задания')
+    parser.add_argument('--metrics-port', type=int,
+                       help='Отдавать метрики Prometheus на http://HOST:PORT/metrics')
+    parser.add_argument('--metrics-host', default='127.0.0.1',
+                       help='Адрес страницы метрик (по умолчанию 127.0.0.1)')
+    parser.add_argument('--metrics-textfile', metavar='PATH',
+                       help='Периодически записывать метрики в файл для textfile collector node_exporter')
+    parser.add_argument('--trace', metavar='PATH',
+                       help='Файл трасс заданий OTLP JSON: поиск, очередь, probe, FFmpeg/Pillow, запись и проверка')
+    parser.add_argument('--profile', metavar='DIR',
+                       help='Профилировать поиск файлов, задания и отчет (cProfile, tracemalloc) с записью в папку DIR')
+    parser.add_argument('--profile-top', type=int, default=20,
+                       help='Сколько горячих мест и мест выделения памяти выводить (по умолчанию 20)')
+    parser.add_argument('--merge-summaries', nargs='+', metavar='SUMMARY',
+                       help='Объединить отчеты шардов и выйти')
+    add_logging_arguments(parser, DEFAULT_LOG_DIR / 'conversion.log')
     
     args = parser.parse_args()
+    setup_logging_from_args(args)
+    
+    if args.merge_summaries:
+        merged = merge_summaries([Path(p) for p in args.merge_summaries])
+        logger.info(f"📊 Объединено отчетов: {len(args.merge_summaries)}")
+        logger.info(f"   Успешно конвертировано: {merged['successful']}")
+        logger.info(f"   Ошибок: {merged['failed']}")
+        if args.summary:
+            write_summary(Path(args.summary), merged)
+        return
+    
+    if not args.input_dir:
+        parser.error('необходимо указать input_dir')
+    if args.target_ssim is not None and not 0 < args.target_ssim < 1:
+        parser.error('--target-ssim должен быть между 0 и 1')
+    per_title = None
+    if args.per_title:
+        try:
+            per_title = parse_target(args.per_title)
+        except ValueError as e:
+            parser.error(str(e))
+    
+    shard = None
+    if args.shard:
+        try:
+            shard = parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
     
     # Проверяем существование входной папки
     if not os.path.exists(args.input_dir):
         logger.error(f"Папка {args.input_dir} не существует")
         sys.exit(1)
     
+    profiler = RunProfiler(Path(args.profile), args.profile_top) if args.profile else None
+    
     # Создаем конвертер
-    converter = MediaConverter(args.input_dir, args.output, args.quality)
+    converter = MediaConverter(args.input_dir, args.output, args.quality, args.stats_file,
+                               shard, args.shard_balance, args.timeout_factor,
+                               args.stall_timeout, args.quarantine, not args.no_preflight,
+                               args.report, profiler, args.trace, args.target_ssim,
+                               per_title, args.per_title_samples, args.per_title_seconds,
+                               args.webp_mode)
     
     # Определяем что конвертировать
     convert_images = not args.videos_only
     convert_videos = not args.images_only
     
-    # Запускаем конвертацию
-    converter.run(convert_images, convert_videos)
+    if args.plan:
+        converter.plan(convert_images, convert_videos)
+        return
+    
+    metrics_server = None
+    if args.metrics_port is not None:
+        metrics_server = start_metrics_server(args.metrics_port, args.metrics_host)
+    textfile_exporter = None
+    if args.metrics_textfile:
+        textfile_exporter = TextfileExporter(Path(args.metrics_textfile))
+        textfile_exporter.start()
+    if profiler is not None:
+        profiler.start()
+    
+    try:
+        if args.watch:
+            converter.watch(convert_images, convert_videos, args.workers, args.settle)
+            return
+        
+        if args.distributed:
+            converter.run_distributed(args.distributed, convert_images, convert_videos,
+                                      args.workers, args.lease, args.node_id)
+            return
+        
+        # Запускаем конвертацию
+        summary = converter.run(convert_images, convert_videos)
+    finally:
+        if profiler is not None:
+            profiler.finish()
+        if textfile_exporter is not None:
+            textfile_exporter.stop()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+    
+    summary_path = args.summary
+    if summary_path is None and shard:
+        summary_path = converter.output_dir / f"summary-shard-{shard[0]}-of-{shard[1]}.json"
+    if summary is not None and summary_path:
+        write_summary(Path(summary_path), summary)
+        logger.info(f"📝 Отчет сохранен: {summary_path}")
 
 
 if __name__ == '__main__':
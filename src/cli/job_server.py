@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Локальный HTTP сервис конвертации медиафайлов
+Запуск: python src/cli/job_server.py serve --port 8765 -o converted
+"""
+
+import sys
+import argparse
+from pathlib import Path
+import logging
+
+# Добавляем путь к модулям
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.crf_search import parse_target
+from core.ffmpeg_converter import FFmpegConverter
+from core.job_service import JobService, create_server
+from core.log_setup import add_logging_arguments, setup_logging_from_args
+from core.metrics import TextfileExporter
+from core.tracing import Tracer
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """Главная функция"""
+    parser = argparse.ArgumentParser(description='Локальный HTTP сервис конвертации медиафайлов')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    serve = subparsers.add_parser('serve', help='Запустить HTTP сервис заданий')
+    serve.add_argument('--host', default='127.0.0.1', help='Адрес (по умолчанию 127.0.0.1)')
+    serve.add_argument('--port', type=int, default=8765, help='Порт (по умолчанию 8765)')
+    serve.add_argument('-o', '--output', default='converted',
+                       help='Папка для результатов (по умолчанию converted)')
+    serve.add_argument('--workers', type=int, default=2,
+                       help='Количество рабочих потоков (по умолчанию 2)')
+    serve.add_argument('--max-queue', type=int, default=100,
+                       help='Максимальная длина очереди, сверх нее запросы получают 429 (по умолчанию 100)')
+    serve.add_argument('--metrics-textfile', metavar='PATH',
+                       help='Периодически записывать метрики в файл для textfile collector node_exporter')
+    serve.add_argument('--trace', metavar='PATH',
+                       help='Файл трасс заданий OTLP JSON (id трассы совпадает с id задания)')
+    serve.add_argument('--per-title', metavar='METRIC:VALUE',
+                       help='Подбирать CRF каждого видео по коротким фрагментам (например, ssim:0.97 или psnr:42)')
+    add_logging_arguments(serve)
+
+    args = parser.parse_args()
+    setup_logging_from_args(args)
+    per_title = None
+    if args.per_title:
+        try:
+            per_title = parse_target(args.per_title)
+        except ValueError as e:
+            parser.error(str(e))
+
+    # Проверяем FFmpeg один раз при запуске, а не на каждое задание
+    converter = FFmpegConverter()
+    if not converter.check_ffmpeg():
+        logger.error("❌ FFmpeg не найден. Установите FFmpeg для работы сервиса")
+        sys.exit(1)
+    if args.trace:
+        converter.tracer = Tracer(Path(args.trace))
+    converter.per_title = per_title
+
+    service = JobService(Path(args.output), args.workers, args.max_queue, converter=converter)
+    server = create_server(service, args.host, args.port)
+
+    textfile_exporter = None
+    if args.metrics_textfile:
+        textfile_exporter = TextfileExporter(Path(args.metrics_textfile))
+        textfile_exporter.start()
+
+    logger.info(f"🚀 Сервис заданий запущен: http://{args.host}:{args.port}")
+    logger.info(f"   Рабочих потоков: {args.workers}, длина очереди: {args.max_queue}")
+    logger.info(f"   Метрики: http://{args.host}:{args.port}/metrics")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("⏹️ Сервис остановлен")
+    finally:
+        server.server_close()
+        if textfile_exporter is not None:
+            textfile_exporter.stop()
+        if converter.tracer is not None:
+            converter.tracer.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Асинхронный драйвер FFmpeg на asyncio: сотни процессов из одного цикла событий
+Asyncio subprocess driver for FFmpegConverter
+"""
+
+import asyncio
+import collections
+import json
+import os
+import signal
+import time
+from pathlib import Path
+from typing import AsyncIterator, Callable, Dict, Iterable, Optional
+import logging
+
+from core.ffmpeg_converter import FFmpegConverter
+from core.ffmpeg_progress import ProgressParser, with_progress
+from core.ffmpeg_runner import NEW_PROCESS_GROUP, STDERR_TAIL_LINES
+from core.media_probe import find_ffprobe
+
+logger = logging.getLogger(__name__)
+
+
+class ConversionResult:
+    """Результат асинхронной конвертации"""
+
+    def __init__(self, input_path: str, output_path: str):
+        self.input_path = input_path
+        self.output_path = output_path
+        self.success = False
+        self.returncode: Optional[int] = None
+        self.error: Optional[str] = None
+        self.stderr_tail = ""
+        self.elapsed = 0.0
+
+    def __repr__(self):
+        state = "ok" if self.success else f"error={self.error!r}"
+        return f"ConversionResult({Path(self.input_path).name}, {state}, {self.elapsed:.1f}s)"
+
+
+class AsyncFFmpegConverter:
+    """Асинхронная обертка над командами FFmpegConverter"""
+
+    def __init__(self, converter: FFmpegConverter = None, max_concurrency: int = 8):
+        """
+        Args:
+            converter: Синхронный конвертер, формирующий командные строки
+            max_concurrency: Количество одновременно запущенных процессов по умолчанию
+        """
+        self.converter = converter or FFmpegConverter()
+        self.max_concurrency = max_concurrency
+
+    async def probe(self, file_path: str, timeout: float = 30) -> Dict:
+        """Асинхронный ffprobe (пустой словарь при ошибке или истечении времени)"""
+        cmd = [
+            find_ffprobe(self.converter.ffmpeg_path), '-v', 'quiet', '-print_format', 'json',
+            '-show_format', '-show_streams', str(file_path)
+        ]
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL,
+                start_new_session=NEW_PROCESS_GROUP
+            )
+        except OSError as e:
+            logger.error(f"Ошибка запуска ffprobe: {e}")
+            return {}
+
+        try:
+            stdout, _ = await asyncio.wait_for(process.communicate(), timeout)
+        except asyncio.TimeoutError:
+            return {}
+        finally:
+            # Истечение времени, отмена или любая ошибка не оставляют ffprobe работать
+            if process.returncode is None:
+                await _kill(process)
+
+        if process.returncode != 0:
+            return {}
+        try:
+            return json.loads(stdout)
+        except ValueError:
+            return {}
+
+    async def convert(self, input_path: str, output_path: str,
+                      video_codec: str = None, audio_codec: str = None,
+                      quality: int = 80, timeout: float = None,
+                      on_progress: Callable[[str, Dict], None] = None) -> ConversionResult:
+        """
+        Конвертация одного файла
+
+        Args:
+            input_path: Путь к входному файлу
+            output_path: Путь к выходному файлу
+            video_codec: Видеокодек (если None - автоматический выбор)
+            audio_codec: Аудиокодек (если None - автоматический выбор)
+            quality: Качество (1-100)
+            timeout: Ограничение времени конвертации (секунды)
+            on_progress: Вызывается с (input_path, блок прогресса)
+
+        Отмена задачи (Task.cancel) и исключение в on_progress завершают процесс FFmpeg.
+        """
+        result = ConversionResult(input_path, output_path)
+        cmd = with_progress(self.converter.build_command(
+            input_path, output_path, video_codec, audio_codec, quality
+        ))
+        start_time = time.monotonic()
+
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *cmd, stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+                start_new_session=NEW_PROCESS_GROUP
+            )
+        except OSError as e:
+            result.error = str(e)
+            return result
+
+        stderr_tail = collections.deque(maxlen=STDERR_TAIL_LINES)
+
+        async def read_progress():
+            parser = ProgressParser()
+            async for raw_line in process.stdout:
+                block = parser.feed(raw_line.decode('utf-8', 'replace'))
+                if block and on_progress:
+                    on_progress(input_path, block)
+
+        async def read_stderr():
+            async for raw_line in process.stderr:
+                stderr_tail.append(raw_line.decode('utf-8', 'replace').rstrip())
+
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(read_progress(), read_stderr(), process.wait()), timeout
+            )
+        except asyncio.TimeoutError:
+            result.error = f"timeout after {timeout}s"
+        except Exception as e:
+            # Например, исключение в on_progress: остальные читатели продолжили бы работать
+            result.error = f"{type(e).__name__}: {e}"
+        finally:
+            if process.returncode is None:
+                await _kill(process)
+            result.elapsed = time.monotonic() - start_time
+            result.returncode = process.returncode
+            result.stderr_tail = "\n".join(stderr_tail)
+
+        if result.error is None:
+            result.success = process.returncode == 0
+            if not result.success:
+                result.error = f"ffmpeg exited with code {process.returncode}"
+
+        if result.success:
+            logger.info(f"✅ Успешно конвертирован: {input_path} -> {output_path}")
+        else:
+            logger.error(f"❌ Ошибка конвертации {input_path}: {result.error}\n{result.stderr_tail}")
+        return result
+
+    async def convert_many(self, jobs: Iterable[Dict], concurrency: int = None,
+                           timeout: float = None,
+                           on_progress: Callable[[str, Dict], None] = None) -> AsyncIterator[ConversionResult]:
+        """
+        Конвертация набора файлов с ограничением параллельности
+
+        Args:
+            jobs: Словари с аргументами convert (input_path, output_path, ...)
+            concurrency: Максимум одновременно запущенных процессов
+            timeout: Ограничение времени на каждый файл
+            on_progress: Вызывается с (input_path, блок прогресса)
+
+        Yields:
+            ConversionResult в порядке завершения
+        """
+        limit = max(1, concurrency or self.max_concurrency)
+        job_iter = iter(jobs)
+        pending = set()
+
+        def start_next() -> bool:
+            job = next(job_iter, None)
+            if job is None:
+                return False
+            job = dict(job)
+            job.setdefault('timeout', timeout)
+            job.setdefault('on_progress', on_progress)
+            pending.add(asyncio.ensure_future(self.convert(**job)))
+            return True
+
+        try:
+            # Задания берутся из итератора по мере освобождения слотов
+            while len(pending) < limit and start_next():
+                pass
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    pending.discard(task)
+                    start_next()
+                    yield task.result()
+        finally:
+            # Прерванный перебор (break, aclose, отмена) завершает оставшиеся процессы
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def _kill(process: asyncio.subprocess.Process):
+    """Принудительное завершение процесса и ожидание его выхода"""
+    try:
+        if NEW_PROCESS_GROUP:
+            os.killpg(process.pid, signal.SIGKILL)
+        elif process.returncode is None:
+            process.kill()
+    except ProcessLookupError:
+        pass
+    await process.wait()
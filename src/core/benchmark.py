@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Синтетический набор файлов и измерения для бенчмарков конвертации
+Reproducible benchmark corpus (Pillow images, ffmpeg lavfi clips), resource measurement and baseline comparison
+"""
+
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from core.job_report import peak_rss_mb
+
+logger = logging.getLogger(__name__)
+
+# Увеличивается при любом изменении набора, чтобы старые файлы пересоздавались
+CORPUS_VERSION = 1
+CORPUS_SEED = 20240601
+MANIFEST_NAME = 'corpus.json'
+
+# Изображения: (имя, ширина, высота, режим, содержимое)
+IMAGE_SPECS = [
+    ('photo_small', 640, 480, 'RGB', 'photo'),
+    ('photo_hd', 1920, 1080, 'RGB', 'photo'),
+    ('photo_4k', 3840, 2160, 'RGB', 'photo'),
+    ('graphic_alpha', 1280, 720, 'RGBA', 'graphic'),
+    ('screenshot', 1920, 1080, 'RGB', 'graphic'),
+    ('palette', 800, 600, 'P', 'graphic'),
+    ('grayscale', 2048, 1536, 'L', 'photo'),
+]
+IMAGE_FORMATS = {'RGB': ('.jpg', 'JPEG'), 'RGBA': ('.png', 'PNG'), 'P': ('.png', 'PNG'), 'L': ('.tiff', 'TIFF')}
+
+# Видео: (имя, ширина, высота, длительность в секундах, кадров в секунду)
+VIDEO_SPECS = [
+    ('testsrc_360p', 640, 360, 3, 25),
+    ('testsrc_720p', 1280, 720, 3, 25),
+    ('testsrc_1080p', 1920, 1080, 2, 30),
+]
+
+# Направление улучшения метрик отчета: 1 - больше лучше, -1 - меньше лучше
+METRIC_DIRECTIONS = {
+    'files_per_s': 1,
+    'pixels_per_s': 1,
+    'encode_fps': 1,
+    'progress_fps': 1,
+    'seconds': -1,
+    'cpu_seconds': -1,
+    'peak_rss_mb': -1,
+    'output_bytes': -1,
+}
+DEFAULT_TOLERANCE = 0.10
+
+
+def _photo_image(rng: random.Random, width: int, height: int):
+    """Фотоподобное изображение: градиенты, размытые пятна и мелкий шум"""
+    from PIL import Image, ImageDraw, ImageFilter
+
+    img = Image.merge('RGB', [
+        Image.linear_gradient('L').resize((width, height)),
+        Image.radial_gradient('L').resize((width, height)),
+        Image.linear_gradient('L').rotate(90).resize((width, height)),
+    ])
+    draw = ImageDraw.Draw(img)
+    for _ in range(40):
+        x, y = rng.randrange(width), rng.randrange(height)
+        r = rng.randrange(max(2, width // 40), max(3, width // 6))
+        color = tuple(rng.randrange(256) for _ in range(3))
+        draw.ellipse((x - r, y - r, x + r, y + r), fill=color)
+    img = img.filter(ImageFilter.GaussianBlur(max(1, width // 200)))
+
+    # Шум на уменьшенной сетке: детали без затрат на генерацию каждого пикселя
+    noise_size = (max(1, width // 4), max(1, height // 4))
+    noise = Image.frombytes('L', noise_size, rng.randbytes(noise_size[0] * noise_size[1]))
+    noise = noise.resize((width, height), Image.BILINEAR).convert('RGB')
+    return Image.blend(img, noise, 0.15)
+
+
+def _graphic_image(rng: random.Random, width: int, height: int, alpha: bool):
+    """Графика интерфейса: заливки, рамки и текст на плоском фоне"""
+    from PIL import Image, ImageDraw
+
+    img = Image.new('RGBA' if alpha else 'RGB', (width, height),
+                    (0, 0, 0, 0) if alpha else (245, 245, 245))
+    draw = ImageDraw.Draw(img)
+    palette = [tuple(rng.randrange(256) for _ in range(3)) for _ in range(8)]
+    for _ in range(60):
+        x0, y0 = rng.randrange(width), rng.randrange(height)
+        x1, y1 = min(width - 1, x0 + rng.randrange(20, width // 3)), min(height - 1, y0 + rng.randrange(10, height // 4))
+        color = rng.choice(palette) + ((rng.randrange(128, 256),) if alpha else ())
+        draw.rectangle((x0, y0, x1, y1), fill=color, outline=(0, 0, 0) + ((255,) if alpha else ()))
+        draw.text((x0 + 4, y0 + 4), f"item {rng.randrange(1000)}", fill=(20, 20, 20) + ((255,) if alpha else ()))
+    return img
+
+
+def _make_image(spec: Tuple, rng: random.Random):
+    name, width, height, mode, kind = spec
+    if kind == 'photo':
+        img = _photo_image(rng, width, height)
+    else:
+        img = _graphic_image(rng, width, height, mode == 'RGBA')
+    if mode == 'P':
+        return img.convert('RGB').quantize(64)
+    if img.mode != mode:
+        return img.convert(mode)
+    return img
+
+
+def _video_command(ffmpeg_path: str, spec: Tuple, output_path: Path) -> List[str]:
+    """Клип из тестовых источников lavfi; mpeg4 и aac есть в любой сборке FFmpeg"""
+    name, width, height, duration, rate = spec
+    return [
+        ffmpeg_path, '-v', 'error', '-y',
+        '-f', 'lavfi', '-i', f'testsrc2=size={width}x{height}:rate={rate}:duration={duration}',
+        '-f', 'lavfi', '-i', f'sine=frequency=440:sample_rate=48000:duration={duration}',
+        '-c:v', 'mpeg4', '-q:v', '4', '-pix_fmt', 'yuv420p',
+        '-c:a', 'aac', '-b:a', '96k', '-shortest',
+        str(output_path)
+    ]
+
+
+def load_manifest(directory: Path) -> Optional[Dict]:
+    """Описание ранее созданного набора (None - набора нет или он устарел)"""
+    try:
+        with open(Path(directory) / MANIFEST_NAME, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('version') != CORPUS_VERSION:
+        return None
+    for entry in manifest.get('images', []) + manifest.get('videos', []):
+        if not (Path(directory) / entry['path']).exists():
+            return None
+    return manifest
+
+
+def generate_corpus(directory: Path, ffmpeg_path: str = 'ffmpeg', force: bool = False) -> Dict:
+    """
+    Создание набора файлов для бенчмарка
+
+    Содержимое определяется CORPUS_SEED, поэтому на разных машинах набор одинаков
+    (с точностью до версий Pillow и FFmpeg). Готовый набор повторно не создается.
+
+    Args:
+        directory: Папка набора (подпапки images и videos)
+        ffmpeg_path: Путь к FFmpeg; без него набор содержит только изображения
+        force: Пересоздать набор, даже если он уже есть
+
+    Returns:
+        Dict: Описание набора (manifest)
+    """
+    directory = Path(directory)
+    if not force:
+        manifest = load_manifest(directory)
+        if manifest is not None:
+            return manifest
+
+    images_dir = directory / 'images'
+    videos_dir = directory / 'videos'
+    images_dir.mkdir(parents=True, exist_ok=True)
+    videos_dir.mkdir(parents=True, exist_ok=True)
+
+    manifest = {'version': CORPUS_VERSION, 'seed': CORPUS_SEED, 'images': [], 'videos': []}
+
+    for index, spec in enumerate(IMAGE_SPECS):
+        name, width, height, mode, kind = spec
+        extension, image_format = IMAGE_FORMATS[mode]
+        output_path = images_dir / f"{name}{extension}"
+        # Отдельный генератор на файл: добавление спецификации не меняет остальные файлы
+        img = _make_image(spec, random.Random(CORPUS_SEED + index))
+        img.save(output_path, image_format, **({'quality': 90} if image_format == 'JPEG' else {}))
+        manifest['images'].append({
+            'path': str(output_path.relative_to(directory)), 'width': width, 'height': height,
+            'mode': mode, 'kind': kind, 'bytes': output_path.stat().st_size,
+        })
+        logger.info(f"🖼️ {output_path.name}: {width}x{height} {mode}")
+
+    for spec in VIDEO_SPECS:
+        name, width, height, duration, rate = spec
+        output_path = videos_dir / f"{name}.mp4"
+        try:
+            result = subprocess.run(_video_command(ffmpeg_path, spec, output_path),
+                                    stdin=subprocess.DEVNULL, capture_output=True, text=True)
+        except FileNotFoundError:
+            logger.warning("⚠️ FFmpeg не найден: видео в набор не добавлены")
+            break
+        if result.returncode != 0:
+            logger.error(f"❌ Не удалось создать {output_path.name}: {result.stderr.strip()[-500:]}")
+            continue
+        manifest['videos'].append({
+            'path': str(output_path.relative_to(directory)), 'width': width, 'height': height,
+            'duration': duration, 'rate': rate, 'frames': duration * rate,
+            'bytes': output_path.stat().st_size,
+        })
+        logger.info(f"🎬 {output_path.name}: {width}x{height}, {duration}с, {rate} к/с")
+
+    with open(directory / MANIFEST_NAME, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def reset_peak_rss() -> bool:
+    """
+    Сброс пиковой памяти процесса (VmHWM) до текущей, только Linux.
+
+    ru_maxrss сохраняется при fork и exec, поэтому процесс сценария без сброса
+    показывал бы память родителя, например создававшего набор файлов.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _vm_hwm_mb() -> Optional[float]:
+    """Пиковая память процесса с последнего сброса (VmHWM) в МБ"""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+class Measurement:
+    """
+    Время, процессорное время и пиковая память блока кода.
+
+    Процессорное время включает завершившиеся дочерние процессы (FFmpeg).
+    Пиковая память процесса сбрасывается в начале блока (Linux); где сброс
+    недоступен, это максимум за все время, поэтому каждый сценарий бенчмарка
+    запускается в отдельном процессе.
+    """
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.cpu_seconds = 0.0
+        self._start = 0.0
+        self._cpu_start = 0.0
+        self._peak_reset = False
+
+    @staticmethod
+    def _cpu_time() -> float:
+        times = os.times()
+        return times.user + times.system + times.children_user + times.children_system
+
+    def __enter__(self):
+        self._peak_reset = reset_peak_rss()
+        self._start = time.perf_counter()
+        self._cpu_start = self._cpu_time()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self._start
+        self.cpu_seconds = self._cpu_time() - self._cpu_start
+        return False
+
+    def metrics(self) -> Dict:
+        own = _vm_hwm_mb() if self._peak_reset else None
+        if own is None:
+            own = peak_rss_mb()
+        rss = [value for value in (own, peak_rss_mb(children=True)) if value is not None]
+        return {
+            'seconds': round(self.seconds, 3),
+            'cpu_seconds': round(self.cpu_seconds, 3),
+            'peak_rss_mb': max(rss) if rss else None,
+        }
+
+
+def environment_info(ffmpeg_path: str = 'ffmpeg') -> Dict:
+    """Сведения о машине для отчета: сравнивать имеет смысл только отчеты одной среды"""
+    info = {
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+        'ffmpeg': None,
+        'pillow': None,
+    }
+    try:
+        import PIL
+        info['pillow'] = PIL.__version__
+    except ImportError:
+        pass
+    try:
+        result = subprocess.run([ffmpeg_path, '-version'], capture_output=True, text=True)
+        if result.returncode == 0 and result.stdout:
+            info['ffmpeg'] = result.stdout.splitlines()[0]
+    except OSError:
+        pass
+    return info
+
+
+def compare_reports(baseline: Dict, current: Dict,
+                    tolerance: float = DEFAULT_TOLERANCE) -> List[Dict]:
+    """
+    Сравнение отчета с базовым
+
+    Args:
+        baseline: Базовый отчет
+        current: Новый отчет
+        tolerance: Допустимое ухудшение метрики (доля, 0.1 = 10%)
+
+    Returns:
+        List[Dict]: Строки сравнения (case, metric, baseline, current, change, regression)
+    """
+    rows = []
+    for case, base_metrics in sorted(baseline.get('cases', {}).items()):
+        current_metrics = current.get('cases', {}).get(case)
+        if current_metrics is None:
+            rows.append({'case': case, 'metric': None, 'baseline': None, 'current': None,
+                         'change': None, 'regression': False, 'missing': True})
+            continue
+        if current_metrics.get('error') and not base_metrics.get('error'):
+            # Сценарий перестал проходить - регрессия без сравнения чисел
+            rows.append({'case': case, 'metric': 'error', 'baseline': None,
+                         'current': current_metrics['error'], 'change': None, 'regression': True})
+            continue
+        for metric, direction in METRIC_DIRECTIONS.items():
+            base_value = base_metrics.get(metric)
+            value = current_metrics.get(metric)
+            if not base_value or value is None:
+                continue
+            # Положительное изменение - улучшение независимо от направления метрики
+            change = (value - base_value) / base_value * direction
+            rows.append({
+                'case': case, 'metric': metric, 'baseline': base_value, 'current': value,
+                'change': change, 'regression': change < -tolerance,
+            })
+    return rows
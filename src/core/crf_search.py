@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Подбор CRF для каждого видео по коротким фрагментам (per-title)
+Per-title CRF search: encode sampled segments at candidate CRFs, score them with ffmpeg ssim/psnr
+"""
+
+import re
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+import logging
+
+from core.ffmpeg_runner import job_timeout, run_ffmpeg
+
+logger = logging.getLogger(__name__)
+
+METRICS = ('ssim', 'psnr')
+
+# Диапазон поиска CRF (подходит и для VP9 0-63, и для x264 0-51)
+DEFAULT_MIN_CRF = 15
+DEFAULT_MAX_CRF = 50
+DEFAULT_SAMPLES = 3
+DEFAULT_SAMPLE_SECONDS = 2.0
+
+# PSNR одинаковых кадров бесконечен; для усреднения ограничиваем
+PSNR_CAP = 100.0
+
+# Итоговые строки фильтров ssim и psnr в stderr FFmpeg
+_SSIM_RE = re.compile(r'SSIM .*All:([\d.]+)')
+_PSNR_RE = re.compile(r'PSNR .*average:([\d.]+|inf)')
+
+
+def parse_target(text: str) -> Tuple[str, float]:
+    """
+    Разбор цели качества вида ssim:0.97 или psnr:42
+
+    Raises:
+        ValueError: Неизвестная метрика или значение вне диапазона
+    """
+    metric, _, value = text.partition(':')
+    metric = metric.strip().lower()
+    if metric not in METRICS or not value:
+        raise ValueError(f"Цель должна быть вида ssim:0.97 или psnr:42, получено '{text}'")
+    target = float(value)
+    if metric == 'ssim' and not 0 < target < 1:
+        raise ValueError("Целевой SSIM должен быть между 0 и 1")
+    if metric == 'psnr' and target <= 0:
+        raise ValueError("Целевой PSNR должен быть больше 0")
+    return metric, target
+
+
+def sample_starts(duration: float, samples: int = DEFAULT_SAMPLES,
+                  length: float = DEFAULT_SAMPLE_SECONDS) -> List[Tuple[float, float]]:
+    """
+    Фрагменты для оценки: равномерно по длительности, без перекрытий
+
+    Returns:
+        List[Tuple[float, float]]: (начало, длина) в секундах
+    """
+    if duration <= 0:
+        return []
+    if duration <= length:
+        return [(0.0, duration)]
+    count = max(1, min(samples, int(duration // length)))
+    return [(round((duration - length) * (i + 0.5) / count, 3), length) for i in range(count)]
+
+
+def sample_command(cmd: List[str], input_path: str, start: float, length: float,
+                   sample_path: str) -> List[str]:
+    """
+    Команда кодирования фрагмента из полной команды конвертации:
+    -ss/-t перед входом, без звука, результат во временный файл
+    """
+    sample = list(cmd[:-1])
+    for index in range(len(sample) - 1):
+        if sample[index] == '-i' and sample[index + 1] == str(input_path):
+            sample[index:index] = ['-ss', str(start), '-t', str(length)]
+            break
+    else:
+        raise ValueError(f"Вход {input_path} не найден в команде")
+    return sample + ['-an', sample_path]
+
+
+def measure_command(ffmpeg_path: str, input_path: str, start: float, length: float,
+                    sample_path: str) -> List[str]:
+    """Сравнение закодированного фрагмента с тем же фрагментом исходника (ssim и psnr за один проход)"""
+    graph = ('[0:v]setpts=PTS-STARTPTS,split[d1][d2];'
+             '[1:v]setpts=PTS-STARTPTS,split[r1][r2];'
+             '[d1][r1]ssim;[d2][r2]psnr')
+    return [ffmpeg_path, '-hide_banner', '-nostats',
+            '-i', sample_path,
+            '-ss', str(start), '-t', str(length), '-i', str(input_path),
+            '-lavfi', graph, '-an', '-f', 'null', '-']
+
+
+def parse_scores(stderr: str) -> Dict[str, float]:
+    """Итоговые значения SSIM (All) и PSNR (average) из stderr FFmpeg"""
+    scores = {}
+    ssim = _SSIM_RE.findall(stderr)
+    if ssim:
+        scores['ssim'] = float(ssim[-1])
+    psnr = _PSNR_RE.findall(stderr)
+    if psnr:
+        scores['psnr'] = PSNR_CAP if psnr[-1] == 'inf' else min(float(psnr[-1]), PSNR_CAP)
+    return scores
+
+
+class CRFSearchResult:
+    """Результат подбора CRF"""
+
+    def __init__(self, metric: str, target: float):
+        self.metric = metric
+        self.target = target
+        self.crf: Optional[int] = None
+        self.value: Optional[float] = None
+        self.reached = False
+        self.attempts: List[Dict] = []
+        self.elapsed = 0.0
+        # Ресурсы процессов FFmpeg поиска
+        self.cpu_seconds = 0.0
+        self.peak_rss_mb: Optional[float] = None
+
+    def to_dict(self) -> Dict:
+        return {
+            'crf': self.crf,
+            'crf_metric': self.metric,
+            'crf_target': self.target,
+            'crf_value': round(self.value, 4) if self.value is not None else None,
+            'crf_reached': self.reached,
+            'crf_attempts': self.attempts,
+            'crf_search_seconds': round(self.elapsed, 3),
+        }
+
+
+def search_crf(build_command: Callable[[int, str], List[str]], input_path: str,
+               suffix: str, duration: float, metric: str, target: float,
+               min_crf: int = DEFAULT_MIN_CRF, max_crf: int = DEFAULT_MAX_CRF,
+               samples: int = DEFAULT_SAMPLES, length: float = DEFAULT_SAMPLE_SECONDS,
+               stall_timeout: float = None,
+               cancel_event: threading.Event = None) -> Optional[CRFSearchResult]:
+    """
+    Двоичный поиск наибольшего CRF, при котором средняя по фрагментам метрика не ниже цели
+
+    Фрагменты кодируются теми же параметрами, что и полная конвертация
+    (команда строится build_command), поэтому оценка переносится на весь файл.
+    Стоимость ограничена: не больше log2(max_crf - min_crf + 1) + 1 шагов
+    по samples фрагментов длиной length секунд.
+
+    Args:
+        build_command: Полная команда конвертации для CRF и выходного файла
+        input_path: Входной файл
+        suffix: Расширение результата (по нему выбираются кодек и контейнер)
+        duration: Длительность видео (секунды)
+        metric: ssim или psnr
+        target: Целевое значение метрики
+        min_crf: Наименьший (лучший по качеству) CRF
+        max_crf: Наибольший CRF
+        samples: Количество фрагментов
+        length: Длина фрагмента (секунды)
+        stall_timeout: Сторож зависания FFmpeg
+        cancel_event: Событие отмены
+
+    Returns:
+        CRFSearchResult или None, если поиск невозможен (нет длительности, ошибка FFmpeg, отмена);
+        если цель недостижима, выбирается min_crf
+    """
+    points = sample_starts(duration, samples, length)
+    if not points:
+        return None
+
+    result = CRFSearchResult(metric, target)
+    start_time = time.monotonic()
+    timeout = job_timeout(length)
+
+    def run(cmd: List[str]):
+        run_result = run_ffmpeg(cmd, timeout, stall_timeout, cancel_event=cancel_event)
+        result.cpu_seconds += run_result.cpu_seconds or 0.0
+        if run_result.peak_rss_mb is not None:
+            result.peak_rss_mb = max(result.peak_rss_mb or 0.0, run_result.peak_rss_mb)
+        return run_result
+
+    def score(crf: int, tmp: Path) -> Optional[float]:
+        values = []
+        for index, (start, seconds) in enumerate(points):
+            sample_path = str(tmp / f"crf{crf}-{index}{suffix}")
+            cmd = build_command(crf, sample_path)
+            encoded = run(sample_command(cmd, input_path, start, seconds, sample_path))
+            if not encoded.success:
+                logger.warning(f"⚠️ Подбор CRF: фрагмент не закодирован ({encoded.error}): {encoded.stderr_tail[-300:]}")
+                return None
+            measured = run(measure_command(cmd[0], input_path, start, seconds, sample_path))
+            scores = parse_scores(measured.stderr_tail)
+            if not measured.success or metric not in scores:
+                logger.warning(f"⚠️ Подбор CRF: не удалось измерить {metric} ({measured.error})")
+                return None
+            values.append(scores[metric])
+            result.attempts.append({'crf': crf, 'start': start, **scores})
+        return sum(values) / len(values)
+
+    best: Optional[Tuple[int, float]] = None
+    fallback: Optional[Tuple[int, float]] = None
+    with tempfile.TemporaryDirectory(prefix='umc-crf-') as tmp:
+        low, high = min_crf, max_crf
+        while low <= high:
+            crf = (low + high) // 2
+            value = score(crf, Path(tmp))
+            if value is None:
+                return None
+            if value >= target:
+                best = (crf, value)
+                low = crf + 1
+            else:
+                fallback = (crf, value)
+                high = crf - 1
+
+    result.elapsed = time.monotonic() - start_time
+    result.reached = best is not None
+    # Цель недостижима: последней проверяется min_crf - лучшее доступное качество
+    result.crf, result.value = best or fallback
+    return result
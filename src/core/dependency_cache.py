@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Кэш результата проверки FFmpeg между запусками
+Cached ffmpeg availability check keyed by the binary's path, size and mtime
+"""
+
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = Path.home() / ".umconverter" / "dependency_cache.json"
+
+
+def binary_signature(binary: str) -> Optional[str]:
+    """Подпись исполняемого файла: путь, размер и время изменения (None - файл не найден)"""
+    resolved = shutil.which(binary) or (binary if os.path.isfile(binary) else None)
+    if not resolved:
+        return None
+    try:
+        st = os.stat(resolved)
+    except OSError:
+        return None
+    return f"{os.path.abspath(resolved)}|{st.st_size}|{st.st_mtime_ns}"
+
+
+class DependencyCache:
+    """
+    Результаты проверки FFmpeg, сохраненные на диск.
+
+    Запуск ffmpeg -version занимает заметное время; пока исполняемый файл не
+    изменился, повторно его запускать не нужно.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        """
+        Args:
+            path: Путь к JSON файлу кэша (по умолчанию ~/.umconverter)
+        """
+        self.path = Path(path) if path else DEFAULT_CACHE_PATH
+        self._lock = threading.Lock()
+        self._entries: Dict[str, bool] = self._load()
+
+    def _load(self) -> Dict[str, bool]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('entries', {})
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Не удалось прочитать кэш зависимостей {self.path}: {e}")
+            return {}
+
+    def save(self):
+        """Атомарное сохранение кэша на диск"""
+        with self._lock:
+            data = {'version': 1, 'entries': dict(self._entries)}
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить кэш зависимостей {self.path}: {e}")
+
+    def get(self, binary: str) -> Optional[bool]:
+        """Сохраненный результат проверки (None - проверка нужна)"""
+        signature = binary_signature(binary)
+        if signature is None:
+            return None
+        with self._lock:
+            return self._entries.get(signature)
+
+    def check_ffmpeg(self, converter, refresh: bool = False) -> bool:
+        """
+        Проверка FFmpeg с использованием кэша
+
+        Args:
+            converter: FFmpegConverter
+            refresh: Игнорировать сохраненный результат
+        """
+        if not refresh:
+            cached = self.get(converter.ffmpeg_path)
+            if cached is not None:
+                return cached
+
+        available = converter.check_ffmpeg()
+        signature = binary_signature(converter.ffmpeg_path)
+        # Отсутствующий файл не кэшируется: его проверка и так мгновенна
+        if signature is not None:
+            with self._lock:
+                self._entries[signature] = available
+            self.save()
+        return available
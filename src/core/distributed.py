@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Распределенная обработка пакета несколькими узлами через общую файловую систему
+Coordinator-free job table on a shared filesystem (NFS) using lock files with leases
+"""
+
+import hashlib
+import json
+import os
+import platform
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SharedJobTable:
+    """
+    Таблица заданий в общей папке:
+        <id>.lock  - задание захвачено узлом (mtime - время последнего продления аренды)
+        <id>.done  - задание завершено (успешно или с ошибкой), повторно не выполняется
+        nodes/     - файлы узлов, по их mtime определяется время файлового сервера
+
+    Захват выполняется атомарным созданием файла (O_CREAT | O_EXCL), перехват
+    просроченной аренды - атомарным переименованием lock-файла.
+    """
+
+    def __init__(self, jobs_dir: Path, node_id: str = None, lease_seconds: float = 300):
+        """
+        Args:
+            jobs_dir: Общая папка таблицы заданий
+            node_id: Идентификатор узла (по умолчанию имя хоста и PID)
+            lease_seconds: Срок аренды; непродленная аренда считается брошенной
+        """
+        self.jobs_dir = Path(jobs_dir)
+        self.node_id = node_id or f"{platform.node()}-{os.getpid()}"
+        self.lease_seconds = lease_seconds
+
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        (self.jobs_dir / "nodes").mkdir(exist_ok=True)
+        self._node_file = self.jobs_dir / "nodes" / f"{self.node_id}.alive"
+
+        # Удерживаемые аренды: id задания -> токен владельца
+        self._held: Dict[str, str] = {}
+        self._lost = set()
+        # Отмена выполнения задания при потере аренды
+        self._cancel: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat: Optional[threading.Thread] = None
+
+    @staticmethod
+    def job_id(input_path: Path, root: Path) -> str:
+        """Идентификатор задания: хеш пути относительно общей входной папки"""
+        try:
+            relative = Path(input_path).resolve().relative_to(Path(root).resolve())
+        except ValueError:
+            relative = Path(input_path).resolve()
+        return hashlib.sha1(relative.as_posix().encode('utf-8')).hexdigest()
+
+    def _lock_path(self, job_id: str) -> Path:
+        return self.jobs_dir / f"{job_id}.lock"
+
+    def _done_path(self, job_id: str) -> Path:
+        return self.jobs_dir / f"{job_id}.done"
+
+    def _server_now(self) -> float:
+        """Текущее время по часам файлового сервера (не зависит от рассинхронизации узлов)"""
+        self._node_file.touch()
+        return self._node_file.stat().st_mtime
+
+    def is_finished(self, job_id: str) -> bool:
+        """Задание уже выполнено каким-либо узлом"""
+        return self._done_path(job_id).exists()
+
+    def try_claim(self, job_id: str) -> bool:
+        """Попытка захватить задание; True, если узел стал владельцем аренды"""
+        if self.is_finished(job_id):
+            return False
+
+        for _ in range(2):
+            token = uuid.uuid4().hex
+            try:
+                fd = os.open(self._lock_path(job_id), os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            except FileExistsError:
+                if self._reclaim_expired(job_id):
+                    continue
+                return False
+
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'node': self.node_id, 'token': token}, f)
+
+            # Задание могло завершиться между проверкой и захватом
+            if self.is_finished(job_id):
+                self._release(job_id, token)
+                return False
+
+            with self._lock:
+                self._held[job_id] = token
+                self._lost.discard(job_id)
+                self._cancel[job_id] = threading.Event()
+            return True
+        return False
+
+    def _read_token(self, path: Path) -> Optional[str]:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('token')
+        except (OSError, ValueError):
+            return None
+
+    def _reclaim_expired(self, job_id: str) -> bool:
+        """Перехват аренды, которую владелец не продлевал дольше lease_seconds"""
+        lock_path = self._lock_path(job_id)
+        try:
+            stale_token = self._read_token(lock_path)
+            if self._server_now() - lock_path.stat().st_mtime < self.lease_seconds:
+                return False
+        except FileNotFoundError:
+            # Владелец успел освободить задание
+            return True
+
+        stale_path = self.jobs_dir / f"{job_id}.stale-{uuid.uuid4().hex}"
+        try:
+            os.rename(lock_path, stale_path)
+        except FileNotFoundError:
+            # Другой узел перехватил аренду раньше
+            return False
+
+        if self._read_token(stale_path) != stale_token:
+            # Переименован уже новый lock другого узла - возвращаем его на место
+            try:
+                os.link(stale_path, lock_path)
+                os.unlink(stale_path)
+            except OSError:
+                pass
+            return False
+
+        logger.warning(f"♻️ Перехвачена просроченная аренда задания {job_id[:12]}")
+        try:
+            os.unlink(stale_path)
+        except OSError:
+            pass
+        return True
+
+    def owns(self, job_id: str) -> bool:
+        """Аренда задания все еще принадлежит этому узлу"""
+        with self._lock:
+            return job_id in self._held and job_id not in self._lost
+
+    def cancel_event(self, job_id: str) -> Optional[threading.Event]:
+        """Событие, которое устанавливается при потере аренды захваченного задания"""
+        with self._lock:
+            return self._cancel.get(job_id)
+
+    def _mark_lost(self, job_id: str):
+        with self._lock:
+            self._lost.add(job_id)
+            event = self._cancel.get(job_id)
+        if event is not None:
+            event.set()
+
+    def renew_all(self):
+        """Продление всех удерживаемых аренд; при потере аренды выполнение задания отменяется"""
+        with self._lock:
+            held = dict(self._held)
+        for job_id, token in held.items():
+            lock_path = self._lock_path(job_id)
+            if self._read_token(lock_path) != token:
+                logger.warning(f"⚠️ Аренда задания {job_id[:12]} потеряна")
+                self._mark_lost(job_id)
+                continue
+            try:
+                os.utime(lock_path)
+            except OSError:
+                self._mark_lost(job_id)
+
+    def complete(self, job_id: str, input_path: Path, success: bool,
+                 output: Tuple[Path, Path] = None) -> bool:
+        """
+        Фиксация результата задания
+
+        Args:
+            job_id: Идентификатор задания
+            input_path: Входной файл
+            success: Конвертация успешна
+            output: (временный файл узла, итоговый путь); временный файл переносится
+                на место только при действующей аренде, иначе удаляется
+
+        Returns:
+            bool: False, если аренда была потеряна и результат записан не будет
+        """
+        with self._lock:
+            token = self._held.pop(job_id, None)
+            lost = job_id in self._lost
+            self._lost.discard(job_id)
+            self._cancel.pop(job_id, None)
+        if token is None or lost or self._read_token(self._lock_path(job_id)) != token:
+            logger.warning(f"⚠️ Результат {input_path.name} не записан: аренда потеряна")
+            if output is not None:
+                _remove(output[0])
+            return False
+
+        if output is not None:
+            if success:
+                os.replace(output[0], output[1])
+            else:
+                _remove(output[0])
+
+        record = {
+            'input': str(input_path),
+            'node': self.node_id,
+            'success': success,
+            'finished_at': time.time(),
+        }
+        tmp_path = self.jobs_dir / f"{job_id}.done.{uuid.uuid4().hex}"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(record, f, ensure_ascii=False)
+        os.replace(tmp_path, self._done_path(job_id))
+        self._release(job_id, token)
+        return True
+
+    def _release(self, job_id: str, token: str):
+        if self._read_token(self._lock_path(job_id)) == token:
+            try:
+                self._lock_path(job_id).unlink()
+            except FileNotFoundError:
+                pass
+
+    def start_heartbeat(self):
+        """Запуск фонового продления аренд"""
+        def heartbeat():
+            while not self._stop.wait(self.lease_seconds / 3):
+                try:
+                    self.renew_all()
+                    self._node_file.touch()
+                except OSError as e:
+                    logger.error(f"Ошибка продления аренды: {e}")
+
+        self._heartbeat = threading.Thread(target=heartbeat, name="lease-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def stop_heartbeat(self):
+        """Остановка фонового продления аренд"""
+        self._stop.set()
+        if self._heartbeat:
+            self._heartbeat.join()
+
+
+def _remove(path: Path):
+    try:
+        Path(path).unlink()
+    except FileNotFoundError:
+        pass
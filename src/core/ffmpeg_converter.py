@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+Конвертация любых форматов через FFmpeg
+FFmpeg-based converter shared by the GUI and the job service
+"""
+
+import json
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+import logging
+
+from core.crf_search import DEFAULT_SAMPLE_SECONDS, DEFAULT_SAMPLES, search_crf
+from core.ffmpeg_runner import (DEFAULT_STALL_TIMEOUT, DEFAULT_TIMEOUT_BASE,
+                                DEFAULT_TIMEOUT_FACTOR, job_timeout, run_ffmpeg)
+from core.media_probe import find_ffprobe, probe_media
+from core.metrics import CONVERSION_METRICS
+from core.quarantine import Quarantine
+from core.tracing import ffmpeg_attributes
+
+logger = logging.getLogger(__name__)
+
+class FFmpegConverter:
+    """Класс для работы с FFmpeg"""
+    
+    def __init__(self):
+        self.supported_formats = self._get_supported_formats()
+        self.ffmpeg_path = self._find_ffmpeg()
+        
+        # Защита от зависших и бесконечно долгих конвертаций
+        self.timeout_base = DEFAULT_TIMEOUT_BASE
+        self.timeout_factor = DEFAULT_TIMEOUT_FACTOR
+        self.stall_timeout = DEFAULT_STALL_TIMEOUT
+        self.quarantine = Quarantine()
+        # Трассировка заданий (core.tracing.Tracer), включается вызывающим кодом
+        self.tracer = None
+        # Подбор CRF видео по фрагментам: (метрика, цель) из crf_search.parse_target
+        self.per_title = None
+        self.per_title_samples = DEFAULT_SAMPLES
+        self.per_title_seconds = DEFAULT_SAMPLE_SECONDS
+        
+    def _find_ffmpeg(self) -> str:
+        """Поиск FFmpeg в системе или локальной сборке"""
+        # Сначала проверяем локальную сборку
+        local_paths = [
+            "bin/bin/ffmpeg.exe",  # Windows
+            "bin/bin/ffmpeg",      # Linux/macOS
+            "bin/ffmpeg/bin/ffmpeg.exe",  # Скачанная версия
+            "ffmpeg.bat",          # Windows wrapper
+            "ffmpeg.sh"            # Linux/macOS wrapper
+        ]
+        
+        for path in local_paths:
+            if Path(path).exists():
+                return path
+        
+        # Если локальная версия не найдена, используем системную
+        return "ffmpeg"
+    
+    def _get_supported_formats(self) -> Dict[str, List[str]]:
+        """Получение поддерживаемых форматов через FFmpeg"""
+        formats = {
+            'video': ['mp4', 'avi', 'mov', 'mkv', 'wmv', 'flv', 'webm', 'm4v', '3gp', 'ogv'],
+            'audio': ['mp3', 'wav', 'aac', 'ogg', 'flac', 'm4a', 'wma', 'opus'],
+            'image': ['jpg', 'jpeg', 'png', 'bmp', 'tiff', 'webp', 'gif', 'ico', 'svg']
+        }
+        return formats
+    
+    def check_ffmpeg(self) -> bool:
+        """Проверка наличия FFmpeg"""
+        try:
+            if self.ffmpeg_path.endswith('.bat') or self.ffmpeg_path.endswith('.sh'):
+                # Для скриптов-оберток
+                result = subprocess.run([self.ffmpeg_path, '-version'], 
+                                      capture_output=True, text=True)
+            else:
+                # Для прямого вызова
+                result = subprocess.run([self.ffmpeg_path, '-version'], 
+                                      capture_output=True, text=True)
+            if result.returncode != 0:
+                return False
+        except FileNotFoundError:
+            return False
+        
+        try:
+            # Без ffprobe длительность неизвестна: остается только сторож зависания
+            subprocess.run([find_ffprobe(self.ffmpeg_path), '-version'], capture_output=True, text=True)
+        except FileNotFoundError:
+            logger.warning("⚠️ ffprobe не найден: длительность медиа неизвестна, ограничение времени отключено")
+        return True
+    
+    def get_file_info(self, file_path: str) -> Dict:
+        """Получение информации о файле через FFmpeg"""
+        try:
+            # Определяем путь к ffprobe
+            ffprobe_path = self.ffmpeg_path.replace('ffmpeg', 'ffprobe')
+            if not Path(ffprobe_path).exists():
+                ffprobe_path = 'ffprobe'  # Используем системную версию
+            
+            cmd = [
+                ffprobe_path, '-v', 'quiet', '-print_format', 'json',
+                '-show_format', '-show_streams', str(file_path)
+            ]
+            result = subprocess.run(cmd, capture_output=True, text=True)
+            
+            if result.returncode == 0:
+                return json.loads(result.stdout)
+            else:
+                return {}
+        except Exception as e:
+            logger.error(f"Ошибка получения информации о файле: {e}")
+            return {}
+    
+    def build_command(self, input_path: str, output_path: str,
+                      video_codec: str = None, audio_codec: str = None,
+                      quality: int = 80, safe_mode: bool = False, crf: int = None) -> List[str]:
+        """
+        Формирование командной строки FFmpeg для конвертации
+        
+        Args:
+            input_path: Путь к входному файлу
+            output_path: Путь к выходному файлу
+            video_codec: Видеокодек (если None - автоматический выбор)
+            audio_codec: Аудиокодек (если None - автоматический выбор)
+            quality: Качество (1-100)
+            safe_mode: Резервный профиль: пропуск поврежденных данных и быстрый пресет кодирования
+            crf: CRF видео (если None - по quality, для WebM 30)
+        """
+        # Базовые параметры
+        cmd = [self.ffmpeg_path]
+        if safe_mode:
+            cmd.extend(['-fflags', '+genpts+discardcorrupt', '-err_detect', 'ignore_err'])
+        cmd.extend(['-i', str(input_path)])
+        
+        # Определяем тип файла по расширению
+        input_ext = Path(input_path).suffix.lower()
+        output_ext = Path(output_path).suffix.lower()
+        
+        # Настройки для видео
+        if input_ext in ['.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm']:
+            if video_codec:
+                cmd.extend(['-c:v', video_codec])
+            else:
+                # Автоматический выбор кодека
+                if output_ext == '.webm':
+                    cmd.extend(['-c:v', 'libvpx-vp9'])
+                elif output_ext == '.mp4':
+                    cmd.extend(['-c:v', 'libx264'])
+                elif output_ext == '.avi':
+                    cmd.extend(['-c:v', 'libxvid'])
+            
+            if audio_codec:
+                cmd.extend(['-c:a', audio_codec])
+            else:
+                if output_ext == '.webm':
+                    cmd.extend(['-c:a', 'libopus'])
+                else:
+                    cmd.extend(['-c:a', 'aac'])
+            
+            # Настройки качества
+            if output_ext == '.webm':
+                cmd.extend(['-crf', str(crf if crf is not None else 30)])
+                if safe_mode:
+                    cmd.extend(['-b:v', '0', '-deadline', 'realtime', '-cpu-used', '8'])
+            else:
+                cmd.extend(['-crf', str(crf if crf is not None else 31 - int(quality * 0.31))])
+                if safe_mode and output_ext == '.mp4':
+                    cmd.extend(['-preset', 'veryfast'])
+        
+        # Настройки для аудио
+        elif input_ext in ['.mp3', '.wav', '.aac', '.ogg', '.flac', '.m4a']:
+            if audio_codec:
+                cmd.extend(['-c:a', audio_codec])
+            else:
+                if output_ext == '.mp3':
+                    cmd.extend(['-c:a', 'libmp3lame'])
+                elif output_ext == '.aac':
+                    cmd.extend(['-c:a', 'aac'])
+                elif output_ext == '.ogg':
+                    cmd.extend(['-c:a', 'libvorbis'])
+                elif output_ext == '.opus':
+                    cmd.extend(['-c:a', 'libopus'])
+            
+            # Настройки качества для аудио
+            if output_ext == '.mp3':
+                cmd.extend(['-b:a', f'{quality * 3}k'])
+            elif output_ext == '.aac':
+                cmd.extend(['-b:a', f'{quality * 2}k'])
+        
+        # Настройки для изображений
+        elif input_ext in ['.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp']:
+            if output_ext == '.webp':
+                cmd.extend(['-quality', str(quality)])
+            elif output_ext == '.jpg':
+                cmd.extend(['-q:v', str(31 - int(quality * 0.31))])
+        
+        # Выходной файл
+        cmd.extend(['-y', str(output_path)])
+        
+        return cmd
+    
+    def convert_file(self, input_path: str, output_path: str, 
+                    video_codec: str = None, audio_codec: str = None,
+                    quality: int = 80, callback=None,
+                    cancel_event: threading.Event = None,
+                    queued_at: float = None, trace_id: str = None,
+                    scan: Tuple[int, int, int] = None) -> bool:
+        """
+        Конвертация файла через FFmpeg
+        
+        Args:
+            input_path: Путь к входному файлу
+            output_path: Путь к выходному файлу
+            video_codec: Видеокодек (если None - автоматический выбор)
+            audio_codec: Аудиокодек (если None - автоматический выбор)
+            quality: Качество (1-100)
+            callback: Функция обратного вызова для прогресса
+            cancel_event: Событие отмены; при установке процесс FFmpeg завершается
+            queued_at: Время постановки в очередь (time.time) для спана ожидания
+            trace_id: Идентификатор трассы (например, id задания сервиса)
+            scan: Поиск, который нашел файл (начало, конец в time_ns, найдено файлов)
+        """
+        kind = self.media_type(input_path)
+        progress = {}
+        
+        def on_progress(block: Dict):
+            progress.update(block)
+            if callback:
+                callback(block)
+        
+        CONVERSION_METRICS.job_started(kind)
+        start_time = time.monotonic()
+        success = False
+        error = None
+        trace = None
+        if self.tracer is not None:
+            trace = self.tracer.start_trace(f"convert {Path(input_path).name}", {
+                'umconverter.input': str(input_path), 'umconverter.kind': kind,
+                'umconverter.quality': quality,
+            }, trace_id)
+            if scan is not None:
+                trace.add_span('scan', scan[0], scan[1], {'umconverter.scan.files': scan[2]})
+            if queued_at is not None:
+                trace.add_span('queue', int(queued_at * 1e9), time.time_ns())
+        try:
+            # Ограничение времени по длительности медиа
+            probe_start_ns = time.time_ns()
+            duration = probe_media(input_path, find_ffprobe(self.ffmpeg_path)).get('duration', 0.0)
+            if trace is not None:
+                trace.add_span('probe', probe_start_ns, time.time_ns(), {'media.duration': duration})
+            timeout = job_timeout(duration, self.timeout_factor, self.timeout_base)
+            crf = None
+            if self.per_title and kind == 'video':
+                crf = self._search_crf(input_path, output_path, video_codec, audio_codec, quality,
+                                       duration, cancel_event, trace)
+            
+            # Первая попытка - обычный профиль, вторая - резервный
+            for safe_mode in (False, True):
+                cmd = self.build_command(input_path, output_path, video_codec, audio_codec,
+                                         quality, safe_mode=safe_mode, crf=crf)
+                ffmpeg_start_ns = time.time_ns()
+                result = run_ffmpeg(cmd, timeout, self.stall_timeout, on_progress, cancel_event)
+                if trace is not None:
+                    trace.add_span('ffmpeg', ffmpeg_start_ns, time.time_ns(),
+                                   dict(ffmpeg_attributes(cmd, result), safe_mode=safe_mode),
+                                   None if result.success else result.error)
+                
+                if result.success:
+                    verify_start_ns = time.time_ns()
+                    output_size = _file_size(output_path)
+                    if trace is not None:
+                        trace.add_span('verify', verify_start_ns, time.time_ns(),
+                                       {'umconverter.bytes_out': output_size},
+                                       None if output_size else 'пустой результат')
+                    if not output_size:
+                        # FFmpeg завершился успешно, но файла нет или он пустой
+                        error = "пустой результат"
+                        logger.error(f"❌ Ошибка конвертации {input_path}: {error}")
+                        return False
+                    logger.info(f"✅ Успешно конвертирован: {input_path} -> {output_path}",
+                                extra={'file': str(input_path)})
+                    success = True
+                    return True
+                if result.cancelled:
+                    logger.info(f"⏹️ Конвертация отменена: {input_path}")
+                    error = result.error
+                    return False
+                
+                logger.error(f"❌ Ошибка конвертации {input_path} ({result.error}): {result.stderr_tail}")
+                if not safe_mode:
+                    logger.warning(f"🔁 Повтор с резервным профилем: {input_path}")
+            
+            error = result.error
+            self.quarantine.add(Path(input_path), result.error, result.stderr_tail)
+            return False
+                
+        except Exception as e:
+            error = str(e)
+            logger.error(f"❌ Ошибка конвертации {input_path}: {str(e)}")
+            return False
+        finally:
+            bytes_in = _file_size(input_path)
+            bytes_out = _file_size(output_path) if success else 0
+            CONVERSION_METRICS.job_finished(
+                kind, success, time.monotonic() - start_time, bytes_in, bytes_out,
+                progress.get('fps') if kind == 'video' else None
+            )
+            if trace is not None:
+                trace.finish(success, error, {
+                    'umconverter.output': str(output_path) if success else None,
+                    'umconverter.bytes_in': bytes_in,
+                    'umconverter.bytes_out': bytes_out,
+                    'ffmpeg.fps': progress.get('fps'),
+                })
+    
+    def _search_crf(self, input_path: str, output_path: str, video_codec: str, audio_codec: str,
+                    quality: int, duration: float, cancel_event: threading.Event = None,
+                    trace=None):
+        """Подбор CRF по фрагментам видео; None - CRF по quality"""
+        if '-crf' not in self.build_command(input_path, output_path, video_codec, audio_codec, quality):
+            return None
+        
+        metric, target = self.per_title
+        start_ns = time.time_ns()
+        search = search_crf(
+            lambda crf, path: self.build_command(input_path, path, video_codec, audio_codec, quality, crf=crf),
+            input_path, Path(output_path).suffix, duration, metric, target,
+            samples=self.per_title_samples, length=self.per_title_seconds,
+            stall_timeout=self.stall_timeout, cancel_event=cancel_event
+        )
+        if trace is not None:
+            trace.add_span('search', start_ns, time.time_ns(), {
+                'metric': metric, 'target': target,
+                'crf': search.crf if search else None, 'value': search.value if search else None,
+            }, None if search else 'CRF не подобран')
+        if search is None:
+            logger.warning(f"⚠️ CRF не подобран, используется CRF по качеству: {input_path}")
+            return None
+        logger.info(f"🎯 {Path(input_path).name}: CRF {search.crf} ({metric.upper()} {search.value:.4f}, "
+                    f"подбор {search.elapsed:.1f}с)", extra={'file': str(input_path)})
+        return search.crf
+    
+    def media_type(self, file_path: str) -> str:
+        """Тип файла по расширению (video, audio, image) для метрик"""
+        extension = Path(file_path).suffix.lower().lstrip('.')
+        for kind, extensions in self.supported_formats.items():
+            if extension in extensions:
+                return kind
+        return 'other'
+
+
+def _file_size(path: str) -> int:
+    try:
+        return Path(path).stat().st_size
+    except OSError:
+        return 0
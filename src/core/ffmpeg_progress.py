@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Разбор машиночитаемого прогресса FFmpeg (-progress pipe:1)
+Parser for the ffmpeg -progress key=value stream
+"""
+
+from typing import Dict, List, Optional
+
+# Аргументы FFmpeg для вывода прогресса в stdout вместо строки статистики в stderr
+PROGRESS_ARGS = ['-progress', 'pipe:1', '-nostats']
+
+
+def with_progress(cmd: List[str]) -> List[str]:
+    """Добавление аргументов прогресса сразу после пути к FFmpeg"""
+    return cmd[:1] + PROGRESS_ARGS + cmd[1:]
+
+
+class ProgressParser:
+    """Накопление строк key=value в блоки, завершаемые строкой progress=..."""
+
+    def __init__(self):
+        self._block: Dict[str, str] = {}
+
+    def feed(self, line: str) -> Optional[Dict]:
+        """
+        Обработка одной строки прогресса
+
+        Returns:
+            Dict: Готовый блок (frame, fps, speed, out_time_seconds, progress) или None
+        """
+        key, sep, value = line.strip().partition('=')
+        if not sep:
+            return None
+        self._block[key] = value.strip()
+        if key != 'progress':
+            return None
+
+        block, self._block = self._block, {}
+        return {
+            'frame': _to_int(block.get('frame')),
+            'fps': _to_float(block.get('fps')),
+            'speed': _to_float(block.get('speed', '').rstrip('x')),
+            # out_time_us есть в новых версиях, out_time_ms в старых (на самом деле тоже микросекунды)
+            'out_time_seconds': _to_int(block.get('out_time_us', block.get('out_time_ms'))) / 1e6,
+            'total_size': _to_int(block.get('total_size')),
+            'progress': block.get('progress'),
+        }
+
+
+def _to_int(value: Optional[str]) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _to_float(value: Optional[str]) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Запуск FFmpeg с ограничением времени и сторожем зависания
+Blocking ffmpeg runner with wall-clock timeout and stall watchdog
+"""
+
+import collections
+import os
+import signal
+import subprocess
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+import logging
+
+from core.ffmpeg_progress import ProgressParser, with_progress
+from core.job_report import rusage_rss_mb
+
+logger = logging.getLogger(__name__)
+
+# Сколько последних строк stderr хранить для диагностики
+STDERR_TAIL_LINES = 50
+
+# Отдельная группа процессов, чтобы вместе с оберткой ffmpeg.sh завершался и сам ffmpeg
+NEW_PROCESS_GROUP = os.name == 'posix'
+
+# Ограничение времени по умолчанию: базовое время + множитель от длительности медиа
+DEFAULT_TIMEOUT_BASE = 60.0
+DEFAULT_TIMEOUT_FACTOR = 10.0
+DEFAULT_STALL_TIMEOUT = 60.0
+
+
+def job_timeout(duration: float, factor: float = DEFAULT_TIMEOUT_FACTOR,
+                base: float = DEFAULT_TIMEOUT_BASE) -> Optional[float]:
+    """
+    Ограничение времени задания по длительности медиа (None - без ограничения)
+
+    Неизвестная длительность (нет ffprobe или он не смог прочитать файл) не
+    означает короткий файл: такие задания ограничиваются только сторожем зависания.
+    """
+    if not factor or factor <= 0 or duration <= 0:
+        return None
+    return base + factor * max(duration, 0.0)
+
+
+class FFmpegRunResult:
+    """Результат запуска FFmpeg"""
+
+    def __init__(self):
+        self.returncode: Optional[int] = None
+        self.stderr_tail = ""
+        self.elapsed = 0.0
+        self.timed_out = False
+        self.stalled = False
+        self.cancelled = False
+        # Ресурсы процесса FFmpeg (только POSIX, иначе None)
+        self.cpu_seconds: Optional[float] = None
+        self.peak_rss_mb: Optional[float] = None
+
+    @property
+    def success(self) -> bool:
+        return self.returncode == 0 and not (self.timed_out or self.stalled or self.cancelled)
+
+    @property
+    def error(self) -> str:
+        """Краткое описание причины ошибки"""
+        if self.timed_out:
+            return f"превышено время ожидания ({self.elapsed:.0f}с)"
+        if self.stalled:
+            return "нет прогресса FFmpeg (зависание)"
+        if self.cancelled:
+            return "отменено"
+        if self.returncode:
+            return f"код выхода {self.returncode}"
+        return ""
+
+
+def _kill(process: subprocess.Popen):
+    """Принудительное завершение процесса вместе с его дочерними процессами"""
+    try:
+        if NEW_PROCESS_GROUP:
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _wait(process: subprocess.Popen, result: FFmpegRunResult, timeout: float = None) -> bool:
+    """
+    Ожидание завершения процесса; на POSIX через wait4, чтобы получить
+    процессорное время и пиковую память именно этого процесса FFmpeg
+
+    Returns:
+        bool: True, если процесс завершился
+    """
+    if not hasattr(os, 'wait4') or process.returncode is not None:
+        try:
+            process.wait(timeout=timeout)
+            return True
+        except subprocess.TimeoutExpired:
+            return False
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        try:
+            pid, status, usage = os.wait4(process.pid, os.WNOHANG if deadline is not None else 0)
+        except ChildProcessError:
+            # Процесс уже собран кем-то другим
+            process.wait()
+            return True
+        if pid:
+            # Popen должен знать код выхода, иначе он попытается собрать процесс повторно
+            process.returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+            result.cpu_seconds = usage.ru_utime + usage.ru_stime
+            result.peak_rss_mb = rusage_rss_mb(usage)
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(min(0.02, max(0.0, deadline - time.monotonic())))
+
+
+def run_ffmpeg(cmd: List[str], timeout: float = None, stall_timeout: float = None,
+               on_progress: Callable[[Dict], None] = None,
+               cancel_event: threading.Event = None) -> FFmpegRunResult:
+    """
+    Запуск FFmpeg с чтением прогресса (-progress pipe:1)
+
+    Args:
+        cmd: Командная строка FFmpeg (аргументы прогресса добавляются автоматически)
+        timeout: Ограничение общего времени работы (секунды)
+        stall_timeout: Процесс завершается, если прогресс не растет столько секунд
+        on_progress: Вызывается с каждым блоком прогресса
+        cancel_event: Событие отмены
+
+    Returns:
+        FFmpegRunResult
+    """
+    result = FFmpegRunResult()
+    start_time = time.monotonic()
+    process = subprocess.Popen(
+        with_progress(cmd), stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True, errors='replace',
+        start_new_session=NEW_PROCESS_GROUP
+    )
+
+    stderr_tail = collections.deque(maxlen=STDERR_TAIL_LINES)
+    # Время последнего продвижения и достигнутая позиция (frame, out_time, size)
+    state = {'last_advance': start_time, 'position': (0, 0.0, 0)}
+
+    def read_progress():
+        parser = ProgressParser()
+        for line in process.stdout:
+            block = parser.feed(line)
+            if block is None:
+                continue
+            position = (block['frame'], block['out_time_seconds'], block['total_size'])
+            if position > state['position']:
+                state['position'] = position
+                state['last_advance'] = time.monotonic()
+            if on_progress:
+                try:
+                    on_progress(block)
+                except Exception as e:
+                    logger.debug(f"Ошибка обработчика прогресса: {e}")
+
+    def read_stderr():
+        for line in process.stderr:
+            stderr_tail.append(line.rstrip())
+
+    readers = [threading.Thread(target=read_progress, daemon=True),
+               threading.Thread(target=read_stderr, daemon=True)]
+    for reader in readers:
+        reader.start()
+
+    while True:
+        if _wait(process, result, timeout=0.25):
+            break
+
+        now = time.monotonic()
+        if cancel_event is not None and cancel_event.is_set():
+            result.cancelled = True
+        elif timeout and now - start_time > timeout:
+            result.timed_out = True
+        elif stall_timeout and now - state['last_advance'] > stall_timeout:
+            result.stalled = True
+        else:
+            continue
+
+        _kill(process)
+        _wait(process, result)
+        break
+
+    # После завершения процесса каналы закрываются, но их могут держать внуки обертки
+    for reader in readers:
+        reader.join(timeout=5)
+
+    result.returncode = process.returncode
+    result.elapsed = time.monotonic() - start_time
+    result.stderr_tail = "\n".join(stderr_tail)
+    return result
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Рекурсивный поиск медиафайлов пакетами для фоновой загрузки
+Recursive os.scandir-based file discovery that yields results in batches
+"""
+
+import os
+import threading
+from pathlib import Path
+from typing import Iterable, Iterator, List, Set
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 256
+
+
+def split_drop_data(data: str) -> List[str]:
+    """
+    Разбор данных drag&drop (список Tcl: пути с пробелами заключены в фигурные скобки)
+
+    Разбор выполняется без интерпретатора Tcl, поэтому его можно вызывать из любого потока.
+    """
+    paths = []
+    i, length = 0, len(data)
+    while i < length:
+        if data[i].isspace():
+            i += 1
+            continue
+
+        if data[i] == '{':
+            depth, start = 1, i + 1
+            i += 1
+            while i < length and depth:
+                if data[i] == '{':
+                    depth += 1
+                elif data[i] == '}':
+                    depth -= 1
+                i += 1
+            paths.append(data[start:i - 1] if depth == 0 else data[start:])
+            continue
+
+        token = []
+        while i < length and not data[i].isspace():
+            # Экранированные символы (например, пробел как "\ ")
+            if data[i] == '\\' and i + 1 < length:
+                i += 1
+            token.append(data[i])
+            i += 1
+        paths.append(''.join(token))
+    return [path for path in paths if path]
+
+
+def scan_paths(paths: Iterable[str], extensions: Set[str], batch_size: int = DEFAULT_BATCH_SIZE,
+               cancel_event: threading.Event = None) -> Iterator[List[Path]]:
+    """
+    Рекурсивный обход файлов и папок с выдачей найденных файлов пакетами
+
+    os.scandir возвращает тип записи вместе с именем, поэтому отдельный stat
+    для каждого файла не нужен. Символические ссылки на папки не обходятся.
+
+    Args:
+        paths: Файлы и папки
+        extensions: Допустимые расширения в нижнем регистре (с точкой)
+        batch_size: Размер пакета
+        cancel_event: Событие отмены; обход прекращается между записями
+
+    Yields:
+        List[Path]: Очередной пакет найденных файлов
+    """
+    batch: List[Path] = []
+    # Один и тот же файл может прийти и сам, и внутри выбранной папки
+    seen: Set[str] = set()
+
+    def add(file_path: str):
+        key = os.path.normcase(os.path.abspath(file_path))
+        if key not in seen:
+            seen.add(key)
+            batch.append(Path(file_path))
+
+    def cancelled() -> bool:
+        return cancel_event is not None and cancel_event.is_set()
+
+    for path in paths:
+        if cancelled():
+            return
+
+        if os.path.isfile(path):
+            if os.path.splitext(path)[1].lower() in extensions:
+                add(path)
+        elif os.path.isdir(path):
+            stack = [path]
+            while stack:
+                if cancelled():
+                    return
+                directory = stack.pop()
+                try:
+                    with os.scandir(directory) as it:
+                        entries = sorted(it, key=lambda entry: entry.name)
+                except OSError as e:
+                    logger.debug(f"Папка недоступна {directory}: {e}")
+                    continue
+
+                subdirs = []
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif entry.is_file() and os.path.splitext(entry.name)[1].lower() in extensions:
+                            add(entry.path)
+                    except OSError:
+                        continue
+
+                    if len(batch) >= batch_size:
+                        yield batch
+                        batch = []
+
+                # Стек обходит подпапки в алфавитном порядке
+                stack.extend(reversed(subdirs))
+        else:
+            logger.warning(f"Файл не найден: {path}")
+
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
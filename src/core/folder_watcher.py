@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Наблюдение за папкой с отложенной обработкой файлов, которые еще записываются
+Drop-folder watcher: inotify on Linux, polling everywhere else
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Set, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Флаги inotify (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = os.O_NONBLOCK
+
+_EVENT_HEADER = struct.Struct('iIII')
+
+# Полный просмотр папки в режиме inotify на случай потерянных событий
+DEFAULT_RESCAN_INTERVAL = 60.0
+
+
+def _load_inotify():
+    """Загрузка функций inotify из libc (None, если недоступно)"""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class FolderWatcher:
+    """Наблюдатель за папкой, выдающий только полностью записанные файлы"""
+
+    def __init__(self, directory: Path, extensions: Set[str],
+                 callback: Callable[[Path], None],
+                 settle_seconds: float = 2.0, poll_interval: float = 1.0,
+                 use_inotify: bool = True, rescan_interval: float = DEFAULT_RESCAN_INTERVAL):
+        """
+        Args:
+            directory: Наблюдаемая папка
+            extensions: Расширения файлов (в нижнем регистре, с точкой)
+            callback: Вызывается для каждого готового файла
+            settle_seconds: Сколько размер файла должен оставаться неизменным
+            poll_interval: Период опроса папки в режиме polling
+            use_inotify: Использовать inotify, если он доступен
+            rescan_interval: Период полного просмотра папки в режиме inotify
+        """
+        self.directory = Path(directory)
+        self.extensions = {ext.lower() for ext in extensions}
+        self.callback = callback
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self.rescan_interval = rescan_interval
+        self.stop_event = threading.Event()
+
+        self._libc = _load_inotify() if use_inotify else None
+        # Файлы, ожидающие стабилизации: путь -> (размер, mtime, время последнего изменения)
+        self._pending: Dict[Path, Tuple[int, float, float]] = {}
+        # Уже выданные версии файлов, которые еще лежат в папке: путь -> (размер, mtime)
+        self._emitted: Dict[Path, Tuple[int, float]] = {}
+
+    @property
+    def backend(self) -> str:
+        """Используемый механизм наблюдения"""
+        return "inotify" if self._libc else "polling"
+
+    def stop(self):
+        """Остановка наблюдения"""
+        self.stop_event.set()
+
+    def _matches(self, path: Path) -> bool:
+        return path.suffix.lower() in self.extensions and not path.name.startswith('.')
+
+    def _forget(self, path: Path):
+        """Файл удален или перемещен из папки"""
+        self._pending.pop(path, None)
+        self._emitted.pop(path, None)
+
+    def _touch(self, path: Path, now: float, ready: bool = False):
+        """Отметка об изменении файла; ready=True для событий завершения записи"""
+        try:
+            st = path.stat()
+        except OSError:
+            self._forget(path)
+            return
+        if self._emitted.get(path) == (st.st_size, st.st_mtime):
+            return
+
+        previous = self._pending.get(path)
+        if ready:
+            # Запись завершена: ждем только короткую паузу на случай повторного открытия
+            changed_at = now - self.settle_seconds + min(self.settle_seconds, 0.5)
+        elif previous is None or previous[:2] != (st.st_size, st.st_mtime):
+            changed_at = now
+        else:
+            changed_at = previous[2]
+        self._pending[path] = (st.st_size, st.st_mtime, changed_at)
+
+    def _flush_ready(self, now: float):
+        """Выдача файлов, размер которых стабилен settle_seconds"""
+        for path, (size, mtime, changed_at) in list(self._pending.items()):
+            if now - changed_at < self.settle_seconds:
+                continue
+            try:
+                st = path.stat()
+            except OSError:
+                self._forget(path)
+                continue
+            if (st.st_size, st.st_mtime) != (size, mtime):
+                self._pending[path] = (st.st_size, st.st_mtime, now)
+                continue
+
+            del self._pending[path]
+            self._emitted[path] = (size, mtime)
+            try:
+                self.callback(path)
+            except Exception as e:
+                logger.error(f"❌ Ошибка обработки {path.name}: {e}")
+
+    def _scan(self, now: float):
+        """Полный просмотр папки; исчезнувшие файлы забываются"""
+        present = set()
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    path = Path(entry.path)
+                    if entry.is_file() and self._matches(path):
+                        present.add(path)
+                        self._touch(path, now)
+        except OSError as e:
+            logger.error(f"Не удалось прочитать папку {self.directory}: {e}")
+            return
+        for path in (set(self._emitted) | set(self._pending)) - present:
+            self._forget(path)
+
+    def run(self):
+        """Блокирующий цикл наблюдения (до вызова stop())"""
+        logger.info(f"👀 Наблюдение за {self.directory} ({self.backend})")
+        if self._libc:
+            self._run_inotify()
+        else:
+            self._run_polling()
+
+    def _run_polling(self):
+        while not self.stop_event.is_set():
+            now = time.monotonic()
+            self._scan(now)
+            self._flush_ready(now)
+            self.stop_event.wait(self.poll_interval)
+
+    def _run_inotify(self):
+        fd = self._libc.inotify_init1(IN_NONBLOCK)
+        if fd < 0:
+            logger.warning("inotify недоступен, переключаемся на опрос папки")
+            self._libc = None
+            return self._run_polling()
+
+        try:
+            mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_MODIFY | IN_DELETE | IN_MOVED_FROM
+            if self._libc.inotify_add_watch(fd, os.fsencode(str(self.directory)), mask) < 0:
+                logger.warning("inotify_add_watch не удался, переключаемся на опрос папки")
+                self._libc = None
+                return self._run_polling()
+
+            # Файлы, появившиеся до запуска наблюдения
+            last_scan = time.monotonic()
+            self._scan(last_scan)
+
+            while not self.stop_event.is_set():
+                readable, _, _ = select.select([fd], [], [], self.poll_interval)
+                now = time.monotonic()
+                if readable and self._read_events(fd, now):
+                    last_scan = now
+                elif now - last_scan >= self.rescan_interval:
+                    # Редкий полный просмотр страхует от событий, потерянных ядром
+                    self._scan(now)
+                    last_scan = now
+                self._flush_ready(now)
+        finally:
+            os.close(fd)
+
+    def _read_events(self, fd: int, now: float) -> bool:
+        """Разбор событий inotify; True, если очередь ядра переполнилась и папка просмотрена заново"""
+        try:
+            data = os.read(fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+
+        overflow = False
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            _, event_mask, _, name_len = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + name_len].rstrip(b'\0')
+            offset += name_len
+            if event_mask & IN_Q_OVERFLOW:
+                overflow = True
+                continue
+            if not name:
+                continue
+
+            path = self.directory / os.fsdecode(name)
+            if event_mask & (IN_DELETE | IN_MOVED_FROM):
+                self._forget(path)
+            elif self._matches(path):
+                self._touch(path, now, ready=bool(event_mask & (IN_CLOSE_WRITE | IN_MOVED_TO)))
+
+        if overflow:
+            logger.warning("⚠️ Очередь событий inotify переполнена, папка просматривается заново")
+            self._scan(now)
+        return overflow
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Выбор параметров WebP: режим (lossy, lossless, near-lossless) и подбор качества по целевому SSIM
+WebP mode selection from cheap image statistics, SSIM (luma, 8x8 blocks) with Pillow only,
+and a per-image WebP quality binary search
+"""
+
+import io
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from PIL import Image, ImageMath
+
+logger = logging.getLogger(__name__)
+
+# Окно SSIM: неперекрывающиеся блоки 8x8 по яркости
+SSIM_BLOCK = 8
+# Константы SSIM для 8-битных значений (K1=0.01, K2=0.03)
+_C1 = (0.01 * 255) ** 2
+_C2 = (0.03 * 255) ** 2
+
+# Диапазон поиска качества: ниже 30 артефакты заметны при любом SSIM, выше 95 файл растет без пользы
+SSIM_MIN_QUALITY = 30
+SSIM_MAX_QUALITY = 95
+
+WEBP_MODES = ('lossy', 'lossless', 'near-lossless', 'auto')
+
+# Режим auto: мало цветов и низкая энтропия яркости - графика, скриншоты интерфейса;
+# фотографии (в том числе черно-белые, где цветов меньше 256) дают энтропию выше 6 бит
+AUTO_LOSSLESS_MAX_COLORS = 256
+AUTO_NEAR_LOSSLESS_MAX_COLORS = 8192
+AUTO_MAX_ENTROPY = 6.0
+
+# Усилие lossless по размеру (мегапиксели): (предел, method, quality). quality в режиме
+# lossless - усилие сжатия; method 6 / quality 100 в десятки раз медленнее при выигрыше < 1%
+LOSSLESS_EFFORT = ((0.25, 6, 100), (4.0, 5, 90), (float('inf'), 4, 75))
+# method для lossy в режиме auto: (предел мегапикселей, method)
+LOSSY_EFFORT = ((8.3, 6), (float('inf'), 4))
+
+# near-lossless: значения каналов округляются до 6 бит (ошибка не больше 2),
+# как предобработка near_lossless в libwebp, которую Pillow не передает кодеру
+_NEAR_LOSSLESS_LUT = [min(255, (value + 2) & ~3) for value in range(256)]
+
+# ImageMath.eval устарел в Pillow 10.3 (заменен unsafe_eval); выражения здесь постоянные
+_eval = getattr(ImageMath, 'unsafe_eval', None) or ImageMath.eval
+
+
+def _luma(img: Image.Image) -> Image.Image:
+    return img.convert('L').convert('F')
+
+
+class SSIMReference:
+    """
+    Исходное изображение, подготовленное для многократного сравнения:
+    яркость и ее статистики по блокам вычисляются один раз
+    """
+
+    def __init__(self, img: Image.Image):
+        """
+        Args:
+            img: Декодированное исходное изображение (в том виде, в каком оно кодируется)
+        """
+        self.size = img.size
+        self.luma = _luma(img)
+        self.mean = self.luma.reduce(SSIM_BLOCK)
+        self.mean_sq = _eval('x * x', x=self.luma).reduce(SSIM_BLOCK)
+
+    def ssim(self, img: Image.Image) -> float:
+        """Средний SSIM по блокам между исходным и сравниваемым изображением (1.0 - совпадают)"""
+        if img.size != self.size:
+            raise ValueError(f"Размеры не совпадают: {img.size} и {self.size}")
+        luma = _luma(img)
+        mean = luma.reduce(SSIM_BLOCK)
+        mean_sq = _eval('y * y', y=luma).reduce(SSIM_BLOCK)
+        cross = _eval('x * y', x=self.luma, y=luma).reduce(SSIM_BLOCK)
+        ssim_map = _eval(
+            '((2 * mx * my + c1) * (2 * (sxy - mx * my) + c2))'
+            ' / ((mx * mx + my * my + c1) * ((sxx - mx * mx) + (syy - my * my) + c2))',
+            mx=self.mean, my=mean, sxx=self.mean_sq, syy=mean_sq, sxy=cross, c1=_C1, c2=_C2
+        )
+        # ImageStat для режима F считает по гистограмме из 256 корзин; среднее - через BOX до 1x1
+        return ssim_map.resize((1, 1), Image.BOX).getpixel((0, 0))
+
+
+def image_statistics(img: Image.Image, alpha_used: bool = False) -> Dict:
+    """
+    Дешевые статистики для выбора режима: количество цветов (до предела),
+    энтропия яркости (бит) и использование прозрачности
+
+    Args:
+        img: Декодированное изображение (RGB)
+        alpha_used: В исходнике есть не полностью непрозрачные пиксели
+    """
+    colors = img.getcolors(AUTO_NEAR_LOSSLESS_MAX_COLORS)
+    return {
+        'colors': len(colors) if colors is not None else None,
+        'entropy': round(img.convert('L').entropy(), 3),
+        'alpha': alpha_used,
+    }
+
+
+def choose_webp_mode(stats: Dict) -> str:
+    """Режим WebP по статистикам image_statistics (colors None - больше предела)"""
+    colors = stats['colors']
+    if colors is None:
+        return 'lossy'
+    if colors <= AUTO_LOSSLESS_MAX_COLORS and (stats['entropy'] < AUTO_MAX_ENTROPY or stats['alpha']):
+        # Значки и спрайты с прозрачностью - lossless даже при сложных градиентах
+        return 'lossless'
+    if colors <= AUTO_NEAR_LOSSLESS_MAX_COLORS and stats['entropy'] < AUTO_MAX_ENTROPY:
+        return 'near-lossless'
+    return 'lossy'
+
+
+def webp_options(mode: str, megapixels: float, quality: int, scale_effort: bool = True) -> Dict:
+    """
+    Параметры Pillow для режима WebP с усилием по размеру изображения
+
+    Args:
+        mode: lossy, lossless или near-lossless
+        megapixels: Размер изображения
+        quality: Качество lossy
+        scale_effort: Снижать method для очень больших lossy изображений
+    """
+    if mode == 'lossy':
+        method = 6
+        if scale_effort:
+            method = next(method for limit, method in LOSSY_EFFORT if megapixels <= limit)
+        return {'quality': quality, 'method': method}
+    method, effort = next((method, effort) for limit, method, effort in LOSSLESS_EFFORT
+                          if megapixels <= limit)
+    return {'lossless': True, 'quality': effort, 'method': method}
+
+
+def near_lossless(img: Image.Image) -> Image.Image:
+    """Подготовка к near-lossless: округление младших бит каналов перед lossless кодированием"""
+    return img.point(_NEAR_LOSSLESS_LUT * len(img.getbands()))
+
+
+def encode_webp(img: Image.Image, quality: int, **options) -> bytes:
+    """Кодирование WebP в память"""
+    buffer = io.BytesIO()
+    img.save(buffer, 'WEBP', quality=quality, **options)
+    return buffer.getvalue()
+
+
+def search_webp_quality(img: Image.Image, target: float,
+                        min_quality: int = SSIM_MIN_QUALITY,
+                        max_quality: int = SSIM_MAX_QUALITY,
+                        **options) -> Tuple[int, bytes, float, List[Dict]]:
+    """
+    Двоичный поиск наименьшего качества WebP, при котором SSIM не ниже целевого
+
+    Исходное изображение декодируется один раз, кандидаты кодируются и
+    декодируются в памяти; число кодирований не больше log2 диапазона + 1.
+    Если цель недостижима и при max_quality, возвращается max_quality.
+
+    Args:
+        img: Декодированное исходное изображение
+        target: Целевой SSIM (0-1)
+        min_quality: Нижняя граница качества
+        max_quality: Верхняя граница качества
+        **options: Параметры кодирования WebP (method и т.д.)
+
+    Returns:
+        Tuple: (качество, данные WebP, SSIM, попытки [{quality, ssim, bytes}])
+    """
+    reference = SSIMReference(img)
+    attempts: List[Dict] = []
+    best: Optional[Tuple[int, bytes, float]] = None
+    fallback: Optional[Tuple[int, bytes, float]] = None
+
+    low, high = min_quality, max_quality
+    while low <= high:
+        quality = (low + high) // 2
+        data = encode_webp(img, quality, **options)
+        with Image.open(io.BytesIO(data)) as decoded:
+            score = reference.ssim(decoded)
+        attempts.append({'quality': quality, 'ssim': round(score, 5), 'bytes': len(data)})
+        if score >= target:
+            best = (quality, data, score)
+            high = quality - 1
+        else:
+            fallback = (quality, data, score)
+            low = quality + 1
+
+    if best is None:
+        # Цель недостижима: если все попытки ниже цели, последней проверяется max_quality
+        best = fallback
+
+    quality, data, score = best
+    return quality, data, score, attempts
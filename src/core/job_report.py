@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Поэтапные замеры заданий конвертации и отчет в формате JSON Lines
+Per-job stage timings, CPU time, peak RSS and bytes in/out with a JSON-lines run report
+"""
+
+import contextlib
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+import logging
+
+try:
+    import resource
+except ImportError:
+    # Windows: пиковая память не измеряется
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Этапы задания в порядке выполнения; scan относится ко всему пакету, search - подбор CRF видео
+STAGES = ['scan', 'probe', 'search', 'decode', 'encode', 'write', 'verify']
+
+
+def peak_rss_mb(children: bool = False) -> Optional[float]:
+    """Пиковая память процесса (или самого большого дочернего процесса) в МБ"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    return rusage_rss_mb(usage)
+
+
+def rusage_rss_mb(usage) -> float:
+    """ru_maxrss в МБ: Linux отдает килобайты, macOS - байты"""
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(usage.ru_maxrss / divisor, 1)
+
+
+class JobMetrics:
+    """
+    Замеры одного задания.
+
+    Процессорное время - время потока задания плюс время процесса FFmpeg,
+    поэтому параллельные задания не влияют на замеры друг друга. Пиковая
+    память для видео - память процесса FFmpeg, для изображений - максимум
+    всего процесса конвертера к концу задания.
+    """
+
+    def __init__(self, input_path: Path, kind: str, trace=None):
+        """
+        Args:
+            input_path: Входной файл
+            kind: Тип задания (image, video)
+            trace: Трасса задания (JobTrace); этапы записываются в нее спанами
+        """
+        self.input_path = Path(input_path)
+        self.kind = kind
+        self.trace = trace
+        self.stages: Dict[str, float] = {}
+        self.child_cpu_seconds = 0.0
+        self.child_peak_rss_mb: Optional[float] = None
+        self.extra: Dict = {}
+        self.record: Optional[Dict] = None
+        self._start = time.perf_counter()
+        self._thread_cpu_start = time.thread_time()
+
+    @contextlib.contextmanager
+    def stage(self, name: str, **attributes):
+        """
+        Замер этапа; повторные замеры одного этапа суммируются.
+        Атрибуты попадают в спан; блок получает их словарь и может дополнить.
+        """
+        start = time.perf_counter()
+        start_ns = time.time_ns()
+        error = None
+        try:
+            yield attributes
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            raise
+        finally:
+            self.add_stage(name, time.perf_counter() - start)
+            self.add_span(name, start_ns, time.time_ns(), attributes, error)
+
+    def add_stage(self, name: str, seconds: float):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def add_span(self, name: str, start_ns: int, end_ns: int,
+                 attributes: Dict = None, error: str = None):
+        """Спан трассы задания (если трассировка включена)"""
+        if self.trace is not None:
+            self.trace.add_span(name, start_ns, end_ns, attributes, error)
+
+    def add_child_usage(self, cpu_seconds: float, peak_rss: Optional[float]):
+        """Ресурсы дочернего процесса (FFmpeg); попытки с резервным профилем суммируются"""
+        self.child_cpu_seconds += cpu_seconds or 0.0
+        if peak_rss is not None:
+            self.child_peak_rss_mb = max(self.child_peak_rss_mb or 0.0, peak_rss)
+
+    def finish(self, success: bool, output_path: Optional[Path] = None,
+               error: str = None) -> Dict:
+        """
+        Завершение замеров
+
+        Returns:
+            Dict: Запись отчета о задании
+        """
+        try:
+            bytes_in = self.input_path.stat().st_size
+        except OSError:
+            bytes_in = 0
+        bytes_out = 0
+        if output_path is not None and success:
+            try:
+                bytes_out = Path(output_path).stat().st_size
+            except OSError:
+                pass
+
+        peak_rss = self.child_peak_rss_mb if self.child_peak_rss_mb is not None else peak_rss_mb()
+        self.record = {
+            'type': 'job',
+            'input': str(self.input_path),
+            'output': str(output_path) if output_path is not None and success else None,
+            'kind': self.kind,
+            'success': success,
+            'error': error,
+            'wall_seconds': round(time.perf_counter() - self._start, 4),
+            'cpu_seconds': round(time.thread_time() - self._thread_cpu_start + self.child_cpu_seconds, 4),
+            'peak_rss_mb': peak_rss,
+            'bytes_in': bytes_in,
+            'bytes_out': bytes_out,
+            'stages': {name: round(seconds, 4) for name, seconds in self.stages.items()},
+        }
+        self.record.update(self.extra)
+        if self.trace is not None:
+            self.record['trace_id'] = self.trace.trace_id
+            self.trace.finish(success, error, {
+                'umconverter.output': self.record['output'],
+                'umconverter.bytes_in': bytes_in,
+                'umconverter.bytes_out': bytes_out,
+            })
+        return self.record
+
+
+class RunReport:
+    """
+    Отчет запуска: по строке JSON на задание и итоговая таблица по этапам.
+
+    Строки пишутся сразу после завершения задания, поэтому отчет долгого
+    запуска (--watch) можно читать во время работы.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        """
+        Args:
+            path: Файл отчета JSON Lines (None - только итоговая таблица)
+        """
+        self.path = Path(path) if path else None
+        self.records: List[Dict] = []
+        self._lock = threading.Lock()
+        self._file = None
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, 'w', encoding='utf-8')
+
+    def _write(self, record: Dict):
+        with self._lock:
+            self.records.append(record)
+            if self._file:
+                self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+                self._file.flush()
+
+    def record_scan(self, kind: str, seconds: float, files: int):
+        """Поиск файлов выполняется один раз на пакет и записывается отдельной строкой"""
+        self._write({'type': 'scan', 'kind': kind, 'seconds': round(seconds, 4), 'files': files})
+
+    def add(self, job: JobMetrics):
+        """Запись завершенного задания (JobMetrics.finish уже вызван)"""
+        if job.record is not None:
+            self._write(job.record)
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    def summary(self) -> Dict[str, Dict]:
+        """Итоги по типам заданий: количество, время этапов, CPU, память и объем"""
+        with self._lock:
+            records = list(self.records)
+
+        totals: Dict[str, Dict] = {}
+        for record in records:
+            entry = totals.setdefault(record['kind'], {
+                'jobs': 0, 'failed': 0, 'stages': {name: 0.0 for name in STAGES},
+                'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'peak_rss_mb': None,
+                'bytes_in': 0, 'bytes_out': 0,
+            })
+            if record['type'] == 'scan':
+                entry['stages']['scan'] += record['seconds']
+                continue
+            entry['jobs'] += 1
+            entry['failed'] += not record['success']
+            for name, seconds in record['stages'].items():
+                entry['stages'][name] = entry['stages'].get(name, 0.0) + seconds
+            entry['wall_seconds'] += record['wall_seconds']
+            entry['cpu_seconds'] += record['cpu_seconds']
+            entry['bytes_in'] += record['bytes_in']
+            entry['bytes_out'] += record['bytes_out']
+            if record['peak_rss_mb'] is not None:
+                entry['peak_rss_mb'] = max(entry['peak_rss_mb'] or 0.0, record['peak_rss_mb'])
+
+        for entry in totals.values():
+            entry['stages'] = {name: round(seconds, 4) for name, seconds in entry['stages'].items()}
+            entry['wall_seconds'] = round(entry['wall_seconds'], 4)
+            entry['cpu_seconds'] = round(entry['cpu_seconds'], 4)
+        return totals
+
+    def log_summary(self):
+        """Итоговая таблица в лог: на что ушло время пакета"""
+        totals = self.summary()
+        if not totals:
+            return
+
+        logger.info("⏱️ Время по этапам (секунды):")
+        header = f"   {'тип':<7}{'файлов':>7}{'ошибок':>7}" + ''.join(f"{name:>8}" for name in STAGES)
+        header += f"{'CPU':>9}{'RSS МБ':>8}{'вход МБ':>9}{'выход МБ':>9}"
+        logger.info(header)
+        for kind, entry in sorted(totals.items()):
+            rss = '-' if entry['peak_rss_mb'] is None else f"{entry['peak_rss_mb']:.0f}"
+            logger.info(
+                f"   {kind:<7}{entry['jobs']:>7}{entry['failed']:>7}"
+                + ''.join(f"{entry['stages'].get(name, 0.0):>8.2f}" for name in STAGES)
+                + f"{entry['cpu_seconds']:>9.2f}{rss:>8}"
+                + f"{entry['bytes_in'] / 1024 / 1024:>9.1f}{entry['bytes_out'] / 1024 / 1024:>9.1f}"
+            )
+        if self.path:
+            logger.info(f"📝 Отчет по заданиям: {self.path}")
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Локальный HTTP сервис заданий конвертации с очередью приоритетов
+Local HTTP job service: priority queue, warm worker pool, backpressure
+"""
+
+import itertools
+import json
+import queue
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from urllib.parse import quote
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+import logging
+
+from core.ffmpeg_converter import FFmpegConverter
+from core.metrics import CONTENT_TYPE, CONVERSION_METRICS, REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Состояния задания
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = {DONE, FAILED, CANCELLED}
+
+
+class QueueFullError(Exception):
+    """Очередь заданий заполнена"""
+
+
+class Job:
+    """Задание конвертации"""
+
+    def __init__(self, input_path: Path, output_dir: Path, output_format: str,
+                 priority: int, quality: int):
+        self.id = uuid.uuid4().hex
+        self.input_path = input_path
+        # Часть идентификатора в имени: одинаковые входные имена и повторные задания не перезаписывают друг друга
+        self.output_path = output_dir / f"{input_path.stem}-{self.id[:8]}.{output_format}"
+        self.priority = priority
+        self.quality = quality
+        self.state = QUEUED
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.cancel_event = threading.Event()
+
+    def to_dict(self) -> Dict:
+        """Представление задания для API"""
+        return {
+            'id': self.id,
+            'input': str(self.input_path),
+            'output': str(self.output_path),
+            'priority': self.priority,
+            'quality': self.quality,
+            'state': self.state,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+
+class JobService:
+    """Очередь заданий с пулом постоянно запущенных рабочих потоков"""
+
+    def __init__(self, output_dir: Path, workers: int = 2, max_queue: int = 100,
+                 max_finished: int = 1000, converter: FFmpegConverter = None):
+        """
+        Args:
+            output_dir: Папка для результатов
+            workers: Количество рабочих потоков
+            max_queue: Максимальная длина очереди (при превышении - отказ)
+            max_finished: Сколько завершенных заданий хранить для запросов статуса
+            converter: Конвертер FFmpeg (создается, если не передан)
+        """
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.converter = converter or FFmpegConverter()
+        self.max_finished = max_finished
+
+        # Ограничение длины очереди считается по заданиям в состоянии QUEUED: отмененные
+        # задания остаются в PriorityQueue до выборки потоком, но места не занимают
+        self.max_queue = max_queue
+        self._queued = 0
+        self._queue = queue.PriorityQueue()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._sequence = itertools.count()
+        self._threads: List[threading.Thread] = []
+
+        for i in range(max(1, workers)):
+            thread = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, input_path: str, output_format: str,
+               priority: int = 0, quality: int = 80) -> Job:
+        """
+        Постановка задания в очередь
+
+        Args:
+            input_path: Путь к входному файлу
+            output_format: Выходной формат (расширение без точки)
+            priority: Приоритет (чем больше, тем раньше)
+            quality: Качество (1-100)
+
+        Raises:
+            FileNotFoundError: Входной файл не найден
+            ValueError: Неподдерживаемый выходной формат
+            QueueFullError: Очередь заполнена
+        """
+        output_format = str(output_format).lstrip('.').lower()
+        if not any(output_format in formats for formats in self.converter.supported_formats.values()):
+            raise ValueError(f"unsupported output format '{output_format}'")
+        source = Path(input_path)
+        if not source.is_file():
+            raise FileNotFoundError(input_path)
+
+        job = Job(source, self.output_dir, output_format, priority, quality)
+        with self._lock:
+            if self.max_queue > 0 and self._queued >= self.max_queue:
+                raise QueueFullError()
+            # PriorityQueue выдает наименьший элемент первым
+            self._queue.put_nowait((-priority, next(self._sequence), job))
+            self._queued += 1
+            self._jobs[job.id] = job
+        CONVERSION_METRICS.queue_depth.inc()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Получение задания по идентификатору"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self) -> List[Dict]:
+        """Список всех известных заданий"""
+        with self._lock:
+            return [job.to_dict() for job in self._jobs.values()]
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Отмена задания в очереди или в процессе выполнения"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.state in FINISHED_STATES:
+                return job
+            job.cancel_event.set()
+            if job.state == QUEUED:
+                job.state = CANCELLED
+                job.finished_at = time.time()
+                # Место в очереди освобождается сразу, запись удалит рабочий поток
+                self._queued -= 1
+                CONVERSION_METRICS.queue_depth.dec()
+        return job
+
+    def stats(self) -> Dict:
+        """Состояние очереди"""
+        with self._lock:
+            states = [job.state for job in self._jobs.values()]
+        return {
+            'queued': states.count(QUEUED),
+            'running': states.count(RUNNING),
+            'workers': len(self._threads),
+            'queue_capacity': self.max_queue,
+        }
+
+    def _worker(self):
+        """Рабочий поток: берет задания из очереди по приоритету"""
+        while True:
+            _, _, job = self._queue.get()
+            try:
+                with self._lock:
+                    if job.state != QUEUED:
+                        continue
+                    self._queued -= 1
+                    CONVERSION_METRICS.queue_depth.dec()
+                    job.state = RUNNING
+                    job.started_at = time.time()
+
+                success = self.converter.convert_file(
+                    str(job.input_path), str(job.output_path),
+                    quality=job.quality, cancel_event=job.cancel_event,
+                    queued_at=job.created_at, trace_id=job.id
+                )
+
+                with self._lock:
+                    if job.cancel_event.is_set():
+                        job.state = CANCELLED
+                    else:
+                        job.state = DONE if success else FAILED
+                    job.finished_at = time.time()
+                    self._prune_finished()
+            except Exception as e:
+                logger.error(f"❌ Ошибка выполнения задания {job.id}: {e}")
+                with self._lock:
+                    job.state = FAILED
+                    job.finished_at = time.time()
+            finally:
+                self._queue.task_done()
+
+    def _prune_finished(self):
+        """Удаление самых старых завершенных заданий сверх лимита"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.state in FINISHED_STATES]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    """
+    HTTP API сервиса:
+        POST   /jobs              - постановка задания {"input", "format", "priority", "quality"}
+        GET    /jobs              - список заданий
+        GET    /jobs/<id>         - статус задания
+        DELETE /jobs/<id>         - отмена задания
+        GET    /jobs/<id>/result  - скачивание результата
+        GET    /health            - состояние очереди
+        GET    /metrics           - метрики Prometheus
+    """
+
+    service: JobService = None
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def _send_json(self, status: int, payload, headers: Dict = None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _path_parts(self) -> List[str]:
+        return [part for part in self.path.split('?')[0].split('/') if part]
+
+    def do_GET(self):
+        parts = self._path_parts()
+        if parts == ['health']:
+            return self._send_json(200, self.service.stats())
+        if parts == ['metrics']:
+            return self._send_metrics()
+        if parts == ['jobs']:
+            return self._send_json(200, self.service.list_jobs())
+        if len(parts) in (2, 3) and parts[0] == 'jobs':
+            job = self.service.get(parts[1])
+            if job is None:
+                return self._send_json(404, {'error': 'job not found'})
+            if len(parts) == 2:
+                return self._send_json(200, job.to_dict())
+            if parts[2] == 'result':
+                return self._send_result(job)
+        self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        if self._path_parts() != ['jobs']:
+            return self._send_json(404, {'error': 'not found'})
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+            job = self.service.submit(
+                request['input'], request['format'],
+                priority=int(request.get('priority', 0)),
+                quality=int(request.get('quality', 80))
+            )
+        except (KeyError, ValueError, TypeError) as e:
+            return self._send_json(400, {'error': f'bad request: {e}'})
+        except FileNotFoundError as e:
+            return self._send_json(400, {'error': f'input not found: {e}'})
+        except QueueFullError:
+            return self._send_json(429, {'error': 'queue is full'}, {'Retry-After': '5'})
+        self._send_json(202, job.to_dict())
+
+    def do_DELETE(self):
+        parts = self._path_parts()
+        if len(parts) != 2 or parts[0] != 'jobs':
+            return self._send_json(404, {'error': 'not found'})
+        job = self.service.cancel(parts[1])
+        if job is None:
+            return self._send_json(404, {'error': 'job not found'})
+        self._send_json(200, job.to_dict())
+
+    def _send_metrics(self):
+        body = REGISTRY.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_result(self, job: Job):
+        if job.state != DONE:
+            return self._send_json(409, {'error': f'job is {job.state}'})
+        try:
+            size = job.output_path.stat().st_size
+            with open(job.output_path, 'rb') as f:
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/octet-stream')
+                self.send_header('Content-Length', str(size))
+                self.send_header('Content-Disposition', _content_disposition(job.output_path.name))
+                self.end_headers()
+                shutil.copyfileobj(f, self.wfile)
+        except FileNotFoundError:
+            self._send_json(410, {'error': 'result file is gone'})
+
+
+def _content_disposition(filename: str) -> str:
+    """
+    Заголовок Content-Disposition для имени из пути клиента: ASCII-вариант без кавычек
+    и управляющих символов и полное имя в кодировке RFC 5987
+    """
+    fallback = ''.join(ch if 32 <= ord(ch) < 127 and ch not in '"\\' else '_' for ch in filename)
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+
+def create_server(service: JobService, host: str = "127.0.0.1", port: int = 8765) -> ThreadingHTTPServer:
+    """Создание HTTP сервера для сервиса заданий"""
+    handler = type('BoundJobRequestHandler', (JobRequestHandler,), {'service': service})
+    return ThreadingHTTPServer((host, port), handler)
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Неблокирующая настройка логирования: очередь, JSON формат и ограничение частоты сообщений о файлах
+Queue-based logging setup (QueueHandler/QueueListener), JSON formatter and per-file rate limiting
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+DEFAULT_LOG_DIR = Path.home() / ".umconverter" / "logs"
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Не больше стольких сообщений о файлах в секунду (предупреждения и ошибки не ограничиваются)
+DEFAULT_RATE_LIMIT = 50
+
+# Стандартные поля LogRecord; все остальные пришли через extra и попадают в JSON
+_RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+logger = logging.getLogger(__name__)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_rate_filter: Optional['FileRateLimitFilter'] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна строка JSON на сообщение; поля из extra (file, bytes_in, ...) добавляются как есть"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created))
+                  + f".{int(record.msecs):03d}",
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class FileRateLimitFilter(logging.Filter):
+    """
+    Ограничение частоты сообщений об отдельных файлах.
+
+    Сообщения с полем file (logger.info(..., extra={'file': name})) уровня ниже
+    WARNING пропускаются не чаще rate в секунду; число пропущенных дописывается
+    к первому сообщению следующей секунды (любому) или выводится при остановке
+    логирования. Остальные сообщения не ограничиваются.
+    """
+
+    def __init__(self, rate: int = DEFAULT_RATE_LIMIT):
+        super().__init__()
+        self.rate = rate
+        self._lock = threading.Lock()
+        self._window = 0
+        self._count = 0
+        self._suppressed = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate <= 0:
+            return True
+
+        limited = record.levelno < logging.WARNING and hasattr(record, 'file')
+        window = int(time.monotonic())
+        with self._lock:
+            if window != self._window:
+                suppressed, self._suppressed = self._suppressed, 0
+                self._window, self._count = window, 0
+            else:
+                suppressed = 0
+            allowed = True
+            if limited:
+                self._count += 1
+                allowed = self._count <= self.rate
+                if not allowed:
+                    self._suppressed += 1
+
+        if suppressed:
+            # Первое сообщение новой секунды всегда пропускается и несет сводку о предыдущей
+            record.msg = f"{record.msg} (пропущено сообщений о файлах: {suppressed})"
+            record.suppressed = suppressed
+        return allowed
+
+    def flush(self) -> int:
+        """Число пропущенных сообщений, еще не попавших в сводку (счетчик сбрасывается)"""
+        with self._lock:
+            suppressed, self._suppressed = self._suppressed, 0
+        return suppressed
+
+
+def setup_logging(level: str = 'INFO', log_file: Optional[Path] = None,
+                  json_format: bool = False, rate_limit: int = DEFAULT_RATE_LIMIT,
+                  console: bool = True) -> logging.handlers.QueueListener:
+    """
+    Настройка корневого логгера: потоки только кладут записи в очередь,
+    запись в консоль и файл выполняет отдельный поток QueueListener
+
+    Args:
+        level: Уровень (DEBUG, INFO, WARNING, ERROR)
+        log_file: Файл лога (None - только консоль)
+        json_format: Писать JSON Lines вместо текста
+        rate_limit: Сообщений о файлах в секунду (0 - без ограничения)
+        console: Выводить лог в консоль (stderr)
+
+    Returns:
+        QueueListener (останавливается автоматически при выходе)
+    """
+    global _listener, _rate_filter
+    shutdown_logging()
+
+    formatter = JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT)
+    handlers = []
+    if console:
+        handlers.append(logging.StreamHandler())
+    if log_file:
+        log_file = Path(log_file)
+        log_file.parent.mkdir(parents=True, exist_ok=True)
+        handlers.append(logging.FileHandler(log_file, encoding='utf-8'))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    _rate_filter = FileRateLimitFilter(rate_limit)
+    queue_handler.addFilter(_rate_filter)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging():
+    """Запись оставшихся сообщений и остановка потока логирования"""
+    global _listener, _rate_filter
+    if _rate_filter is not None:
+        rate_filter, _rate_filter = _rate_filter, None
+        suppressed = rate_filter.flush()
+        if suppressed:
+            logger.info(f"Пропущено сообщений о файлах: {suppressed}", extra={'suppressed': suppressed})
+    if _listener is not None:
+        listener, _listener = _listener, None
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+def add_logging_arguments(parser, default_log_file: Optional[Path] = None):
+    """Общие параметры логирования для командной строки"""
+    parser.add_argument('--log-file', default=str(default_log_file) if default_log_file else None,
+                        help=f'Файл лога (по умолчанию {default_log_file or "нет"})')
+    parser.add_argument('--no-log-file', action='store_true', help='Не записывать лог в файл')
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help='Уровень логирования (по умолчанию INFO)')
+    parser.add_argument('--log-format', default='text', choices=['text', 'json'],
+                        help='Формат лога: text или json (JSON Lines)')
+    parser.add_argument('--log-rate-limit', type=int, default=DEFAULT_RATE_LIMIT,
+                        help=f'Сообщений о файлах в секунду, остальные пропускаются '
+                             f'(0 - без ограничения, по умолчанию {DEFAULT_RATE_LIMIT})')
+
+
+def setup_logging_from_args(args) -> logging.handlers.QueueListener:
+    """Настройка логирования по параметрам add_logging_arguments"""
+    log_file = None if args.no_log_file or not args.log_file else Path(args.log_file)
+    return setup_logging(args.log_level, log_file, args.log_format == 'json', args.log_rate_limit)
+
+
+atexit.register(shutdown_logging)
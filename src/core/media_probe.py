@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Быстрое получение параметров медиафайлов (длительность, разрешение)
+Lightweight media probing helpers
+"""
+
+import json
+import subprocess
+from pathlib import Path
+from typing import Dict
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def find_ffprobe(ffmpeg_path: str = "ffmpeg") -> str:
+    """Определение пути к ffprobe рядом с ffmpeg"""
+    ffprobe_path = ffmpeg_path.replace('ffmpeg', 'ffprobe')
+    if ffprobe_path != 'ffprobe' and not Path(ffprobe_path).exists():
+        # Используем системную версию
+        ffprobe_path = 'ffprobe'
+    return ffprobe_path
+
+
+def probe_media(file_path, ffprobe_path: str = "ffprobe", timeout: float = 30) -> Dict:
+    """
+    Получение длительности и разрешения аудио/видео через ffprobe
+
+    Args:
+        file_path: Путь к файлу
+        ffprobe_path: Путь к ffprobe
+        timeout: Ограничение времени работы ffprobe (секунды)
+
+    Returns:
+        Dict: duration, width, height, codec (пустой словарь при ошибке)
+    """
+    cmd = [
+        ffprobe_path, '-v', 'error', '-print_format', 'json',
+        '-show_entries', 'format=duration:stream=codec_type,codec_name,width,height',
+        str(file_path)
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+        if result.returncode != 0:
+            return {}
+        data = json.loads(result.stdout or '{}')
+    except (OSError, subprocess.TimeoutExpired, ValueError) as e:
+        logger.debug(f"ffprobe не смог прочитать {file_path}: {e}")
+        return {}
+
+    info = {'duration': 0.0, 'width': 0, 'height': 0, 'codec': ''}
+    try:
+        info['duration'] = float(data.get('format', {}).get('duration') or 0)
+    except ValueError:
+        pass
+
+    for stream in data.get('streams', []):
+        if stream.get('codec_type') == 'video' and not info['width']:
+            info['width'] = int(stream.get('width') or 0)
+            info['height'] = int(stream.get('height') or 0)
+            info['codec'] = stream.get('codec_name', '')
+        elif stream.get('codec_type') == 'audio' and not info['codec']:
+            info['codec'] = stream.get('codec_name', '')
+
+    return info
+
+
+def probe_image(file_path) -> Dict:
+    """
+    Получение размеров изображения без декодирования пикселей
+
+    Returns:
+        Dict: width, height, mode (пустой словарь при ошибке)
+    """
+    try:
+        from PIL import Image
+
+        # Image.open читает только заголовок файла
+        with Image.open(file_path) as img:
+            return {'width': img.width, 'height': img.height, 'mode': img.mode}
+    except Exception as e:
+        logger.debug(f"Pillow не смог прочитать {file_path}: {e}")
+        return {}
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Метрики конвертации в текстовом формате Prometheus
+Prometheus text-format metrics: counters, gauges, histograms, /metrics endpoint and textfile collector
+"""
+
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Границы гистограмм: длительность задания (секунды) и скорость кодирования (кадров в секунду)
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+FPS_BUCKETS = (1, 5, 10, 25, 50, 100, 200, 500, 1000)
+
+DEFAULT_TEXTFILE_INTERVAL = 15.0
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    """Общая часть метрик: имя, описание и значения по наборам меток"""
+
+    type_name = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: ожидаются метки {self.labelnames}, получены {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        # Метрика без меток видна сразу со значением 0
+        if not items and not self.labelnames:
+            items = [((), self._initial())]
+        for key, value in items:
+            lines.extend(self._render_value(key, value))
+        return lines
+
+    def _initial(self):
+        return 0.0
+
+    def _render_value(self, key: Tuple[str, ...], value) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    """Монотонно растущий счетчик"""
+
+    type_name = 'counter'
+
+    def inc(self, amount: float = 1.0, **labels):
+        if amount < 0:
+            raise ValueError("Счетчик не может уменьшаться")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+
+class Gauge(_Metric):
+    """Текущее значение: растет и уменьшается"""
+
+    type_name = 'gauge'
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+
+class Histogram(_Metric):
+    """Распределение наблюдений по корзинам (накопительно, как в Prometheus)"""
+
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def _initial(self):
+        return [[0] * len(self.buckets), 0.0, 0]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = self._initial()
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][index] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def _render_value(self, key: Tuple[str, ...], value) -> List[str]:
+        counts, total, count = value
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            le = f'le="{_format_value(bound)}"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Набор метрик, отдаваемых одной страницей"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                # Повторная регистрация возвращает ту же метрику (например, при повторном импорте)
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Метрика {metric.name} уже зарегистрирована с другим типом")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Все метрики в текстовом формате Prometheus 0.0.4"""
+        with self._lock:
+            metrics = [self._metrics[name] for name in sorted(self._metrics)]
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+class ConversionMetrics:
+    """
+    Метрики заданий конвертации.
+
+    Один экземпляр на процесс (CONVERSION_METRICS): и MediaConverter, и
+    FFmpegConverter пишут в него, страница /metrics показывает общую картину.
+    """
+
+    def __init__(self, registry: MetricsRegistry):
+        self.registry = registry
+        self.jobs_started = registry.counter(
+            'umconverter_jobs_started_total', 'Начатые задания конвертации', ['type'])
+        self.jobs_finished = registry.counter(
+            'umconverter_jobs_finished_total', 'Успешно завершенные задания конвертации', ['type'])
+        self.jobs_failed = registry.counter(
+            'umconverter_jobs_failed_total', 'Задания конвертации, завершившиеся ошибкой', ['type'])
+        self.queue_depth = registry.gauge(
+            'umconverter_queue_depth', 'Задания, ожидающие в очереди')
+        self.in_flight = registry.gauge(
+            'umconverter_jobs_in_flight', 'Выполняющиеся задания', ['type'])
+        self.bytes_processed = registry.counter(
+            'umconverter_bytes_processed_total', 'Объем обработанных данных', ['type', 'direction'])
+        self.job_latency = registry.histogram(
+            'umconverter_job_duration_seconds', 'Длительность задания конвертации', ['type'],
+            LATENCY_BUCKETS)
+        self.encode_fps = registry.histogram(
+            'umconverter_encode_fps', 'Средняя скорость кодирования задания, кадров в секунду', ['type'],
+            FPS_BUCKETS)
+
+    def job_started(self, kind: str):
+        self.jobs_started.inc(type=kind)
+        self.in_flight.inc(type=kind)
+
+    def job_finished(self, kind: str, success: bool, seconds: float,
+                     bytes_in: int = 0, bytes_out: int = 0, fps: Optional[float] = None):
+        """
+        Завершение задания (вызывается ровно один раз на job_started)
+
+        Args:
+            kind: Тип задания (image, video, audio)
+            success: Задание выполнено успешно
+            seconds: Длительность задания
+            bytes_in: Объем входного файла
+            bytes_out: Объем результата
+            fps: Скорость кодирования по данным FFmpeg (только для видео)
+        """
+        self.in_flight.dec(type=kind)
+        if success:
+            self.jobs_finished.inc(type=kind)
+        else:
+            self.jobs_failed.inc(type=kind)
+        self.job_latency.observe(seconds, type=kind)
+        if bytes_in:
+            self.bytes_processed.inc(bytes_in, type=kind, direction='in')
+        if bytes_out:
+            self.bytes_processed.inc(bytes_out, type=kind, direction='out')
+        if fps:
+            self.encode_fps.observe(fps, type=kind)
+
+
+REGISTRY = MetricsRegistry()
+CONVERSION_METRICS = ConversionMetrics(REGISTRY)
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    """GET /metrics - страница метрик для Prometheus"""
+
+    registry: MetricsRegistry = REGISTRY
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_metrics_server(port: int, host: str = '127.0.0.1',
+                         registry: MetricsRegistry = REGISTRY) -> ThreadingHTTPServer:
+    """Запуск страницы /metrics в фоновом потоке"""
+    handler = type('BoundMetricsRequestHandler', (MetricsRequestHandler,), {'registry': registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"📈 Метрики: http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+
+class TextfileExporter:
+    """
+    Периодическая запись метрик в файл для textfile collector node_exporter.
+
+    Файл заменяется атомарно, поэтому node_exporter никогда не читает его наполовину записанным.
+    """
+
+    def __init__(self, path: Path, interval: float = DEFAULT_TEXTFILE_INTERVAL,
+                 registry: MetricsRegistry = REGISTRY):
+        """
+        Args:
+            path: Файл *.prom в папке --collector.textfile.directory
+            interval: Период записи (секунды)
+            registry: Набор метрик
+        """
+        self.path = Path(path)
+        self.interval = interval
+        self.registry = registry
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def write(self):
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(self.registry.render())
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Не удалось записать метрики {self.path}: {e}")
+
+    def start(self):
+        self.write()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Остановка с финальной записью, чтобы файл содержал итог запуска"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.write()
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.write()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Быстрая предварительная проверка входных файлов перед постановкой в очередь
+Cheap pre-flight validation: magic bytes, Pillow verify(), bounded ffprobe
+"""
+
+import json
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.bmp', '.tiff', '.tif', '.webp', '.gif'}
+
+# Сигнатуры форматов: расширение -> список (смещение, байты)
+MAGIC_SIGNATURES = {
+    '.png': [(0, b'\x89PNG\r\n\x1a\n')],
+    '.jpg': [(0, b'\xff\xd8\xff')],
+    '.jpeg': [(0, b'\xff\xd8\xff')],
+    '.bmp': [(0, b'BM')],
+    # Обычный TIFF и BigTIFF
+    '.tiff': [(0, b'II*\x00'), (0, b'MM\x00*'), (0, b'II+\x00'), (0, b'MM\x00+')],
+    '.tif': [(0, b'II*\x00'), (0, b'MM\x00*'), (0, b'II+\x00'), (0, b'MM\x00+')],
+    '.gif': [(0, b'GIF87a'), (0, b'GIF89a')],
+    '.webp': [(8, b'WEBP')],
+    '.mp4': [(4, b'ftyp'), (4, b'moov'), (4, b'mdat'), (4, b'free'), (4, b'wide')],
+    '.m4v': [(4, b'ftyp')],
+    '.m4a': [(4, b'ftyp')],
+    '.3gp': [(4, b'ftyp')],
+    '.mov': [(4, b'ftyp'), (4, b'moov'), (4, b'mdat'), (4, b'free'), (4, b'wide'), (4, b'skip')],
+    '.avi': [(8, b'AVI ')],
+    '.wav': [(8, b'WAVE')],
+    '.mkv': [(0, b'\x1a\x45\xdf\xa3')],
+    '.webm': [(0, b'\x1a\x45\xdf\xa3')],
+    '.flv': [(0, b'FLV')],
+    '.wmv': [(0, b'\x30\x26\xb2\x75\x8e\x66\xcf\x11')],
+    '.wma': [(0, b'\x30\x26\xb2\x75\x8e\x66\xcf\x11')],
+    '.flac': [(0, b'fLaC')],
+    '.ogg': [(0, b'OggS')],
+    '.ogv': [(0, b'OggS')],
+    '.opus': [(0, b'OggS')],
+    # Кадр MPEG Layer III: MPEG-1, MPEG-2, MPEG-2.5, с CRC и без
+    '.mp3': [(0, b'ID3'), (0, b'\xff\xfb'), (0, b'\xff\xfa'), (0, b'\xff\xf3'), (0, b'\xff\xf2'),
+             (0, b'\xff\xe3'), (0, b'\xff\xe2')],
+    '.aac': [(0, b'\xff\xf1'), (0, b'\xff\xf9'), (0, b'ADIF'), (0, b'ID3')],
+}
+
+# Ограничение времени ffprobe на один файл
+PROBE_TIMEOUT = 15
+
+MAGIC_MISMATCH = "сигнатура не соответствует расширению"
+
+
+def check_magic(input_path: Path) -> Optional[str]:
+    """Проверка сигнатуры файла (None - файл похож на заявленный формат)"""
+    signatures = MAGIC_SIGNATURES.get(input_path.suffix.lower())
+    try:
+        with open(input_path, 'rb') as f:
+            header = f.read(16)
+    except OSError as e:
+        return f"файл не читается: {e}"
+
+    if not header:
+        return "пустой файл"
+    if signatures is None:
+        return None
+    if any(header[offset:offset + len(magic)] == magic for offset, magic in signatures):
+        return None
+    return MAGIC_MISMATCH
+
+
+def check_image(input_path: Path) -> Optional[str]:
+    """Проверка структуры изображения через Pillow verify() без декодирования пикселей"""
+    try:
+        from PIL import Image
+
+        with Image.open(input_path) as img:
+            img.verify()
+        return None
+    except ImportError:
+        return None
+    except Exception as e:
+        return f"повреждено изображение: {e}"
+
+
+def check_media(input_path: Path, ffprobe_path: str = "ffprobe",
+                timeout: float = PROBE_TIMEOUT) -> Optional[str]:
+    """Проверка заголовка и индекса аудио/видео через ffprobe с ограничением времени"""
+    cmd = [
+        ffprobe_path, '-v', 'error', '-print_format', 'json',
+        '-show_entries', 'format=duration:stream=codec_type', str(input_path)
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return f"ffprobe не ответил за {timeout}с"
+    except OSError:
+        # Без ffprobe проверить нечего - ошибку покажет сама конвертация
+        return None
+
+    if result.returncode != 0:
+        return (result.stderr.strip().splitlines() or ["ffprobe не смог прочитать файл"])[-1]
+    try:
+        data = json.loads(result.stdout or '{}')
+    except ValueError:
+        return "некорректный ответ ffprobe"
+    if not data.get('streams'):
+        return "нет аудио или видео потоков"
+    return None
+
+
+def validate_file(input_path: Path, ffprobe_path: str = "ffprobe") -> Optional[str]:
+    """
+    Полная предварительная проверка файла (None - файл годен)
+
+    Таблица сигнатур не может быть полной (варианты контейнеров, кадры без
+    заголовка), поэтому несовпадение сигнатуры само по себе файл не отклоняет:
+    решает проверка Pillow или ffprobe.
+    """
+    input_path = Path(input_path)
+    magic_error = check_magic(input_path)
+    if magic_error and magic_error != MAGIC_MISMATCH:
+        return magic_error
+    if input_path.suffix.lower() in IMAGE_EXTENSIONS:
+        error = check_image(input_path)
+    else:
+        error = check_media(input_path, ffprobe_path)
+    if magic_error and not error:
+        logger.debug(f"Неизвестная сигнатура, файл прочитан: {input_path}")
+    return error
+
+
+def preflight(files: List[Path], ffprobe_path: str = "ffprobe", workers: int = 8,
+              on_progress: Callable[[int, int], None] = None) -> Tuple[List[Path], List[Tuple[Path, str]]]:
+    """
+    Параллельная проверка набора файлов
+
+    Args:
+        files: Файлы для проверки
+        ffprobe_path: Путь к ffprobe
+        workers: Количество параллельных проверок
+        on_progress: Вызывается с (проверено, всего)
+
+    Returns:
+        Tuple: (годные файлы в исходном порядке, [(файл, причина)] для отклоненных)
+    """
+    valid, invalid = [], []
+    if not files:
+        return valid, invalid
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        errors = executor.map(lambda f: validate_file(f, ffprobe_path), files)
+        for done, (input_path, error) in enumerate(zip(files, errors), 1):
+            if error:
+                invalid.append((input_path, error))
+            else:
+                valid.append(input_path)
+            if on_progress:
+                on_progress(done, len(files))
+
+    for input_path, error in invalid:
+        logger.warning(f"⛔ Отклонен проверкой: {Path(input_path).name} ({error})")
+    return valid, invalid
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Профилирование запуска: cProfile и tracemalloc по фазам (поиск файлов, задания, отчет)
+Phase-based cProfile and tracemalloc profiling with top-N hotspot and allocation reports
+"""
+
+import contextlib
+import cProfile
+import io
+import pstats
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOP = 20
+# Глубина стека выделений памяти: больше - точнее места, но медленнее
+TRACEMALLOC_FRAMES = 5
+
+# Файлы, выделения памяти в которых относятся к профилированию, а не к конвертации
+_OWN_FILES = (tracemalloc.__file__, cProfile.__file__, pstats.__file__, __file__)
+
+PHASE_SCAN = 'scan'
+PHASE_JOB = 'job'
+PHASE_REPORT = 'report'
+
+
+class RunProfiler:
+    """
+    Профилировщик фаз запуска.
+
+    cProfile включается на время каждой фазы в потоке, который ее выполняет;
+    статистика фаз с одним именем (например, всех заданий) суммируется.
+    Снимки tracemalloc делаются на границах фаз scan и report, а выделения
+    памяти между ними относятся к заданиям - снимок на каждое задание
+    обходился бы слишком дорого. tracemalloc видит только память Python:
+    буферы пикселей Pillow и процессы FFmpeg в нем не учитываются.
+    """
+
+    def __init__(self, directory: Path, top: int = DEFAULT_TOP):
+        """
+        Args:
+            directory: Папка результатов (*.prof для pstats/snakeviz и текстовые отчеты)
+            top: Сколько строк показывать в итоговых отчетах
+        """
+        self.directory = Path(directory)
+        self.top = top
+        self._lock = threading.Lock()
+        self._stats: Dict[str, pstats.Stats] = {}
+        self._phase_seconds: Dict[str, float] = {}
+        self._phase_counts: Dict[str, int] = {}
+        self._allocations: Dict[str, Dict[Tuple[str, int], List[int]]] = {}
+        self._job_peaks: List[Tuple[float, str]] = []
+        self._skipped = 0
+        self._last_snapshot = None
+        self._started = False
+
+    def start(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        self._last_snapshot = tracemalloc.take_snapshot()
+        self._started = True
+        logger.info(f"🔬 Профилирование включено: {self.directory}")
+
+    def _take_snapshot(self, phase: str):
+        """Снимок на границе фазы; разница с предыдущим относится к phase"""
+        snapshot = tracemalloc.take_snapshot()
+        # Память самого профилировщика в отчете не нужна
+        snapshot = snapshot.filter_traces([tracemalloc.Filter(False, path) for path in _OWN_FILES])
+        with self._lock:
+            previous, self._last_snapshot = self._last_snapshot, snapshot
+            if previous is None:
+                return
+            totals = self._allocations.setdefault(phase, {})
+        for diff in snapshot.compare_to(previous, 'lineno'):
+            if not diff.size_diff:
+                continue
+            frame = diff.traceback[0]
+            entry = totals.setdefault((frame.filename, frame.lineno), [0, 0])
+            entry[0] += diff.size_diff
+            entry[1] += diff.count_diff
+
+    @contextlib.contextmanager
+    def phase(self, name: str, label: str = None):
+        """
+        Профилирование фазы
+
+        Args:
+            name: Фаза (scan, job, report)
+            label: Описание для отчета (например, имя файла задания)
+        """
+        if not self._started:
+            yield
+            return
+
+        if name != PHASE_JOB:
+            # Все, что выполнялось с прошлой границы, - задания
+            self._take_snapshot(PHASE_JOB)
+        else:
+            tracemalloc.reset_peak()
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+: в процессе может работать только один профилировщик,
+            # параллельное задание выполняется без профиля
+            profile = None
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            if profile is not None:
+                profile.disable()
+            with self._lock:
+                self._phase_seconds[name] = self._phase_seconds.get(name, 0.0) + elapsed
+                self._phase_counts[name] = self._phase_counts.get(name, 0) + 1
+                if profile is None:
+                    self._skipped += 1
+                elif name in self._stats:
+                    self._stats[name].add(profile)
+                else:
+                    self._stats[name] = pstats.Stats(profile)
+                if name == PHASE_JOB:
+                    # Пик с начала задания; при параллельных заданиях - общий для них
+                    self._job_peaks.append((tracemalloc.get_traced_memory()[1], label or ''))
+            if name != PHASE_JOB:
+                self._take_snapshot(name)
+
+    def _hotspots(self, name: str) -> str:
+        stream = io.StringIO()
+        stats = self._stats[name]
+        stats.stream = stream
+        stats.sort_stats('cumulative').print_stats(self.top)
+        return stream.getvalue()
+
+    def _allocation_lines(self, name: str) -> List[str]:
+        totals = self._allocations.get(name, {})
+        rows = sorted(totals.items(), key=lambda item: item[1][0], reverse=True)[:self.top]
+        return [f"{size / 1024:>10.1f} KiB {count:>8} блоков  {filename}:{lineno}"
+                for (filename, lineno), (size, count) in rows]
+
+    def finish(self):
+        """Остановка, запись файлов в папку профиля и вывод главных мест в лог"""
+        if not self._started:
+            return
+        self._take_snapshot(PHASE_JOB)
+        self._started = False
+        tracemalloc.stop()
+
+        with self._lock:
+            phases = sorted(self._phase_seconds, key=lambda name: [PHASE_SCAN, PHASE_JOB, PHASE_REPORT].index(name)
+                            if name in (PHASE_SCAN, PHASE_JOB, PHASE_REPORT) else 99)
+            summary = [f"{name}: {self._phase_counts[name]} раз, {self._phase_seconds[name]:.3f}с"
+                       for name in phases]
+
+            for name, stats in self._stats.items():
+                stats.dump_stats(str(self.directory / f"{name}.prof"))
+                (self.directory / f"{name}-hotspots.txt").write_text(self._hotspots(name), encoding='utf-8')
+            for name in self._allocations:
+                (self.directory / f"{name}-allocations.txt").write_text(
+                    '\n'.join(self._allocation_lines(name)) + '\n', encoding='utf-8')
+
+            job_peaks = sorted(self._job_peaks, reverse=True)[:self.top]
+            if job_peaks:
+                (self.directory / "job-peaks.txt").write_text(
+                    ''.join(f"{peak / 1024 / 1024:>9.1f} MiB  {label}\n" for peak, label in job_peaks),
+                    encoding='utf-8')
+
+        logger.info("🔬 Профиль запуска:")
+        for line in summary:
+            logger.info(f"   {line}")
+        if self._skipped:
+            logger.info(f"   Без профиля (параллельно с другим): {self._skipped}")
+        for name in phases:
+            if name in self._stats:
+                logger.info(f"🔥 Горячие места ({name}, по накопленному времени):")
+                for line in self._hotspots(name).splitlines():
+                    if line.strip():
+                        logger.info(f"   {line}")
+            lines = self._allocation_lines(name)
+            if lines:
+                logger.info(f"🧠 Выделения памяти ({name}):")
+                for line in lines:
+                    logger.info(f"   {line}")
+        if job_peaks:
+            logger.info(f"🧠 Пик памяти Python в задании: {job_peaks[0][0] / 1024 / 1024:.1f} MiB ({job_peaks[0][1]})")
+        logger.info(f"📝 Файлы профиля: {self.directory}")
+
+
+def profile_phase(profiler: Optional[RunProfiler], name: str, label: str = None):
+    """Фаза профилировщика или пустой контекст, если профилирование выключено"""
+    if profiler is None:
+        return contextlib.nullcontext()
+    return profiler.phase(name, label)
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Карантин для файлов, которые не удалось конвертировать даже в безопасном режиме
+Quarantine for inputs that keep failing
+"""
+
+import json
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Quarantine:
+    """Перемещение проблемных файлов в отдельную папку с журналом причин"""
+
+    def __init__(self, directory: Optional[Path] = None):
+        """
+        Args:
+            directory: Папка карантина (None - только запись в лог, файлы не перемещаются)
+        """
+        self.directory = Path(directory) if directory else None
+        self._lock = threading.Lock()
+
+    def add(self, input_path: Path, reason: str, details: str = ""):
+        """Помещение файла в карантин"""
+        input_path = Path(input_path)
+        logger.error(f"🚫 Карантин: {input_path.name} ({reason})")
+        if self.directory is None:
+            return
+
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            target = self.directory / input_path.name
+            if target.exists():
+                target = self.directory / f"{input_path.stem}-{int(time.time())}{input_path.suffix}"
+            try:
+                shutil.move(str(input_path), str(target))
+            except OSError as e:
+                logger.error(f"Не удалось переместить {input_path.name} в карантин: {e}")
+                target = None
+
+            record = {
+                'input': str(input_path),
+                'quarantined_as': str(target) if target else None,
+                'reason': reason,
+                'details': details,
+                'time': time.time(),
+            }
+            with open(self.directory / "quarantine.jsonl", 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
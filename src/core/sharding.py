@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Детерминированное разбиение пакета на непересекающиеся части (--shard i/N)
+Deterministic shard partitioning and per-shard summaries
+"""
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """
+    Разбор строки вида INDEX/COUNT (индекс с нуля)
+
+    Raises:
+        ValueError: Неверный формат или индекс вне диапазона
+    """
+    try:
+        index, count = (int(part) for part in spec.split('/'))
+    except ValueError:
+        raise ValueError(f"Неверный формат шарда '{spec}', ожидается INDEX/COUNT")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Индекс шарда должен быть в диапазоне 0..{count - 1}")
+    return index, count
+
+
+def _stable_key(path: Path, root: Path) -> str:
+    """Ключ файла, одинаковый на всех узлах: путь относительно входной папки"""
+    try:
+        return Path(path).relative_to(root).as_posix()
+    except ValueError:
+        return Path(path).as_posix()
+
+
+def shard_of(key: str, count: int) -> int:
+    """Номер шарда для ключа (хеш не зависит от PYTHONHASHSEED)"""
+    return int(hashlib.sha1(key.encode('utf-8')).hexdigest(), 16) % count
+
+
+def partition_by_hash(files: List[Path], root: Path, index: int, count: int) -> List[Path]:
+    """Файлы шарда index при разбиении по хешу пути"""
+    return [f for f in files if shard_of(_stable_key(f, root), count) == index]
+
+
+def partition_balanced(files: List[Path], root: Path, index: int, count: int,
+                       weight: Callable[[Path], Optional[float]]) -> List[Path]:
+    """
+    Файлы шарда index при разбиении с балансировкой по весу (например, длительности)
+
+    Жадное распределение от самых тяжелых файлов к самым легким; порядок и разрешение
+    равенств полностью определяются ключами и весами, поэтому все узлы получают
+    одинаковое разбиение. Файлы, вес которых неизвестен (weight вернул None или не
+    больше 0, например ffprobe не прочитал файл), распределяются по хешу пути и
+    в жадном распределении не участвуют.
+    """
+    weighted = []
+    selected = []
+    for f in files:
+        key = _stable_key(f, root)
+        file_weight = weight(f)
+        if not file_weight or file_weight <= 0:
+            if shard_of(key, count) == index:
+                selected.append(f)
+            continue
+        weighted.append((file_weight, key, f))
+    weighted.sort(key=lambda item: (-item[0], item[1]))
+
+    loads = [0.0] * count
+    for file_weight, _, path in weighted:
+        target = min(range(count), key=lambda i: (loads[i], i))
+        loads[target] += file_weight
+        if target == index:
+            selected.append(path)
+    return selected
+
+
+def write_summary(path: Path, summary: Dict):
+    """Сохранение итогового отчета шарда"""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+
+
+def merge_summaries(paths: List[Path]) -> Dict:
+    """Объединение отчетов шардов в общий отчет"""
+    merged = {'shards': [], 'successful': 0, 'failed': 0, 'invalid': 0, 'files': []}
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            summary = json.load(f)
+        merged['shards'].append(summary.get('shard'))
+        merged['successful'] += summary.get('successful', 0)
+        merged['failed'] += summary.get('failed', 0)
+        merged['invalid'] += summary.get('invalid', 0)
+        merged['files'].extend(summary.get('files', []))
+
+    inputs = [entry['input'] for entry in merged['files']]
+    duplicates = len(inputs) - len(set(inputs))
+    if duplicates:
+        logger.warning(f"⚠️ Отчеты шардов пересекаются: {duplicates} файлов встречаются повторно")
+    return merged
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Локальная история производительности конвертации для оценки времени и размера
+Historical throughput store used for ETA and output size estimates
+"""
+
+import json
+import os
+import platform
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Путь к хранилищу статистики по умолчанию
+DEFAULT_STATS_PATH = Path.home() / ".umconverter" / "throughput_stats.json"
+
+# Границы корзин разрешения (количество пикселей кадра)
+RESOLUTION_BUCKETS = [
+    (640 * 480, "480p"),
+    (1280 * 720, "720p"),
+    (1920 * 1080, "1080p"),
+    (2560 * 1440, "1440p"),
+    (3840 * 2160, "2160p"),
+]
+
+# Вес нового измерения в скользящем среднем
+EMA_ALPHA = 0.3
+
+
+def resolution_bucket(width: int, height: int) -> str:
+    """Определение корзины разрешения по размеру кадра"""
+    pixels = (width or 0) * (height or 0)
+    if pixels <= 0:
+        return "unknown"
+    for limit, name in RESOLUTION_BUCKETS:
+        if pixels <= limit:
+            return name
+    return "4320p"
+
+
+def format_duration(seconds: float) -> str:
+    """Форматирование длительности в вид ч:мм:сс или м:сс"""
+    seconds = int(round(max(seconds, 0)))
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes}:{secs:02d}"
+
+
+class ThroughputStats:
+    """Хранилище скорости конвертации по кодеку, разрешению, пресету и хосту"""
+
+    def __init__(self, path: Optional[Path] = None):
+        """
+        Args:
+            path: Путь к JSON файлу статистики (по умолчанию ~/.umconverter)
+        """
+        self.path = Path(path) if path else DEFAULT_STATS_PATH
+        self.host = platform.node() or "localhost"
+        self._lock = threading.Lock()
+        # Запись на диск выполняется одним потоком за раз
+        self._save_lock = threading.Lock()
+        self._entries = self._load()
+        # Ключи, измененные этим процессом с последнего сохранения
+        self._dirty = set()
+
+    def _load(self) -> Dict[str, Dict]:
+        """Загрузка статистики с диска"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data.get('entries', {})
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Не удалось прочитать статистику {self.path}: {e}")
+            return {}
+
+    def save(self):
+        """
+        Атомарное сохранение статистики на диск
+
+        Записи на диске объединяются с текущими: ключи, измененные этим процессом,
+        берутся из памяти, остальные - с диска, поэтому несколько процессов с общим
+        файлом не теряют записи друг друга. Каждое сохранение пишет свой временный файл.
+        """
+        with self._save_lock:
+            with self._lock:
+                dirty = set(self._dirty)
+                self._dirty.clear()
+                own = {key: dict(entry) for key, entry in self._entries.items()}
+            entries = self._load()
+            for key, entry in own.items():
+                if key in dirty or key not in entries:
+                    entries[key] = entry
+            data = {'version': 1, 'entries': entries}
+            tmp_path = None
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}.",
+                                                suffix='.tmp')
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, indent=1, sort_keys=True)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                logger.warning(f"Не удалось сохранить статистику {self.path}: {e}")
+                if tmp_path is not None:
+                    try:
+                        os.unlink(tmp_path)
+                    except OSError:
+                        pass
+                with self._lock:
+                    self._dirty |= dirty
+                return
+
+            with self._lock:
+                # Записи других процессов становятся доступны для оценок
+                for key, entry in entries.items():
+                    if key not in self._dirty:
+                        self._entries[key] = entry
+
+    def make_key(self, codec: str, width: int, height: int, preset: str) -> str:
+        """Формирование ключа записи статистики"""
+        return "|".join([codec, resolution_bucket(width, height), preset, self.host])
+
+    def record(self, key: str, wall_seconds: float, work_units: float,
+               input_bytes: int, output_bytes: int):
+        """
+        Запись результата завершенной конвертации
+
+        Args:
+            key: Ключ из make_key
+            wall_seconds: Фактическое время конвертации
+            work_units: Объем работы (секунды медиа для видео/аудио, мегапиксели для изображений)
+            input_bytes: Размер входного файла
+            output_bytes: Размер выходного файла
+        """
+        if wall_seconds <= 0 or work_units <= 0 or input_bytes <= 0:
+            return
+
+        rate = work_units / wall_seconds
+        size_ratio = output_bytes / input_bytes
+
+        with self._lock:
+            self._dirty.add(key)
+            entry = self._entries.get(key)
+            if entry is None:
+                self._entries[key] = {'rate': rate, 'size_ratio': size_ratio, 'samples': 1}
+            else:
+                entry['rate'] += EMA_ALPHA * (rate - entry['rate'])
+                entry['size_ratio'] += EMA_ALPHA * (size_ratio - entry['size_ratio'])
+                entry['samples'] += 1
+
+    def _lookup(self, key: str) -> Optional[Dict]:
+        """Поиск записи: точное совпадение, затем тот же кодек и разрешение, затем тот же кодек"""
+        with self._lock:
+            if key in self._entries:
+                return self._entries[key]
+
+            codec, bucket = key.split("|")[:2]
+            for prefix in (f"{codec}|{bucket}|", f"{codec}|"):
+                matches = [e for k, e in self._entries.items() if k.startswith(prefix)]
+                if matches:
+                    return {
+                        'rate': sum(e['rate'] for e in matches) / len(matches),
+                        'size_ratio': sum(e['size_ratio'] for e in matches) / len(matches),
+                    }
+        return None
+
+    def has_history(self, key: str) -> bool:
+        """Есть ли данные для оценки по ключу"""
+        return self._lookup(key) is not None
+
+    def estimate(self, key: str, work_units: float, input_bytes: int,
+                 default_rate: float, default_size_ratio: float) -> Tuple[float, int]:
+        """
+        Оценка длительности и размера выходного файла
+
+        Args:
+            key: Ключ из make_key
+            work_units: Объем работы в тех же единицах, что и при записи
+            input_bytes: Размер входного файла
+            default_rate: Скорость, если истории нет
+            default_size_ratio: Отношение размеров, если истории нет
+
+        Returns:
+            Tuple[float, int]: (секунды, байты)
+        """
+        entry = self._lookup(key)
+        rate = entry['rate'] if entry else default_rate
+        size_ratio = entry['size_ratio'] if entry else default_size_ratio
+        seconds = work_units / rate if rate > 0 else 0.0
+        return seconds, int(input_bytes * size_ratio)
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Миниатюры изображений и кадры-постеры видео с кэшем на диске
+Thumbnail generation (Pillow draft/thumbnail, ffmpeg keyframe seek) with a size-bounded disk cache
+"""
+
+import hashlib
+import os
+import subprocess
+import threading
+from pathlib import Path
+from typing import Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = Path.home() / ".umconverter" / "thumbnails"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_SIZE = (48, 48)
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.bmp', '.tiff', '.tif', '.webp', '.gif'}
+VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm', '.m4v', '.3gp', '.ogv'}
+
+# Позиция кадра-постера и ограничение времени FFmpeg
+POSTER_SEEK_SECONDS = 1.0
+POSTER_TIMEOUT = 15
+
+
+class ThumbnailCache:
+    """
+    Миниатюры в папке кэша с ключом по пути, размеру и времени изменения файла.
+
+    Измененный файл получает новый ключ, старая миниатюра вытесняется со временем.
+    Когда общий объем превышает max_bytes, удаляются давно не использованные файлы.
+    """
+
+    def __init__(self, directory: Optional[Path] = None, max_bytes: int = DEFAULT_MAX_BYTES,
+                 size: Tuple[int, int] = DEFAULT_SIZE, ffmpeg_path: str = "ffmpeg"):
+        """
+        Args:
+            directory: Папка кэша (по умолчанию ~/.umconverter/thumbnails)
+            max_bytes: Ограничение объема кэша
+            size: Максимальный размер миниатюры (ширина, высота)
+            ffmpeg_path: Путь к FFmpeg для кадров видео
+        """
+        self.directory = Path(directory) if directory else DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+        self.size = size
+        self.ffmpeg_path = ffmpeg_path
+        self._lock = threading.Lock()
+        # Объем кэша считается при первой записи
+        self._total_bytes: Optional[int] = None
+
+    @staticmethod
+    def supports(input_path: Path) -> bool:
+        """Можно ли построить миниатюру для файла"""
+        suffix = Path(input_path).suffix.lower()
+        return suffix in IMAGE_EXTENSIONS or suffix in VIDEO_EXTENSIONS
+
+    def _cache_path(self, input_path: Path) -> Optional[Path]:
+        try:
+            st = os.stat(input_path)
+        except OSError:
+            return None
+        key = f"{os.path.abspath(input_path)}|{st.st_size}|{st.st_mtime_ns}|{self.size[0]}x{self.size[1]}"
+        return self.directory / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.png"
+
+    def get(self, input_path: Path) -> Optional[Path]:
+        """Миниатюра из кэша без генерации (None - ее нет)"""
+        cache_path = self._cache_path(input_path)
+        if cache_path is None or not cache_path.exists():
+            return None
+        try:
+            # Время изменения отмечает последнее использование для вытеснения
+            os.utime(cache_path)
+        except OSError:
+            pass
+        return cache_path
+
+    def thumbnail(self, input_path: Path) -> Optional[Path]:
+        """
+        Миниатюра файла: из кэша или с генерацией
+
+        Returns:
+            Optional[Path]: PNG файл миниатюры или None, если построить ее не удалось
+        """
+        input_path = Path(input_path)
+        if not self.supports(input_path):
+            return None
+        cached = self.get(input_path)
+        if cached is not None:
+            return cached
+
+        cache_path = self._cache_path(input_path)
+        if cache_path is None:
+            return None
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_name(f"{cache_path.stem}.{threading.get_ident()}.tmp.png")
+
+        if input_path.suffix.lower() in IMAGE_EXTENSIONS:
+            created = self._image_thumbnail(input_path, tmp_path)
+        else:
+            created = self._video_poster(input_path, tmp_path)
+        if not created:
+            tmp_path.unlink(missing_ok=True)
+            return None
+
+        os.replace(tmp_path, cache_path)
+        self._account(cache_path.stat().st_size)
+        return cache_path
+
+    def _image_thumbnail(self, input_path: Path, output_path: Path) -> bool:
+        """Миниатюра изображения; draft позволяет JPEG декодироваться сразу в уменьшенном масштабе"""
+        try:
+            from PIL import Image
+
+            with Image.open(input_path) as img:
+                img.draft('RGB', self.size)
+                img.thumbnail(self.size)
+                if img.mode not in ('RGB', 'RGBA'):
+                    img = img.convert('RGBA' if 'A' in img.getbands() or 'transparency' in img.info else 'RGB')
+                img.save(output_path, 'PNG')
+            return True
+        except ImportError:
+            return False
+        except Exception as e:
+            logger.debug(f"Не удалось построить миниатюру {input_path.name}: {e}")
+            return False
+
+    def _video_poster(self, input_path: Path, output_path: Path) -> bool:
+        """Кадр видео: -ss перед -i переходит к ближайшему ключевому кадру без декодирования начала"""
+        width, height = self.size
+        for seek in (POSTER_SEEK_SECONDS, 0.0):
+            cmd = [
+                self.ffmpeg_path, '-v', 'error', '-noaccurate_seek', '-ss', str(seek),
+                '-i', str(input_path), '-frames:v', '1', '-an',
+                '-vf', f'scale={width}:{height}:force_original_aspect_ratio=decrease',
+                '-y', str(output_path)
+            ]
+            try:
+                subprocess.run(cmd, stdin=subprocess.DEVNULL, capture_output=True, timeout=POSTER_TIMEOUT)
+            except (OSError, subprocess.TimeoutExpired) as e:
+                logger.debug(f"Не удалось получить кадр {input_path.name}: {e}")
+                return False
+            # Ролики короче позиции постера дают пустой результат - повторяем с начала
+            if output_path.exists() and output_path.stat().st_size > 0:
+                return True
+        return False
+
+    def _account(self, added_bytes: int):
+        """Учет объема кэша и вытеснение давно не использованных миниатюр"""
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(entry.stat().st_size for entry in self._entries())
+            else:
+                self._total_bytes += added_bytes
+            if self._total_bytes <= self.max_bytes:
+                return
+
+            # Вытесняем до 90% лимита, чтобы не чистить кэш на каждой записи
+            entries = sorted(self._entries(), key=lambda entry: entry.stat().st_mtime)
+            target = self.max_bytes * 0.9
+            for entry in entries:
+                if self._total_bytes <= target:
+                    break
+                try:
+                    size = entry.stat().st_size
+                    os.unlink(entry.path)
+                    self._total_bytes -= size
+                except OSError:
+                    continue
+
+    def _entries(self):
+        try:
+            with os.scandir(self.directory) as it:
+                return [entry for entry in it if entry.is_file() and not entry.name.endswith('.tmp.png')]
+        except OSError:
+            return []
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Трассировка заданий конвертации с записью в файл OTLP JSON
+Lightweight per-job tracing exported as OTLP/JSON lines (one ExportTraceServiceRequest per job)
+"""
+
+import contextlib
+import json
+import os
+import shlex
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = 'umconverter'
+SCOPE_NAME = 'umconverter.conversion'
+
+# Вид и статус спана по спецификации OTLP
+SPAN_KIND_INTERNAL = 1
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+
+def new_trace_id() -> str:
+    return os.urandom(16).hex()
+
+
+def new_span_id() -> str:
+    return os.urandom(8).hex()
+
+
+def _attribute_value(value) -> Dict:
+    """Значение атрибута OTLP JSON (int64 передается строкой)"""
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    if isinstance(value, (list, tuple)):
+        return {'arrayValue': {'values': [_attribute_value(item) for item in value]}}
+    return {'stringValue': str(value)}
+
+
+def _attributes(attributes: Dict) -> List[Dict]:
+    return [{'key': key, 'value': _attribute_value(value)}
+            for key, value in attributes.items() if value is not None]
+
+
+def ffmpeg_attributes(cmd: List[str], result) -> Dict:
+    """Атрибуты спана запуска FFmpeg: команда, код выхода и ресурсы процесса"""
+    return {
+        'process.executable.name': Path(cmd[0]).name,
+        'process.command_line': shlex.join(str(part) for part in cmd),
+        'process.exit_code': result.returncode,
+        'ffmpeg.timed_out': result.timed_out,
+        'ffmpeg.stalled': result.stalled,
+        'ffmpeg.cancelled': result.cancelled,
+        'process.cpu.time': result.cpu_seconds,
+        'process.memory.peak_mb': result.peak_rss_mb,
+    }
+
+
+class Span:
+    """Завершенный интервал задания"""
+
+    def __init__(self, name: str, span_id: str, parent_id: Optional[str],
+                 start_ns: int, end_ns: int, attributes: Dict = None, error: str = None):
+        self.name = name
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.start_ns = start_ns
+        self.end_ns = end_ns
+        self.attributes = attributes or {}
+        self.error = error
+
+    def to_otlp(self, trace_id: str) -> Dict:
+        span = {
+            'traceId': trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': SPAN_KIND_INTERNAL,
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(max(self.end_ns, self.start_ns)),
+            'attributes': _attributes(self.attributes),
+            'status': {'code': STATUS_ERROR, 'message': self.error} if self.error else {'code': STATUS_OK},
+        }
+        if self.parent_id:
+            span['parentSpanId'] = self.parent_id
+        return span
+
+
+class JobTrace:
+    """
+    Трасса одного задания: корневой спан задания и дочерние спаны этапов.
+
+    Спаны этапов добавляются по мере выполнения; корневой спан охватывает
+    их все (включая поиск файлов и ожидание в очереди, начавшиеся до
+    задания) и создается при завершении.
+    """
+
+    def __init__(self, tracer: 'Tracer', name: str, attributes: Dict = None,
+                 trace_id: str = None):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id or new_trace_id()
+        self.root_id = new_span_id()
+        self.attributes = dict(attributes or {})
+        self.spans: List[Span] = []
+        self._start_ns = time.time_ns()
+        self._lock = threading.Lock()
+
+    def add_span(self, name: str, start_ns: int, end_ns: int,
+                 attributes: Dict = None, error: str = None) -> Span:
+        """Спан с известными границами (time.time_ns)"""
+        span = Span(name, new_span_id(), self.root_id, start_ns, end_ns, attributes, error)
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    @contextlib.contextmanager
+    def span(self, name: str, attributes: Dict = None):
+        """Спан на время блока; атрибуты можно дополнять внутри блока, исключение отмечается ошибкой"""
+        attributes = dict(attributes or {})
+        start_ns = time.time_ns()
+        try:
+            yield attributes
+        except Exception as e:
+            self.add_span(name, start_ns, time.time_ns(), attributes, str(e) or type(e).__name__)
+            raise
+        self.add_span(name, start_ns, time.time_ns(), attributes)
+
+    def finish(self, success: bool, error: str = None, attributes: Dict = None):
+        """Корневой спан и запись трассы в файл"""
+        self.attributes.update(attributes or {})
+        self.attributes['umconverter.success'] = success
+        with self._lock:
+            start_ns = min([self._start_ns] + [span.start_ns for span in self.spans])
+            end_ns = max([time.time_ns()] + [span.end_ns for span in self.spans])
+            root = Span(self.name, self.root_id, None, start_ns, end_ns, self.attributes,
+                        None if success else (error or 'ошибка'))
+            spans = [root] + self.spans
+        self.tracer.export(self.trace_id, spans)
+
+
+class Tracer:
+    """
+    Запись трасс в файл: строка JSON на задание в формате ExportTraceServiceRequest
+    OTLP (как у file exporter OpenTelemetry Collector), поэтому файл можно читать
+    во время долгого запуска и загружать в otlpjsonfile receiver или Jaeger/Tempo
+    """
+
+    def __init__(self, path: Path, service_name: str = SERVICE_NAME):
+        """
+        Args:
+            path: Файл трасс (*.jsonl)
+            service_name: Значение service.name в ресурсе
+        """
+        self.path = Path(path)
+        self.service_name = service_name
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self._resource = {'attributes': _attributes({
+            'service.name': service_name,
+            'process.pid': os.getpid(),
+        })}
+
+    def start_trace(self, name: str, attributes: Dict = None, trace_id: str = None) -> JobTrace:
+        """
+        Новая трасса задания
+
+        Args:
+            name: Имя корневого спана
+            attributes: Атрибуты задания (файл, тип)
+            trace_id: Идентификатор трассы (32 hex-символа), например id задания сервиса
+        """
+        return JobTrace(self, name, attributes, trace_id)
+
+    def export(self, trace_id: str, spans: List[Span]):
+        request = {'resourceSpans': [{
+            'resource': self._resource,
+            'scopeSpans': [{
+                'scope': {'name': SCOPE_NAME},
+                'spans': [span.to_otlp(trace_id) for span in spans],
+            }],
+        }]}
+        line = json.dumps(request, ensure_ascii=False) + '\n'
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                logger.info(f"🧵 Трассы заданий: {self.path}")
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Постоянная очередь конвертации, пополняемая во время работы
+Persistent job queue with a worker pool that accepts new jobs while busy
+"""
+
+import collections
+import threading
+import time
+from typing import Any, Callable, List
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ConversionQueue:
+    """
+    Очередь заданий с пулом из workers потоков.
+
+    Задания можно добавлять в любой момент; свободные потоки запускаются сразу.
+    Когда очередь пуста, все потоки завершились и нет незакрытых пакетов
+    (begin_batch/end_batch), вызывается on_drained, и очередь считается
+    завершенной - новые задания она больше не принимает.
+    """
+
+    def __init__(self, handler: Callable[[int, Any, float], None], workers: int,
+                 on_drained: Callable[[], None] = None):
+        """
+        Args:
+            handler: Обработчик задания, вызывается с (номер потока, задание,
+                время постановки в очередь time.time())
+            workers: Максимальное количество одновременных заданий
+            on_drained: Вызывается один раз, когда вся работа выполнена
+        """
+        self.handler = handler
+        self.on_drained = on_drained
+        self.pending = collections.deque()
+        self.free_slots: List[int] = list(range(max(1, workers)))[::-1]
+        self.active_workers = 0
+        self.open_batches = 0
+        self.cancelled = False
+        self.finished = False
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return not self.finished
+
+    def begin_batch(self) -> bool:
+        """
+        Начало пакета добавлений: очередь не завершится, пока пакет открыт
+
+        Returns:
+            bool: False, если очередь уже завершена
+        """
+        with self._lock:
+            if self.finished:
+                return False
+            self.open_batches += 1
+            return True
+
+    def end_batch(self):
+        """Конец пакета добавлений"""
+        with self._lock:
+            self.open_batches -= 1
+            drained = self._check_drained()
+        if drained:
+            self._notify_drained()
+
+    def add(self, job: Any) -> bool:
+        """
+        Добавление задания (из любого потока)
+
+        Returns:
+            bool: False, если очередь уже завершена или отменена
+        """
+        with self._lock:
+            if self.finished or self.cancelled:
+                return False
+            self.pending.append((job, time.time()))
+            # Работающие потоки заняты своими заданиями - задание берет новый поток
+            if self.free_slots:
+                slot = self.free_slots.pop()
+                self.active_workers += 1
+                threading.Thread(target=self._worker, args=(slot,), daemon=True).start()
+            return True
+
+    def cancel(self):
+        """Отмена заданий, которые еще не начаты"""
+        with self._lock:
+            self.cancelled = True
+            self.pending.clear()
+            drained = self._check_drained()
+        if drained:
+            self._notify_drained()
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self.pending)
+
+    def _check_drained(self) -> bool:
+        """Проверка завершения всей работы (под блокировкой)"""
+        if self.finished or self.pending or self.active_workers or self.open_batches:
+            return False
+        self.finished = True
+        return True
+
+    def _notify_drained(self):
+        if self.on_drained:
+            try:
+                self.on_drained()
+            except Exception as e:
+                logger.error(f"Ошибка обработчика завершения очереди: {e}")
+
+    def _worker(self, slot: int):
+        while True:
+            with self._lock:
+                if self.cancelled or not self.pending:
+                    self.free_slots.append(slot)
+                    self.active_workers -= 1
+                    drained = self._check_drained()
+                    break
+                job, queued_at = self.pending.popleft()
+            try:
+                self.handler(slot, job, queued_at)
+            except Exception as e:
+                logger.error(f"Ошибка задания конвертации: {e}")
+
+        if drained:
+            self._notify_drained()
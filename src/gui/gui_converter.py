@@ -4,249 +4,152 @@
 Поддерживает конвертацию любых форматов в любые форматы через FFmpeg
 """
 
+import time
+
+# Начало загрузки модуля - отсчет для замера времени запуска (--startup-timing)
+STARTUP_T0 = time.perf_counter()
+
+import collections
+import contextlib
 import os
+import sys
 import threading
-import subprocess
 import logging
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
 import tkinter as tk
 from tkinter import filedialog
 import customtkinter as ctk
-from CTkMessagebox import CTkMessagebox
-
-# Импорт локализации
-try:
-    from ..utils.gui_localization import GUILocalization
-except ImportError:
-    # Если относительный импорт не работает, пробуем абсолютный
-    import sys
-    import os
-    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    try:
-        from utils.gui_localization import GUILocalization
-    except ImportError:
-        # Fallback к старой локализации
-        try:
-            from .localization import Localization as GUILocalization
-        except ImportError:
-            print("Warning: Localization not found")
-            GUILocalization = None
 
 import json
-import time
-import re
 
-# drag&drop
+# Модули ядра конвертера
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.ffmpeg_converter import FFmpegConverter
+from core.media_probe import find_ffprobe, probe_media
+from core.preflight import preflight
+from core.file_scanner import scan_paths, split_drop_data
+from core.dependency_cache import DependencyCache
+from core.thumbnail_cache import ThumbnailCache
+from core.log_setup import DEFAULT_LOG_DIR, add_logging_arguments, setup_logging_from_args
+
+try:
+    from .virtual_file_list import VirtualFileList
+except ImportError:
+    from gui.virtual_file_list import VirtualFileList
 try:
-    from tkinterdnd2 import TkinterDnD, DND_ALL
+    from .ui_bridge import UIBridge
+    from .log_view import LogView, LEVEL_INFO, LEVEL_WARNING, LEVEL_ERROR
+    from .job_panel import JobPanel
+    from .conversion_queue import ConversionQueue
+    from .thumbnail_loader import ThumbnailLoader
 except ImportError:
-    print("⚠️ tkinterdnd2 не установлен. Drag&drop будет недоступен.")
-    TkinterDnD = None
-    DND_ALL = None
+    from gui.ui_bridge import UIBridge
+    from gui.log_view import LogView, LEVEL_INFO, LEVEL_WARNING, LEVEL_ERROR
+    from gui.job_panel import JobPanel
+    from gui.conversion_queue import ConversionQueue
+    from gui.thumbnail_loader import ThumbnailLoader
+from core.throughput_stats import ThroughputStats, format_duration
+
+# drag&drop: tkinterdnd2 загружается при создании окна (create_root)
+TkinterDnD = None
+DND_ALL = None
 
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('gui_conversion.log'),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
 # Настройка customtkinter
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("blue")
 
-# Создаем класс CTk с поддержкой drag&drop
-if TkinterDnD:
+
+def create_root():
+    """Главное окно CTk с поддержкой drag&drop, если установлен tkinterdnd2"""
+    global TkinterDnD, DND_ALL
+    try:
+        from tkinterdnd2 import TkinterDnD, DND_ALL
+    except ImportError:
+        print("⚠️ tkinterdnd2 не установлен. Drag&drop будет недоступен.")
+        return ctk.CTk()
+    
     class CTk(ctk.CTk, TkinterDnD.DnDWrapper):
         def __init__(self, *args, **kwargs):
             super().__init__(*args, **kwargs)
             self.TkdndVersion = TkinterDnD._require(self)
-else:
-    CTk = ctk.CTk
-
-class FFmpegConverter:
-    """Класс для работы с FFmpeg"""
-    
-    def __init__(self):
-        self.supported_formats = self._get_supported_formats()
-        self.ffmpeg_path = self._find_ffmpeg()
-        
-    def _find_ffmpeg(self) -> str:
-        """Поиск FFmpeg в системе или локальной сборке"""
-        # Сначала проверяем локальную сборку
-        local_paths = [
-            "bin/bin/ffmpeg.exe",  # Windows
-            "bin/bin/ffmpeg",      # Linux/macOS
-            "bin/ffmpeg/bin/ffmpeg.exe",  # Скачанная версия
-            "ffmpeg.bat",          # Windows wrapper
-            "ffmpeg.sh"            # Linux/macOS wrapper
-        ]
-        
-        for path in local_paths:
-            if Path(path).exists():
-                return path
-        
-        # Если локальная версия не найдена, используем системную
-        return "ffmpeg"
-    
-    def _get_supported_formats(self) -> Dict[str, List[str]]:
-        """Получение поддерживаемых форматов через FFmpeg"""
-        formats = {
-            'video': ['mp4', 'avi', 'mov', 'mkv', 'wmv', 'flv', 'webm', 'm4v', '3gp', 'ogv'],
-            'audio': ['mp3', 'wav', 'aac', 'ogg', 'flac', 'm4a', 'wma', 'opus'],
-            'image': ['jpg', 'jpeg', 'png', 'bmp', 'tiff', 'webp', 'gif', 'ico', 'svg']
-        }
-        return formats
     
-    def check_ffmpeg(self) -> bool:
-        """Проверка наличия FFmpeg"""
-        try:
-            if self.ffmpeg_path.endswith('.bat') or self.ffmpeg_path.endswith('.sh'):
-                # Для скриптов-оберток
-                result = subprocess.run([self.ffmpeg_path, '-version'], 
-                                      capture_output=True, text=True)
-            else:
-                # Для прямого вызова
-                result = subprocess.run([self.ffmpeg_path, '-version'], 
-                                      capture_output=True, text=True)
-            return result.returncode == 0
-        except FileNotFoundError:
-            return False
-    
-    def get_file_info(self, file_path: str) -> Dict:
-        """Получение информации о файле через FFmpeg"""
-        try:
-            # Определяем путь к ffprobe
-            ffprobe_path = self.ffmpeg_path.replace('ffmpeg', 'ffprobe')
-            if not Path(ffprobe_path).exists():
-                ffprobe_path = 'ffprobe'  # Используем системную версию
-            
-            cmd = [
-                ffprobe_path, '-v', 'quiet', '-print_format', 'json',
-                '-show_format', '-show_streams', str(file_path)
-            ]
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
-            if result.returncode == 0:
-                return json.loads(result.stdout)
-            else:
-                return {}
-        except Exception as e:
-            logger.error(f"Ошибка получения информации о файле: {e}")
-            return {}
+    return CTk()
+
+
+def load_localization():
+    """Класс локализации (None, если не найден); загружается при создании окна"""
+    try:
+        from utils.gui_localization import GUILocalization
+        return GUILocalization
+    except ImportError:
+        print("Warning: Localization not found")
+        return None
+
+# Модули загружены, окно еще не создано
+STARTUP_IMPORTED = time.perf_counter()
+
+
+def show_message(**kwargs):
+    """Диалог CTkMessagebox; модуль загружается при первом показе, а не при запуске"""
+    from CTkMessagebox import CTkMessagebox
+    return CTkMessagebox(**kwargs)
+
+
+# Оценки скорости по умолчанию, пока история конвертаций пуста
+DEFAULT_RATES = {
+    'video': 0.5,   # секунд видео в секунду
+    'audio': 20.0,  # секунд аудио в секунду
+    'image': 2.0,   # мегапикселей в секунду
+}
+DEFAULT_SIZE_RATIO = 0.5
+
+# Поддерживаемые входные форматы
+SUPPORTED_EXTENSIONS = {'.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm',
+                        '.mp3', '.wav', '.aac', '.ogg', '.flac', '.m4a',
+                        '.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp'}
+
+# Сколько последних строк лога показывать в окне прогресса
+LOG_CAPACITY = 5000
+
+# Сколько загруженных миниатюр держать в памяти; маркер "миниатюра еще не запрошена"
+THUMBNAIL_MEMORY_ITEMS = 256
+THUMBNAIL_MISSING = object()
+
+# Высота строки списка файлов и иконки типов файлов
+FILE_ROW_HEIGHT = 56
+FILE_TYPE_ICONS = {
+    "video": "🎬",
+    "audio": "🎵",
+    "image": "🖼️",
+}
+
+
+class FileRow:
+    """Виджеты одной строки списка файлов, переиспользуемые при прокрутке"""
     
-    def convert_file(self, input_path: str, output_path: str, 
-                    video_codec: str = None, audio_codec: str = None,
-                    quality: int = 80, callback=None) -> bool:
-        """
-        Конвертация файла через FFmpeg
-        
-        Args:
-            input_path: Путь к входному файлу
-            output_path: Путь к выходному файлу
-            video_codec: Видеокодек (если None - автоматический выбор)
-            audio_codec: Аудиокодек (если None - автоматический выбор)
-            quality: Качество (1-100)
-            callback: Функция обратного вызова для прогресса
-        """
-        try:
-            # Базовые параметры
-            cmd = [self.ffmpeg_path, '-i', str(input_path)]
-            
-            # Определяем тип файла по расширению
-            input_ext = Path(input_path).suffix.lower()
-            output_ext = Path(output_path).suffix.lower()
-            
-            # Настройки для видео
-            if input_ext in ['.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm']:
-                if video_codec:
-                    cmd.extend(['-c:v', video_codec])
-                else:
-                    # Автоматический выбор кодека
-                    if output_ext == '.webm':
-                        cmd.extend(['-c:v', 'libvpx-vp9'])
-                    elif output_ext == '.mp4':
-                        cmd.extend(['-c:v', 'libx264'])
-                    elif output_ext == '.avi':
-                        cmd.extend(['-c:v', 'libxvid'])
-                
-                if audio_codec:
-                    cmd.extend(['-c:a', audio_codec])
-                else:
-                    if output_ext == '.webm':
-                        cmd.extend(['-c:a', 'libopus'])
-                    else:
-                        cmd.extend(['-c:a', 'aac'])
-                
-                # Настройки качества
-                if output_ext == '.webm':
-                    cmd.extend(['-crf', '30'])
-                else:
-                    cmd.extend(['-crf', str(31 - int(quality * 0.31))])
-            
-            # Настройки для аудио
-            elif input_ext in ['.mp3', '.wav', '.aac', '.ogg', '.flac', '.m4a']:
-                if audio_codec:
-                    cmd.extend(['-c:a', audio_codec])
-                else:
-                    if output_ext == '.mp3':
-                        cmd.extend(['-c:a', 'libmp3lame'])
-                    elif output_ext == '.aac':
-                        cmd.extend(['-c:a', 'aac'])
-                    elif output_ext == '.ogg':
-                        cmd.extend(['-c:a', 'libvorbis'])
-                    elif output_ext == '.opus':
-                        cmd.extend(['-c:a', 'libopus'])
-                
-                # Настройки качества для аудио
-                if output_ext == '.mp3':
-                    cmd.extend(['-b:a', f'{quality * 3}k'])
-                elif output_ext == '.aac':
-                    cmd.extend(['-b:a', f'{quality * 2}k'])
-            
-            # Настройки для изображений
-            elif input_ext in ['.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp']:
-                if output_ext == '.webp':
-                    cmd.extend(['-quality', str(quality)])
-                elif output_ext == '.jpg':
-                    cmd.extend(['-q:v', str(31 - int(quality * 0.31))])
-            
-            # Выходной файл
-            cmd.extend(['-y', str(output_path)])
-            
-            # Запуск конвертации
-            process = subprocess.Popen(
-                cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-                universal_newlines=True
-            )
-            
-            # Ожидание завершения
-            stdout, stderr = process.communicate()
-            
-            if process.returncode == 0:
-                logger.info(f"✅ Успешно конвертирован: {input_path} -> {output_path}")
-                return True
-            else:
-                logger.error(f"❌ Ошибка конвертации: {stderr}")
-                return False
-                
-        except Exception as e:
-            logger.error(f"❌ Ошибка конвертации {input_path}: {str(e)}")
-            return False
+    def __init__(self, frame, icon_label, thumb_label, name_label, format_label, format_combo, delete_btn):
+        self.frame = frame
+        self.icon_label = icon_label
+        self.thumb_label = thumb_label
+        self.name_label = name_label
+        self.format_label = format_label
+        self.format_combo = format_combo
+        self.delete_btn = delete_btn
 
 class ModernConverterGUI:
     """Современный GUI конвертер с переключением экранов"""
     
-    def __init__(self, language: str = "ru"):
-        self.root = CTk()
+    def __init__(self, language: str = "ru", profiler=None):
+        self.root = create_root()
+        # RunProfiler при запуске с --profile
+        self.profiler = profiler
         
         # Инициализация локализации
+        GUILocalization = load_localization()
         if GUILocalization:
             self.loc = GUILocalization(language)
         else:
@@ -260,27 +163,72 @@ class ModernConverterGUI:
         
         # Инициализация конвертера
         self.converter = FFmpegConverter()
+        self.stats = ThroughputStats()
         self.selected_files = []
         self.output_directory = ""
         self.conversion_running = False
+        self.max_workers = 1
+        self.cancel_event = threading.Event()
+        self.conversion_queue = None
+        self.session: Dict = {}
+        self.session_lock = threading.Lock()
+        self.scan_cancel = threading.Event()
+        self.scanning = False
+        
+        # Результат проверки FFmpeg (None - проверка еще идет)
+        self.dependency_cache = DependencyCache()
+        self.ffmpeg_ok: Optional[bool] = None
+        self.ffmpeg_checking = False
+        # Действия, ожидающие фоновой проверки FFmpeg (запуск конвертации)
+        self.ffmpeg_waiting: List = []
+        
+        # Настройки, нужные до постройки экранов, на которых они показываются
+        cpu_count = os.cpu_count() or 1
+        self.convert_on_drop_var = tk.BooleanVar(value=False)
+        self.save_log_var = tk.BooleanVar(value=False)
+        self.workers_var = tk.StringVar(value=str(max(1, cpu_count // 2)))
+        
+        # Миниатюры: кэш на диске и последние загруженные изображения в памяти
+        self.thumbnail_loader = ThumbnailLoader(
+            ThumbnailCache(ffmpeg_path=self.converter.ffmpeg_path),
+            on_ready=lambda path, thumb: self.ui.post("thumbnail", (path, thumb))
+        )
+        self.thumbnail_images = collections.OrderedDict()
         
-        # Словарь для хранения выбранных форматов файлов
-        self.file_formats = {}
+        # Экраны создаются при первом показе
+        self.screens: Dict[str, ctk.CTkFrame] = {}
+        
+        # Выбранные выходные форматы, параллельно списку файлов
+        self.file_formats: List[str] = []
         
         # Переменная для отслеживания предыдущего экрана
         self.previous_screen = None
         
+        # Очередь событий: рабочие потоки не трогают виджеты напрямую.
+        # Виджеты экрана прогресса берутся в момент обработки события
+        self.ui = UIBridge(self.root)
+        self.ui.register("log", self._append_log)
+        self.ui.register("progress", lambda value: self.progress_bar.set(value), coalesce=True)
+        self.ui.register("status", lambda text: self.progress_status.configure(text=text), coalesce=True)
+        self.ui.register("job", self._on_job_event)
+        self.ui.register("throughput", lambda text: self.job_panel.set_throughput(text), coalesce=True)
+        self.ui.register("scan_batch", self._on_scan_batches)
+        self.ui.register("scan_status", self._set_scan_status, coalesce=True)
+        self.ui.register("thumbnail", self._on_thumbnails)
+        self.ui.start()
+        
         # Создание интерфейса
         self._create_widgets()
-        self._check_dependencies()
         
         # Показываем стартовый экран
         self.show_start_screen()
+        self._check_dependencies()
+        self.startup_created = time.perf_counter()
     
-    def _get_text(self, key: str, default: str = None) -> str:
+    def _get_text(self, key: str, default: str = None, **kwargs) -> str:
         """Безопасное получение текста с fallback"""
         if self.loc:
-            return self.loc.get(key)
+            return self.loc.get(key, **kwargs)
         return default or key
     
     def _create_widgets(self):
@@ -290,12 +238,7 @@ class ModernConverterGUI:
         self.main_frame = ctk.CTkFrame(self.root)
         self.main_frame.pack(fill="both", expand=True, padx=20, pady=20)
         
-        # Создание фреймов для разных экранов
-        self._create_start_frame()
-        self._create_loading_frame()
-        self._create_files_frame()
-        self._create_output_frame()
-        self._create_progress_frame()
+        # Экраны создаются при первом показе (_get_screen)
         
         # Создание кнопок выбора языка и темы с абсолютной позицией
         self._create_language_button()
@@ -382,6 +325,14 @@ class ModernConverterGUI:
             self.drop_area.dnd_bind("<<DropEnter>>", self._on_drop_enter)
             self.drop_area.dnd_bind("<<DropLeave>>", self._on_drop_leave)
         
+        # Конвертация сразу после drag&drop, без выбора форматов и папки
+        self.convert_on_drop_check = ctk.CTkCheckBox(
+            self.start_frame,
+            text=self._get_text("convert_on_drop"),
+            variable=self.convert_on_drop_var
+        )
+        self.convert_on_drop_check.pack()
+        
         # Статус FFmpeg
         self.ffmpeg_status_label = ctk.CTkLabel(
             self.start_frame,
@@ -492,37 +443,6 @@ class ModernConverterGUI:
         y = self.theme_button.winfo_rooty() + self.theme_button.winfo_height()
         menu.post(x, y)
     
-    def _create_loading_frame(self):
-        """Создание экрана загрузки"""
-        
-        self.loading_frame = ctk.CTkFrame(self.main_frame)
-        
-        # Заголовок
-        self.loading_title = ctk.CTkLabel(
-            self.loading_frame,
-            text=self._get_text("loading_title"),
-            font=ctk.CTkFont(size=24, weight="bold")
-        )
-        self.loading_title.pack(pady=(100, 50))
-        
-        # Индикатор загрузки
-        self.loading_progress = ctk.CTkProgressBar(
-            self.loading_frame,
-            mode="indeterminate",
-            width=400,
-            height=8
-        )
-        self.loading_progress.pack(pady=(0, 30))
-        
-        # Текст статуса
-        self.loading_status = ctk.CTkLabel(
-            self.loading_frame,
-            text=self._get_text("loading_status"),
-            font=ctk.CTkFont(size=16),
-            text_color="gray"
-        )
-        self.loading_status.pack()
-    
     def _create_files_frame(self):
         """Создание экрана со списком файлов"""
         
@@ -536,13 +456,31 @@ class ModernConverterGUI:
         )
         self.files_title.pack(pady=(30, 20))
         
-        # Scrollable frame для файлов
-        self.files_scroll_frame = ctk.CTkScrollableFrame(
+        # Строка фонового поиска файлов
+        self.scan_frame = ctk.CTkFrame(self.files_frame, fg_color="transparent")
+        self.scan_label = ctk.CTkLabel(self.scan_frame, text="", text_color="gray")
+        self.scan_label.pack(side="left", padx=(0, 10))
+        self.scan_cancel_btn = ctk.CTkButton(
+            self.scan_frame,
+            text=self._get_text("scan_cancel_btn"),
+            command=self._cancel_scan,
+            width=100,
+            height=28,
+            fg_color="orange"
+        )
+        self.scan_cancel_btn.pack(side="left")
+        
+        # Виртуализированный список: виджеты только для видимых строк
+        self.files_list = VirtualFileList(
             self.files_frame,
+            create_row=self._create_file_row,
+            bind_row=self._bind_file_row,
+            row_height=FILE_ROW_HEIGHT,
+            on_refresh=self._on_files_list_refresh,
             width=800,
             height=400
         )
-        self.files_scroll_frame.pack(pady=(0, 30), padx=20)
+        self.files_list.pack(pady=(0, 30), padx=20, fill="both", expand=True)
         
         # Кнопки управления
         buttons_frame = ctk.CTkFrame(self.files_frame)
@@ -595,7 +533,30 @@ class ModernConverterGUI:
             command=self._select_output_folder,
             height=40
         )
-        self.select_output_btn.pack(pady=(0, 50))
+        self.select_output_btn.pack(pady=(0, 20))
+        
+        # Полный лог в файл рядом с результатами
+        self.save_log_check = ctk.CTkCheckBox(
+            self.output_frame,
+            text=self._get_text("log_save_full"),
+            variable=self.save_log_var
+        )
+        self.save_log_check.pack(pady=(0, 20))
+        
+        # Количество одновременных конвертаций
+        workers_frame = ctk.CTkFrame(self.output_frame, fg_color="transparent")
+        workers_frame.pack(pady=(0, 30))
+        
+        self.workers_label = ctk.CTkLabel(workers_frame, text=self._get_text("parallel_jobs"))
+        self.workers_label.pack(side="left", padx=(0, 10))
+        
+        self.workers_menu = ctk.CTkOptionMenu(
+            workers_frame,
+            values=[str(i) for i in range(1, (os.cpu_count() or 1) + 1)],
+            variable=self.workers_var,
+            width=80
+        )
+        self.workers_menu.pack(side="left")
         
         # Кнопки управления
         buttons_frame = ctk.CTkFrame(self.output_frame)
@@ -650,12 +611,18 @@ class ModernConverterGUI:
         self.progress_status.pack(pady=(0, 20))
         
         # Лог конвертации
-        self.log_text = ctk.CTkTextbox(
+        self.log_view = LogView(
             self.progress_frame,
+            capacity=LOG_CAPACITY,
+            filter_text=self._get_text("log_errors_only"),
             width=800,
             height=300
         )
-        self.log_text.pack(pady=(0, 30))
+        self.log_view.pack(pady=(0, 30))
+        
+        # Активные задания
+        self.job_panel = JobPanel(self.progress_frame)
+        self.job_panel.pack(fill="x", padx=20, pady=(0, 20), before=self.log_view)
         
         # Кнопки управления
         buttons_frame = ctk.CTkFrame(self.progress_frame)
@@ -669,11 +636,83 @@ class ModernConverterGUI:
             height=40,
             fg_color="orange"
         )
-        self.stop_btn.pack(side="left")
+        self.stop_btn.pack(side="left", padx=(0, 10))
+        
+        # Добавление файлов в работающую очередь
+        self.add_files_btn = ctk.CTkButton(
+            buttons_frame,
+            text=self._get_text("add_files_btn"),
+            command=self._select_files,
+            height=40
+        )
+        self.add_files_btn.pack(side="left")
+        
+        if TkinterDnD:
+            self.progress_frame.drop_target_register(DND_ALL)
+            self.progress_frame.dnd_bind("<<Drop>>", self._on_drop)
     
     def _check_dependencies(self):
-        """Проверка зависимостей"""
-        if self.converter.check_ffmpeg():
+        """Проверка зависимостей: сохраненный результат сразу, иначе в фоновом потоке"""
+        cached = self.dependency_cache.get(self.converter.ffmpeg_path)
+        if cached is not None:
+            self._set_ffmpeg_status(cached)
+            return
+        self._run_ffmpeg_check(refresh=False)
+    
+    def _run_ffmpeg_check(self, refresh: bool):
+        """Фоновая проверка FFmpeg; по завершении выполняются ожидающие ее действия (поток Tk)"""
+        if self.ffmpeg_checking:
+            return
+        self.ffmpeg_checking = True
+        if hasattr(self, 'ffmpeg_status_label'):
+            self.ffmpeg_status_label.configure(text=self._get_text("ffmpeg_status_checking"), text_color="gray")
+        
+        def check():
+            available = self.dependency_cache.check_ffmpeg(self.converter, refresh=refresh)
+            self.ui.call(lambda: self._on_ffmpeg_checked(available))
+        
+        thread = threading.Thread(target=check)
+        thread.daemon = True
+        thread.start()
+    
+    def _on_ffmpeg_checked(self, available: bool):
+        """Результат фоновой проверки FFmpeg (поток Tk)"""
+        self.ffmpeg_checking = False
+        self._set_ffmpeg_status(available)
+        actions, self.ffmpeg_waiting = self.ffmpeg_waiting, []
+        if not actions:
+            return
+        if available:
+            for action in actions:
+                action()
+        else:
+            show_message(
+                title="Ошибка",
+                message=self._get_text("messages.ffmpeg_not_found"),
+                icon="cancel"
+            )
+    
+    def _when_ffmpeg_ready(self, action) -> bool:
+        """
+        Проверка FFmpeg перед запуском конвертации без блокировки окна
+        
+        Returns:
+            bool: True, если FFmpeg уже подтвержден; иначе action будет вызван
+            после фоновой проверки (отрицательный результат перепроверяется)
+        """
+        if self.ffmpeg_ok:
+            return True
+        # Повторный запуск во время проверки не ставит действие дважды
+        self.ffmpeg_waiting = [action]
+        self._run_ffmpeg_check(refresh=self.ffmpeg_ok is False)
+        return False
+    
+    def _set_ffmpeg_status(self, available: bool):
+        """Показ результата проверки FFmpeg на стартовом экране"""
+        self.ffmpeg_ok = available
+        if not hasattr(self, 'ffmpeg_status_label'):
+            return
+        if available:
             self.ffmpeg_status_label.configure(
                 text=self._get_text("ffmpeg_status_ok"),
                 text_color="green"
@@ -684,8 +723,6 @@ class ModernConverterGUI:
                 text_color="red"
             )
     
-
-    
     def _update_interface_texts(self):
         """Обновление всех текстов интерфейса при смене языка"""
         # Обновляем заголовки и кнопки
@@ -710,6 +747,24 @@ class ModernConverterGUI:
         if hasattr(self, 'progress_status'):
             self.progress_status.configure(text=self.loc.get("progress_status_ready"))
         
+        if hasattr(self, 'log_view'):
+            self.log_view.set_filter_text(self.loc.get("log_errors_only"))
+        
+        if hasattr(self, 'save_log_check'):
+            self.save_log_check.configure(text=self.loc.get("log_save_full"))
+        
+        if hasattr(self, 'convert_on_drop_check'):
+            self.convert_on_drop_check.configure(text=self.loc.get("convert_on_drop"))
+        
+        if hasattr(self, 'scan_cancel_btn'):
+            self.scan_cancel_btn.configure(text=self.loc.get("scan_cancel_btn"))
+        
+        if hasattr(self, 'add_files_btn'):
+            self.add_files_btn.configure(text=self.loc.get("add_files_btn"))
+        
+        if hasattr(self, 'workers_label'):
+            self.workers_label.configure(text=self.loc.get("parallel_jobs"))
+        
         # Обновляем кнопки языка и темы
         if hasattr(self, 'language_button'):
             self.language_button.configure(text=self._get_text("language.title", "🌐"))
@@ -727,21 +782,10 @@ class ModernConverterGUI:
         if hasattr(self, 'progress_title'):
             self.progress_title.configure(text=self._get_text("progress_title"))
         
-        if hasattr(self, 'loading_title'):
-            self.loading_title.configure(text=self._get_text("loading_title"))
         
         # Обновляем статус FFmpeg
-        if hasattr(self, 'ffmpeg_status_label'):
-            if self.converter.check_ffmpeg():
-                self.ffmpeg_status_label.configure(
-                    text=self.loc.get("ffmpeg_status_ok"),
-                    text_color="green"
-                )
-            else:
-                self.ffmpeg_status_label.configure(
-                    text=self.loc.get("ffmpeg_status_error"),
-                    text_color="red"
-                )
+        if self.ffmpeg_ok is not None:
+            self._set_ffmpeg_status(self.ffmpeg_ok)
     
     def _on_drop_area_click(self, event):
         """Обработка клика по области drag&drop"""
@@ -780,76 +824,10 @@ class ModernConverterGUI:
         self.drop_text.configure(text=self._get_text("drop_area_text"))
     
     def _on_drop(self, event):
-        """Обработка сброса файлов"""
-        try:
-            # Получаем данные о сброшенных файлах
-            dropped_data = event.data
-            logger.info(f"Получены данные drag&drop: {dropped_data}")
-            
-            # Очищаем данные от фигурных скобок
-            if dropped_data.startswith("{") and dropped_data.endswith("}"):
-                dropped_data = dropped_data[1:-1]
-            
-            # Разбираем файлы
-            files = []
-            
-            # Определяем ОС
-            import platform
-            system = platform.system().lower()
-            
-            if system == "windows":
-                # Для Windows: ищем пути вида C:/path/to/file.ext
-                pattern = r'[A-Za-z]:/[^{}]*?\.\w+(?:\s|$)'
-            elif system == "darwin":  # macOS
-                # Для macOS: ищем пути вида /path/to/file.ext
-                pattern = r'/[^{}]*?\.\w+(?:\s|$)'
-            else:  # Linux
-                # Для Linux: ищем пути вида /path/to/file.ext
-                pattern = r'/[^{}]*?\.\w+(?:\s|$)'
-
-
-            logger.info("Пробуем finditer для поиска полных путей...")
-            matches = re.finditer(pattern, dropped_data, re.IGNORECASE)
-            
-            # Список поддерживаемых расширений
-            supported_extensions = {'.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm', 
-                                   '.mp3', '.wav', '.aac', '.ogg', '.flac', '.m4a', 
-                                   '.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp'}
-            
-            for match in matches:
-                full_path = match.group(0).strip()  # Полный путь
-                
-                # Проверяем расширение файла
-                file_ext = os.path.splitext(full_path)[1].lower()
-                if file_ext not in supported_extensions:
-                    logger.info(f"Пропускаем файл с неподдерживаемым расширением: {full_path}")
-                    continue
-                
-                if full_path and os.path.exists(full_path):
-                    files.append(full_path)
-                    logger.info(f"Добавлен файл (finditer): {full_path}")
-                else:
-                    logger.warning(f"Файл не найден (finditer): {full_path}")
-            
-            if files:
-                logger.info(f"Всего найдено файлов: {len(files)}")
-                self.selected_files = files
-                self.show_loading_screen()
-            else:
-                logger.error("Не удалось найти ни одного файла")
-                CTkMessagebox(
-                    title="Предупреждение",
-                    message=self._get_text("messages.no_files_found"),
-                    icon="warning"
-                )
-                
-        except Exception as e:
-            logger.error(f"Ошибка обработки drag&drop: {e}")
-            CTkMessagebox(
-                title="Ошибка",
-                message=self._get_text("messages.drop_error", error=str(e)),
-                icon="cancel"
-            )
+        """Обработка сброса файлов: разбор данных и поиск файлов выполняются в фоновом потоке"""
+        # Сброс тысяч файлов дает очень длинную строку; подробности только при --log-level DEBUG
+        logger.debug(f"Получены данные drag&drop: {event.data}")
+        self._add_files(drop_data=event.data)
     
     def _select_files(self):
         """Выбор файлов"""
@@ -865,65 +843,45 @@ class ModernConverterGUI:
         )
         
         if files:
-            self.selected_files = list(files)
-            self.show_loading_screen()
+            self._add_files(list(files))
     
     def _select_folder_with_files(self):
-        """Выбор папки с автоматическим поиском медиафайлов"""
+        """Выбор папки с рекурсивным поиском медиафайлов"""
         folder = filedialog.askdirectory(title="Выберите папку с медиафайлами")
         
         if folder:
-            # Поиск всех медиафайлов в папке
-            media_extensions = [
-                '*.mp4', '*.avi', '*.mov', '*.mkv', '*.wmv', '*.flv', '*.webm',
-                '*.mp3', '*.wav', '*.aac', '*.ogg', '*.flac', '*.m4a',
-                '*.jpg', '*.jpeg', '*.png', '*.bmp', '*.tiff', '*.webp'
-            ]
-            
-            files = []
-            for ext in media_extensions:
-                files.extend(Path(folder).glob(ext))
-                files.extend(Path(folder).glob(ext.upper()))
-            
-            if files:
-                self.selected_files = [str(f) for f in files]
-                logger.info(f"Найдено {len(self.selected_files)} файлов в папке {folder}")
-                self.show_loading_screen()
-            else:
-                CTkMessagebox(
-                    title="Предупреждение",
-                    message=self._get_text("messages.no_media_files"),
-                    icon="warning"
-                )
+            self._add_files([folder])
     
-    def show_start_screen(self):
-        """Показать стартовый экран"""
-        self._hide_all_frames()
-        self.start_frame.pack(fill="both", expand=True)
+    def _get_screen(self, name: str) -> ctk.CTkFrame:
+        """Экран по имени; создается при первом обращении"""
+        if name not in self.screens:
+            builders = {
+                "start": self._create_start_frame,
+                "files": self._create_files_frame,
+                "output": self._create_output_frame,
+                "progress": self._create_progress_frame,
+            }
+            builders[name]()
+            self.screens[name] = getattr(self, f"{name}_frame")
+        return self.screens[name]
     
-    def show_loading_screen(self):
-        """Показать экран загрузки"""
+    def _show_screen(self, name: str):
+        """Показ экрана вместо текущего"""
         self._hide_all_frames()
-        self.loading_frame.pack(fill="both", expand=True)
-        
-        # Запускаем анимацию загрузки
-        self.loading_progress.start()
-        
-        # Запускаем анализ файлов в отдельном потоке
-        thread = threading.Thread(target=self._analyze_files)
-        thread.daemon = True
-        thread.start()
+        self._get_screen(name).pack(fill="both", expand=True)
+    
+    def show_start_screen(self):
+        """Показать стартовый экран"""
+        self._show_screen("start")
     
     def show_files_screen(self):
         """Показать экран со списком файлов"""
-        self._hide_all_frames()
-        self.files_frame.pack(fill="both", expand=True)
+        self._show_screen("files")
         self._populate_files_list()
     
     def show_output_screen(self):
         """Показать экран выбора выходной папки"""
-        self._hide_all_frames()
-        self.output_frame.pack(fill="both", expand=True)
+        self._show_screen("output")
         
         # Устанавливаем дефолтную папку
         default_output = Path.cwd() / "converted"
@@ -932,87 +890,88 @@ class ModernConverterGUI:
     
     def show_progress_screen(self):
         """Показать экран прогресса"""
-        self._hide_all_frames()
-        self.progress_frame.pack(fill="both", expand=True)
+        self._show_screen("progress")
     
     def _hide_all_frames(self):
         """Скрыть все фреймы"""
-        for frame in [self.start_frame, self.loading_frame, self.files_frame, 
-                     self.output_frame, self.progress_frame]:
+        for frame in self.screens.values():
             frame.pack_forget()
     
-    def _analyze_files(self):
-        """Анализ файлов в отдельном потоке"""
-        try:
-            # Имитируем анализ файлов
-            for i, file_path in enumerate(self.selected_files):
-                self.loading_status.configure(text=f"Анализ файла {i+1}/{len(self.selected_files)}...")
-                time.sleep(0.5)  # Имитация работы
-            
-            # Переходим к экрану файлов
-            self.root.after(0, self.show_files_screen)
-            
-        except Exception as e:
-            logger.error(f"Ошибка анализа файлов: {e}")
-            self.root.after(0, self.show_start_screen)
+    def _show_invalid_files(self, invalid):
+        """Сообщение о файлах, отклоненных предварительной проверкой"""
+        details = "\n".join(f"{Path(path).name}: {error}" for path, error in invalid[:10])
+        if len(invalid) > 10:
+            details += "\n..."
+        show_message(
+            title=self._get_text("messages.warning_title"),
+            message=self._get_text("messages.invalid_files", count=len(invalid), files=details),
+            icon="warning"
+        )
     
     def _populate_files_list(self):
         """Заполнение списка файлов"""
-        # Очищаем старые виджеты
-        for widget in self.files_scroll_frame.winfo_children():
-            widget.destroy()
+        # Форматы хранятся строками параллельно списку файлов, а не в виджетах
+        if len(self.file_formats) != len(self.selected_files):
+            self.file_formats = [
+                self._formats_for_type(self._get_file_type(Path(f).suffix.lower()))[0]
+                for f in self.selected_files
+            ]
         
-        # Добавляем файлы
-        for i, file_path in enumerate(self.selected_files):
-            self._create_file_item(file_path, i)
+        self.files_list.set_count(len(self.selected_files))
     
-    def _create_file_item(self, file_path: str, index: int):
-        """Создание элемента файла в списке"""
-        file_frame = ctk.CTkFrame(self.files_scroll_frame)
-        file_frame.pack(fill="x", pady=5, padx=10)
-        
-        # Иконка файла
-        icon_frame = ctk.CTkFrame(file_frame, fg_color="transparent", width=50)
-        icon_frame.pack(side="left", padx=(10, 5), pady=10)
-        icon_frame.pack_propagate(False)
-        
-        # Определяем иконку по типу файла
-        current_ext = Path(file_path).suffix.lower()
-        file_type = self._get_file_type(current_ext)
+    def _formats_for_type(self, file_type: str) -> List[str]:
+        """Доступные выходные форматы для типа файла"""
+        # Определяем доступные форматы из локализации
+        formats = self._get_text("formats." + file_type)
+        if isinstance(formats, list) and formats:
+            return formats
         
+        # Fallback форматы
         if file_type == "video":
-            icon_text = "🎬"
+            return ["mp4", "webm", "avi", "mkv", "mov"]
         elif file_type == "audio":
-            icon_text = "🎵"
+            return ["mp3", "wav", "aac", "ogg", "opus"]
         elif file_type == "image":
-            icon_text = "🖼️"
-        else:
-            icon_text = "📄"
+            return ["webp", "jpg", "png"]
+        return ["mp4", "webm", "avi", "mkv", "mov", "mp3", "wav", "aac", "ogg", "opus", "webp", "jpg", "png"]
+    
+    def _create_file_row(self, parent) -> "FileRow":
+        """Создание переиспользуемой строки списка файлов"""
+        file_frame = ctk.CTkFrame(parent, height=FILE_ROW_HEIGHT)
+        file_frame.pack_propagate(False)
+        
+        # Иконка файла
+        icon_frame = ctk.CTkFrame(file_frame, fg_color="transparent", width=50)
+        icon_frame.pack(side="left", padx=(10, 5), pady=5)
+        icon_frame.pack_propagate(False)
         
         icon_label = ctk.CTkLabel(
             icon_frame,
-            text=icon_text,
+            text="",
             font=ctk.CTkFont(size=24)
         )
         icon_label.pack(expand=True)
         
+        # Миниатюра заменяет иконку, когда готова
+        thumb_label = ctk.CTkLabel(icon_frame, text="")
+        
         # Информация о файле
         file_info = ctk.CTkFrame(file_frame, fg_color="transparent")
-        file_info.pack(side="left", fill="x", expand=True, padx=5, pady=10)
+        file_info.pack(side="left", fill="x", expand=True, padx=5, pady=5)
         
         # Имя файла
-        file_name = Path(file_path).name
         name_label = ctk.CTkLabel(
             file_info,
-            text=file_name,
-            font=ctk.CTkFont(size=14, weight="bold")
+            text="",
+            font=ctk.CTkFont(size=14, weight="bold"),
+            anchor="w"
         )
-        name_label.pack(anchor="w")
+        name_label.pack(anchor="w", fill="x")
         
         # Текущий формат
         format_label = ctk.CTkLabel(
             file_info,
-            text=self._get_text("current_format"),
+            text="",
             font=ctk.CTkFont(size=12),
             text_color="gray"
         )
@@ -1020,51 +979,85 @@ class ModernConverterGUI:
         
         # Выбор выходного формата
         format_frame = ctk.CTkFrame(file_frame, fg_color="transparent")
-        format_frame.pack(side="right", padx=10, pady=10)
-        
-        # Определяем доступные форматы из локализации
-        formats = self._get_text("formats." + file_type)
-        if not formats:
-            # Fallback форматы
-            if file_type == "video":
-                formats = ["mp4", "webm", "avi", "mkv", "mov"]
-            elif file_type == "audio":
-                formats = ["mp3", "wav", "aac", "ogg", "opus"]
-            elif file_type == "image":
-                formats = ["webp", "jpg", "png"]
-            else:
-                formats = ["mp4", "webm", "avi", "mkv", "mov", "mp3", "wav", "aac", "ogg", "opus", "webp", "jpg", "png"]
+        format_frame.pack(side="right", padx=10, pady=5)
         
         format_combo = ctk.CTkComboBox(
             format_frame,
-            values=formats,
+            values=[],
             width=100
         )
-        
-        # Устанавливаем значение из сохраненного выбора или первое доступное
-        if index in self.file_formats:
-            saved_format = self.file_formats[index].get()
-            if saved_format in formats:
-                format_combo.set(saved_format)
-            else:
-                format_combo.set(formats[0])
-        else:
-            format_combo.set(formats[0])
-        
         format_combo.pack(side="left", padx=(0, 10))
         
-        # Сохраняем ссылку на combo box для получения выбранного формата
-        self.file_formats[index] = format_combo
-        
         # Кнопка удаления
         delete_btn = ctk.CTkButton(
             format_frame,
             text=self._get_text("delete_btn"),
             width=30,
-            height=30,
-            command=lambda idx=index: self._remove_file(idx)
+            height=30
         )
         delete_btn.pack(side="left")
+        
+        return FileRow(file_frame, icon_label, thumb_label, name_label, format_label, format_combo, delete_btn)
+    
+    def _bind_file_row(self, row: "FileRow", index: int):
+        """Отображение файла index в переиспользуемой строке"""
+        file_path = Path(self.selected_files[index])
+        current_ext = file_path.suffix.lower()
+        file_type = self._get_file_type(current_ext)
+        
+        # Миниатюра, если уже загружена, иначе иконка по типу файла
+        image = self.thumbnail_images.get(str(file_path), THUMBNAIL_MISSING)
+        if image is THUMBNAIL_MISSING and ThumbnailCache.supports(file_path):
+            self.thumbnail_loader.request(str(file_path))
+        if image is not THUMBNAIL_MISSING and image is not None:
+            row.thumb_label.configure(image=image)
+            row.icon_label.pack_forget()
+            row.thumb_label.pack(expand=True)
+        else:
+            row.icon_label.configure(text=FILE_TYPE_ICONS.get(file_type, "📄"))
+            row.thumb_label.pack_forget()
+            row.icon_label.pack(expand=True)
+        row.name_label.configure(text=file_path.name)
+        row.format_label.configure(text=self._get_text("current_format", format=current_ext.lstrip('.')))
+        
+        formats = self._formats_for_type(file_type)
+        row.format_combo.configure(
+            values=formats,
+            command=lambda value, idx=index: self._set_file_format(idx, value)
+        )
+        row.format_combo.set(self.file_formats[index])
+        row.delete_btn.configure(command=lambda idx=index: self._remove_file(idx))
+    
+    def _on_files_list_refresh(self, visible: range):
+        """Миниатюры нужны только для видимых строк"""
+        self.thumbnail_loader.set_wanted({self.selected_files[i] for i in visible})
+    
+    def _on_thumbnails(self, results):
+        """Готовые миниатюры из фоновых потоков (поток Tk)"""
+        from PIL import Image
+        
+        for path, thumb_path in results:
+            image = None
+            if thumb_path is not None:
+                try:
+                    with Image.open(thumb_path) as img:
+                        img.load()
+                        image = ctk.CTkImage(light_image=img, dark_image=img, size=img.size)
+                except Exception as e:
+                    logger.debug(f"Не удалось загрузить миниатюру {thumb_path}: {e}")
+            self.thumbnail_images[path] = image
+            self.thumbnail_images.move_to_end(path)
+        
+        while len(self.thumbnail_images) > THUMBNAIL_MEMORY_ITEMS:
+            self.thumbnail_images.popitem(last=False)
+        
+        if hasattr(self, 'files_list'):
+            self.files_list.refresh()
+    
+    def _set_file_format(self, index: int, value: str):
+        """Сохранение выбранного пользователем формата"""
+        if 0 <= index < len(self.file_formats):
+            self.file_formats[index] = value
     
     def _get_file_type(self, extension: str) -> str:
         """Определение типа файла по расширению"""
@@ -1084,23 +1077,12 @@ class ModernConverterGUI:
     def _remove_file(self, index: int):
         """Удаление файла из списка"""
         if 0 <= index < len(self.selected_files):
-            # Удаляем файл из списка
+            # Удаляем файл и его формат; перерисовываются только видимые строки
             self.selected_files.pop(index)
+            if index < len(self.file_formats):
+                self.file_formats.pop(index)
             
-            # Обновляем индексы в словаре форматов
-            new_file_formats = {}
-            for old_index, combo in self.file_formats.items():
-                if old_index < index:
-                    # Индексы до удаляемого файла остаются без изменений
-                    new_file_formats[old_index] = combo
-                elif old_index > index:
-                    # Индексы после удаляемого файла сдвигаются на 1
-                    new_file_formats[old_index - 1] = combo
-            
-            self.file_formats = new_file_formats
-            
-            # Пересоздаем список файлов
-            self._populate_files_list()
+            self.files_list.set_count(len(self.selected_files))
     
     def _select_output_folder(self):
         """Выбор выходной папки"""
@@ -1116,113 +1098,426 @@ class ModernConverterGUI:
     def start_conversion(self):
         """Начало конвертации"""
         if not self.selected_files:
-            CTkMessagebox(
+            show_message(
                 title="Предупреждение",
                 message=self._get_text("messages.no_files_to_convert"),
                 icon="warning"
             )
             return
         
-        if not self.converter.check_ffmpeg():
-            CTkMessagebox(
-                title="Ошибка",
-                message=self._get_text("messages.ffmpeg_not_found"),
-                icon="cancel"
-            )
+        if not self._when_ffmpeg_ready(self.start_conversion):
+            return
+        if not self._start_session():
             return
         
+        # Файлы уже проверены на экране загрузки; форматы выбраны пользователем
+        files = [Path(f) for f in self.selected_files]
+        formats = [self._get_output_format(i, path) for i, path in enumerate(files)]
+        thread = threading.Thread(target=self._enqueue_files, args=(files, formats, False))
+        thread.daemon = True
+        thread.start()
+    
+    def _start_session(self) -> bool:
+        """
+        Запуск новой очереди конвертации и переход к экрану прогресса
+        
+        Returns:
+            bool: False, если запуск невозможен
+        """
         # Создаем выходную папку
+        if not self.output_directory:
+            self.output_directory = str(Path.cwd() / "converted")
         output_path = Path(self.output_directory)
         output_path.mkdir(parents=True, exist_ok=True)
         
+        self._get_screen("progress")
+        self.log_view.clear()
+        if self.save_log_var.get():
+            self.log_view.open_log_file(output_path / f"conversion-{time.strftime('%Y%m%d-%H%M%S')}.log")
+        
+        # Количество одновременных конвертаций и событие отмены для FFmpeg
+        self.max_workers = int(self.workers_var.get())
+        self.cancel_event = threading.Event()
+        self.stop_btn.configure(state="normal")
+        self.job_panel.set_slots(self.max_workers)
+        for slot in range(self.max_workers):
+            self.ui.register(f"job_progress:{slot}",
+                             lambda update, slot=slot: self.job_panel.update_job(slot, *update),
+                             coalesce=True)
+        
+        # Общее состояние очереди: счетчики, оценки для ETA, скорость потоков
+        self.session = {
+            'total': 0, 'successful': 0, 'failed': 0, 'next_id': 0,
+            'estimated_left': 0.0, 'estimated_done': 0.0, 'elapsed_done': 0.0,
+            'speeds': {}, 'start_wall': time.monotonic(), 'output_names': set(),
+        }
+        self.session_lock = threading.Lock()
+        self.conversion_queue = ConversionQueue(self._run_conversion_job, self.max_workers,
+                                                on_drained=self._on_queue_drained)
+        self.conversion_running = True
+        
+        self._log_message(self._get_text("conversion_started"))
+        self.ui.post("status", self._get_text("progress_status_converting"))
+        self.ui.post("progress", 0.0)
+        
         # Переходим к экрану прогресса
         self.show_progress_screen()
+        return True
+    
+    def _add_files(self, paths: List[str] = None, drop_data: str = None):
+        """
+        Новые файлы и папки из drag&drop или диалога выбора
+        
+        Поиск выполняется в фоновом потоке и передается пакетами: во время
+        конвертации - в работающую очередь, при включенной опции "конвертировать
+        сразу" - в новую очередь, иначе - в список файлов.
         
-        # Запускаем конвертацию в отдельном потоке
-        thread = threading.Thread(target=self._conversion_worker)
+        Args:
+            paths: Пути к файлам и папкам
+            drop_data: Необработанные данные drag&drop
+        """
+        if self.conversion_running:
+            target = "queue"
+        elif self.convert_on_drop_var.get():
+            if not self._when_ffmpeg_ready(lambda: self._add_files(paths, drop_data)):
+                return
+            if not self._start_session():
+                return
+            target = "queue"
+        else:
+            target = "list"
+            # Новый выбор заменяет список и прерывает предыдущий поиск
+            self.scan_cancel.set()
+            self.selected_files = []
+            self.file_formats = []
+            self.show_files_screen()
+        
+        self.scan_cancel = threading.Event()
+        self._set_scanning(True)
+        thread = threading.Thread(target=self._scan_worker, args=(paths, drop_data, target, self.scan_cancel))
         thread.daemon = True
         thread.start()
     
+    def _scan_worker(self, paths: List[str], drop_data: str, target: str, cancel: threading.Event):
+        """Фоновый поиск файлов с передачей найденного пакетами"""
+        found = 0
+        invalid_all = []
+        scan_start_ns = time.time_ns()
+        conversion_queue = self.conversion_queue if target == "queue" else None
+        # Очередь не должна завершиться между пакетами медленного поиска
+        holds_queue = conversion_queue is not None and conversion_queue.begin_batch()
+        try:
+            with self._profile_phase("scan"):
+                if drop_data is not None:
+                    paths = split_drop_data(drop_data)
+                ffprobe_path = find_ffprobe(self.converter.ffmpeg_path)
+                
+                for batch in scan_paths(paths or [], SUPPORTED_EXTENSIONS, cancel_event=cancel):
+                    found += len(batch)
+                    self.ui.post("scan_status", self._get_text("scan_found", count=found))
+                    if target == "queue":
+                        # Спан поиска в трассе задания: от начала поиска до пакета с файлом
+                        self._enqueue_files(batch, None, True, (scan_start_ns, time.time_ns(), found))
+                        continue
+                    
+                    valid, invalid = preflight(batch, ffprobe_path)
+                    invalid_all.extend(invalid)
+                    if valid:
+                        self.ui.post("scan_batch", (cancel, valid))
+        except Exception as e:
+            logger.error(f"Ошибка поиска файлов: {e}")
+            self._log_message(self._get_text("messages.drop_error", error=e), LEVEL_ERROR)
+        finally:
+            if holds_queue:
+                conversion_queue.end_batch()
+            self.ui.call(lambda: self._on_scan_done(target, found, invalid_all, cancel))
+    
+    def _on_scan_batches(self, batches):
+        """Добавление найденных файлов в список (поток Tk)"""
+        for cancel, batch in batches:
+            # Пакеты отмененного или замененного поиска не показываются
+            if cancel is not self.scan_cancel or cancel.is_set():
+                continue
+            self.selected_files.extend(str(f) for f in batch)
+            self.file_formats.extend(
+                self._formats_for_type(self._get_file_type(f.suffix.lower()))[0] for f in batch
+            )
+        self.files_list.set_count(len(self.selected_files))
+    
+    def _on_scan_done(self, target: str, found: int, invalid, cancel: threading.Event):
+        """Завершение фонового поиска (поток Tk)"""
+        # Более новый поиск уже заменил этот
+        if cancel is not self.scan_cancel:
+            return
+        self._set_scanning(False)
+        
+        if target == "queue":
+            if not found:
+                self._log_message(self._get_text("messages.no_files_found"), LEVEL_WARNING)
+            return
+        
+        if invalid:
+            self._show_invalid_files(invalid)
+        if not self.selected_files and not cancel.is_set():
+            show_message(
+                title=self._get_text("messages.warning_title"),
+                message=self._get_text("messages.no_files_found"),
+                icon="warning"
+            )
+            self.show_start_screen()
+    
+    def _cancel_scan(self):
+        """Отмена фонового поиска; найденные файлы остаются в списке"""
+        self.scan_cancel.set()
+    
+    def _set_scan_status(self, text: str):
+        """Счетчик найденных файлов (экран файлов может быть еще не создан)"""
+        if hasattr(self, 'scan_label'):
+            self.scan_label.configure(text=text)
+    
+    def _set_scanning(self, scanning: bool):
+        """Показ строки поиска и блокировка перехода к конвертации на время поиска"""
+        self.scanning = scanning
+        if not hasattr(self, 'scan_frame'):
+            return
+        if scanning:
+            self.scan_label.configure(text=self._get_text("scan_found", count=0))
+            self.scan_frame.pack(after=self.files_title, pady=(0, 10))
+            self.convert_btn.configure(state="disabled")
+        else:
+            self.scan_frame.pack_forget()
+            self.convert_btn.configure(state="normal")
+    
+    def _enqueue_files(self, files: List[Path], formats: List[str] = None, validate: bool = True,
+                       scan: Tuple[int, int, int] = None):
+        """
+        Оценка и постановка файлов в очередь (фоновый поток)
+        
+        Args:
+            files: Входные файлы
+            formats: Выходные форматы (None - формат по умолчанию для типа файла)
+            validate: Выполнить предварительную проверку файлов
+            scan: Поиск, который нашел файлы (начало, конец в time_ns, найдено файлов)
+        """
+        conversion_queue = self.conversion_queue
+        if not conversion_queue.begin_batch():
+            # Очередь успела завершиться - файлы начнут новую
+            self.ui.call(lambda: self._add_files([str(f) for f in files]))
+            return
+        
+        try:
+            if validate:
+                valid, invalid = preflight(files, find_ffprobe(self.converter.ffmpeg_path))
+                if invalid:
+                    for path, error in invalid:
+                        self._log_message(f"⛔ {Path(path).name}: {error}", LEVEL_WARNING)
+                if formats is not None:
+                    valid_set = set(valid)
+                    formats = [fmt for path, fmt in zip(files, formats) if path in valid_set]
+                files = valid
+            
+            quality = 80
+            added = 0
+            for i, input_path in enumerate(files):
+                output_format = formats[i] if formats is not None else self._default_output_format(input_path)
+                # Задания оцениваются по одному, чтобы потоки начинали работу сразу
+                stats_key, work_units, estimate = self._estimate_job(input_path, output_format, quality)
+                with self.session_lock:
+                    job_id = self.session['next_id']
+                    self.session['next_id'] += 1
+                    self.session['total'] += 1
+                    self.session['estimated_left'] += estimate
+                    output_path = self._reserve_output_path(input_path, output_format)
+                job = (job_id, input_path, output_path, stats_key, work_units, estimate, scan)
+                if not conversion_queue.add(job):
+                    with self.session_lock:
+                        self.session['total'] -= 1
+                        self.session['estimated_left'] -= estimate
+                    break
+                added += 1
+            
+            if added and validate:
+                self._log_message(self._get_text("queue_files_added", count=added))
+        except Exception as e:
+            logger.error(f"Ошибка добавления файлов в очередь: {e}")
+            self._log_message(self._get_text("critical_error", error=e), LEVEL_ERROR)
+        finally:
+            conversion_queue.end_batch()
+    
     def _stop_conversion(self):
         """Остановка конвертации"""
-        self.conversion_running = False
+        self.cancel_event.set()
+        self.scan_cancel.set()
+        if self.conversion_queue is not None:
+            self.conversion_queue.cancel()
         self.stop_btn.configure(state="disabled")
-        self._log_message(self._get_text("conversion_stopped"))
+        self._log_message(self._get_text("conversion_stopped"), LEVEL_WARNING)
     
-    def _conversion_worker(self):
-        """Рабочий поток конвертации"""
+    def _default_output_format(self, input_path: Path) -> str:
+        """Выходной формат по умолчанию для типа файла"""
+        file_type = self._get_file_type(input_path.suffix.lower())
+        if file_type == "video":
+            return "webm"
+        elif file_type == "audio":
+            return "mp3"
+        elif file_type == "image":
+            return "webp"
+        return "mp4"
+    
+    def _get_output_format(self, index: int, input_path: Path) -> str:
+        """Выходной формат файла: выбор пользователя или формат по умолчанию для типа"""
+        if index < len(self.file_formats):
+            return self.file_formats[index]
+        return self._default_output_format(input_path)
+    
+    def _reserve_output_path(self, input_path: Path, output_format: str) -> Path:
+        """
+        Уникальное в пределах запуска имя результата (вызывается под session_lock)
+        
+        Файлы с одинаковыми именами из разных папок получают суффикс -2, -3...,
+        иначе параллельные задания писали бы в один файл
+        """
+        names = self.session['output_names']
+        name = f"{input_path.stem}.{output_format}"
+        index = 1
+        while name.lower() in names:
+            index += 1
+            name = f"{input_path.stem}-{index}.{output_format}"
+        names.add(name.lower())
+        return Path(self.output_directory) / name
+    
+    def _estimate_job(self, input_path: Path, output_format: str, quality: int):
+        """
+        Оценка длительности конвертации файла по истории
+        
+        Returns:
+            Tuple[str, float, float]: (ключ статистики, объем работы, оценка в секундах)
+        """
+        file_type = self._get_file_type(input_path.suffix.lower())
+        info = probe_media(input_path, find_ffprobe(self.converter.ffmpeg_path))
+        width, height = info.get('width', 0), info.get('height', 0)
+        
+        if file_type == "image":
+            work_units = width * height / 1e6
+        else:
+            work_units = info.get('duration', 0)
+        
+        key = self.stats.make_key(output_format, width, height, f"q{quality}")
+        seconds, _ = self.stats.estimate(
+            key, work_units, input_path.stat().st_size,
+            DEFAULT_RATES.get(file_type, DEFAULT_RATES['video']), DEFAULT_SIZE_RATIO
+        )
+        return key, work_units, seconds
+    
+    def _post_throughput(self):
+        """Суммарная производительность: файлов в минуту и скорость FFmpeg"""
+        with self.session_lock:
+            done = self.session['successful'] + self.session['failed']
+            total_speed = sum(self.session['speeds'].values())
+            minutes = (time.monotonic() - self.session['start_wall']) / 60
+        files_per_min = done / minutes if minutes > 0 else 0.0
+        self.ui.post("throughput", self._get_text(
+            "progress_throughput", files=f"{files_per_min:.1f}", speed=f"{total_speed:.2f}"
+        ))
+    
+    def _run_conversion_job(self, slot: int, job, queued_at: float):
+        """Конвертация одного файла в потоке очереди"""
+        job_id, input_path, output_path, stats_key, work_units, estimate, scan = job
+        quality = 80
+        file_type = self._get_file_type(input_path.suffix.lower())
+        # Для аудио и видео объем работы - длительность в секундах
+        duration = work_units if file_type != "image" else 0.0
+        
+        def on_progress(block):
+            fraction = block['out_time_seconds'] / duration if duration > 0 else None
+            with self.session_lock:
+                self.session['speeds'][slot] = block['speed']
+            self.ui.post(f"job_progress:{slot}", (job_id, fraction, block['fps'], block['speed']))
+            self._post_throughput()
+        
+        self.ui.post("job", ("start", slot, job_id, input_path.name))
+        self._log_message(self._get_text("converting_file", input=input_path.name, output=output_path.name))
+        
+        start_time = time.monotonic()
+        success = False
         try:
-            total_files = len(self.selected_files)
-            successful = 0
-            failed = 0
-            
-            self.conversion_running = True
-            self._log_message(self._get_text("conversion_started"))
-            self.progress_status.configure(text=self._get_text("progress_status_converting"))
+            with self._profile_phase("job", input_path.name):
+                success = self.converter.convert_file(
+                    str(input_path), str(output_path), quality=quality,
+                    callback=on_progress, cancel_event=self.cancel_event,
+                    queued_at=queued_at, scan=scan
+                )
+            if success:
+                self.stats.record(stats_key, time.monotonic() - start_time, work_units,
+                                  input_path.stat().st_size, output_path.stat().st_size)
+                self._log_message(self._get_text("conversion_success", filename=input_path.name))
+            else:
+                self._log_message(self._get_text("conversion_error", filename=input_path.name), LEVEL_ERROR)
+        finally:
+            elapsed = time.monotonic() - start_time
+            self.ui.post("job", ("end", slot, job_id, None))
             
-            for i, input_file in enumerate(self.selected_files):
-                if not self.conversion_running:
-                    break
-                
-                # Обновление прогресса
-                progress = (i + 1) / total_files
-                self.progress_bar.set(progress)
-                
-                # Определение выходного файла
-                input_path = Path(input_file)
+            with self.session_lock:
+                session = self.session
+                session['speeds'].pop(slot, None)
+                session['successful' if success else 'failed'] += 1
+                session['estimated_left'] -= estimate
+                session['estimated_done'] += estimate
+                session['elapsed_done'] += elapsed
+                done, total = session['successful'] + session['failed'], session['total']
                 
-                # Получаем выбранный пользователем формат
-                if hasattr(self, 'file_formats') and i in self.file_formats:
-                    output_format = self.file_formats[i].get()
-                else:
-                    # Определяем формат по типу файла
-                    current_ext = input_path.suffix.lower()
-                    file_type = self._get_file_type(current_ext)
-                    if file_type == "video":
-                        output_format = "webm"
-                    elif file_type == "audio":
-                        output_format = "mp3"
-                    elif file_type == "image":
-                        output_format = "webp"
-                    else:
-                        output_format = "mp4"
-                
-                output_path = Path(self.output_directory) / f"{input_path.stem}.{output_format}"
+                # Поправка оценки по фактической скорости текущего запуска;
+                # потоки работают одновременно, поэтому остаток делится между ними
+                correction = session['elapsed_done'] / session['estimated_done'] if session['estimated_done'] > 0 else 1.0
+                eta = session['estimated_left'] * correction / self.max_workers
+            
+            self.ui.post("progress", done / total if total else 1.0)
+            self.ui.post("status", self._get_text("progress_eta", eta=format_duration(eta)))
+            self._post_throughput()
+    
+    def _on_queue_drained(self):
+        """Завершение очереди: все задания выполнены или отменены"""
+        try:
+            with self._profile_phase("report"):
+                self.stats.save()
+                with self.session_lock:
+                    successful, failed = self.session['successful'], self.session['failed']
                 
-                self._log_message(self._get_text("converting_file") + f"{input_path.name} -> {output_path.name}")
+                # Завершение
+                self.ui.post("progress", 1.0)
+                self._log_message(self._get_text("conversion_completed"))
+                self._log_message(self._get_text("conversion_successful", count=successful))
+                self._log_message(self._get_text("conversion_failed", count=failed),
+                                  LEVEL_WARNING if failed else LEVEL_INFO)
                 
-                # Конвертация
-                if self.converter.convert_file(str(input_path), str(output_path), quality=80):
-                    successful += 1
-                    self._log_message(self._get_text("conversion_success") + f"{input_path.name}")
+                if failed == 0:
+                    self.ui.post("status", self._get_text("progress_status_success"))
                 else:
-                    failed += 1
-                    self._log_message(self._get_text("conversion_error") + f"{input_path.name}")
-            
-            # Завершение
-            self.progress_bar.set(1.0)
-            self._log_message(self._get_text("conversion_completed"))
-            self._log_message(self._get_text("conversion_successful") + f"{successful}")
-            self._log_message(self._get_text("conversion_failed") + f"{failed}")
-            
-            if failed == 0:
-                self.progress_status.configure(text=self._get_text("progress_status_success"))
-            else:
-                self.progress_status.configure(text=self._get_text("progress_status_errors"))
+                    self.ui.post("status", self._get_text("progress_status_errors", count=failed))
             
             # Показываем сообщение о завершении
-            self.root.after(2000, self._show_completion_message)
+            self.ui.call(lambda: self.root.after(2000, self._show_completion_message))
             
         except Exception as e:
-            self._log_message(self._get_text("critical_error"))
-            self.progress_status.configure(text="❌ Ошибка конвертации")
+            self._log_message(self._get_text("critical_error", error=e), LEVEL_ERROR)
+            self.ui.post("status", "❌ Ошибка конвертации")
         
         finally:
             self.conversion_running = False
     
+    def _on_job_event(self, events):
+        """Начало и завершение заданий в строках панели (поток Tk)"""
+        for action, slot, job_id, name in events:
+            if action == "start":
+                self.job_panel.start_job(slot, job_id, name)
+            elif self.job_panel.rows[slot].job_id == job_id:
+                self.job_panel.clear_job(slot)
+    
     def _show_completion_message(self):
         """Показать сообщение о завершении"""
-        CTkMessagebox(
+        self.log_view.close_log_file()
+        
+        show_message(
             title="Конвертация завершена",
             message=self._get_text("messages.conversion_complete"),
             icon="check"
@@ -1231,26 +1526,102 @@ class ModernConverterGUI:
         # Возвращаемся к стартовому экрану
         self.show_start_screen()
     
-    def _log_message(self, message: str):
-        """Добавление сообщения в лог"""
-        self.log_text.insert("end", f"{message}\n")
-        self.log_text.see("end")
-        self.root.update()
+    def _append_log(self, entries):
+        """Вывод строк лога; экран прогресса создается, если его еще нет"""
+        self._get_screen("progress")
+        self.log_view.append(entries)
+    
+    def _profile_phase(self, name: str, label: str = None):
+        """Фаза профилировщика (--profile) или пустой контекст"""
+        if self.profiler is None:
+            return contextlib.nullcontext()
+        return self.profiler.phase(name, label)
+    
+    def _log_message(self, message: str, level: str = LEVEL_INFO):
+        """Добавление сообщения в лог (можно вызывать из любого потока)"""
+        self.ui.post("log", (level, message))
     
     def run(self):
         """Запуск GUI"""
         self.root.mainloop()
+    
+    def measure_startup(self, target_ms: float = None) -> Dict:
+        """
+        Замер времени до первого кадра: окно закрывается сразу после отрисовки
+        
+        Args:
+            target_ms: Целевое время до первого кадра в миллисекундах
+        
+        Returns:
+            Dict: Длительности этапов запуска в миллисекундах
+        """
+        timings = {}
+        
+        def on_first_frame():
+            # Отложенные задачи отрисовки выполняются раньше этого вызова
+            self.root.update_idletasks()
+            first_frame = time.perf_counter()
+            timings.update({
+                'imports_ms': round((STARTUP_IMPORTED - STARTUP_T0) * 1000, 1),
+                'window_ms': round((self.startup_created - STARTUP_IMPORTED) * 1000, 1),
+                'first_frame_ms': round((first_frame - STARTUP_T0) * 1000, 1),
+                'target_ms': target_ms,
+            })
+            self.root.destroy()
+        
+        self.root.after_idle(on_first_frame)
+        self.root.mainloop()
+        return timings
 
 def main():
     """Главная функция"""
-    # Можно передать язык как аргумент командной строки
-    import sys
-    language = "ru"  # По умолчанию русский
-    if len(sys.argv) > 1:
-        language = sys.argv[1]
-    
-    app = ModernConverterGUI(language)
-    app.run()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Графический конвертер медиафайлов')
+    # Язык интерфейса можно передать первым аргументом
+    parser.add_argument('language', nargs='?', default='ru', help='Язык интерфейса (ru/en)')
+    parser.add_argument('--startup-timing', action='store_true',
+                        help='Замерить время до первого кадра, вывести результат в JSON и выйти')
+    parser.add_argument('--startup-target', type=float, default=None, metavar='MS',
+                        help='Целевое время до первого кадра; при превышении код выхода 1')
+    parser.add_argument('--profile', metavar='DIR',
+                        help='Профилировать поиск файлов, задания и итоги (cProfile, tracemalloc); '
+                             'результаты записываются в DIR при закрытии окна')
+    parser.add_argument('--profile-top', type=int, default=20,
+                        help='Сколько горячих мест и мест выделения памяти выводить (по умолчанию 20)')
+    parser.add_argument('--trace', metavar='PATH',
+                        help='Файл трасс заданий OTLP JSON: очередь, probe, FFmpeg и итог каждого файла')
+    add_logging_arguments(parser, DEFAULT_LOG_DIR / 'gui_conversion.log')
+    args = parser.parse_args()
+    setup_logging_from_args(args)
+    
+    profiler = None
+    if args.profile and not args.startup_timing:
+        # Модули профилирования загружаются только по запросу, чтобы не замедлять запуск
+        from core.profiler import RunProfiler
+        profiler = RunProfiler(Path(args.profile), args.profile_top)
+    
+    app = ModernConverterGUI(args.language, profiler)
+    if not args.startup_timing:
+        if args.trace:
+            from core.tracing import Tracer
+            app.converter.tracer = Tracer(Path(args.trace))
+        if profiler is not None:
+            profiler.start()
+        try:
+            app.run()
+        finally:
+            if profiler is not None:
+                profiler.finish()
+            if app.converter.tracer is not None:
+                app.converter.tracer.close()
+        return
+    
+    timings = app.measure_startup(args.startup_target)
+    print(json.dumps(timings))
+    if args.startup_target is not None and timings['first_frame_ms'] > args.startup_target:
+        logger.warning(f"⏱️ Первый кадр через {timings['first_frame_ms']} мс, цель {args.startup_target} мс")
+        sys.exit(1)
 
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Панель активных заданий: строка на каждый рабочий поток
+Compact per-job rows with progress, fps and speed plus aggregate throughput
+"""
+
+from typing import List, Optional
+
+import customtkinter as ctk
+
+
+class JobRow:
+    """Виджеты строки одного рабочего потока"""
+
+    def __init__(self, frame, name_label, progress_bar, stats_label):
+        self.frame = frame
+        self.name_label = name_label
+        self.progress_bar = progress_bar
+        self.stats_label = stats_label
+        # Идентификатор задания, показанного в строке (None - поток свободен)
+        self.job_id: Optional[int] = None
+
+
+class JobPanel(ctk.CTkFrame):
+    """Строки активных заданий и суммарная производительность"""
+
+    def __init__(self, master, **kwargs):
+        super().__init__(master, **kwargs)
+        self.rows: List[JobRow] = []
+
+        self.throughput_label = ctk.CTkLabel(self, text="", font=ctk.CTkFont(size=13), text_color="gray")
+        self.throughput_label.pack(side="bottom", anchor="w", padx=10, pady=(2, 5))
+
+    def set_slots(self, count: int):
+        """Количество строк по числу рабочих потоков"""
+        while len(self.rows) > count:
+            self.rows.pop().frame.destroy()
+        while len(self.rows) < count:
+            self.rows.append(self._create_row())
+        for slot in range(count):
+            self.clear_job(slot)
+        self.throughput_label.configure(text="")
+
+    def start_job(self, slot: int, job_id: int, name: str):
+        """Показ нового задания в строке потока"""
+        row = self.rows[slot]
+        row.job_id = job_id
+        row.name_label.configure(text=name, text_color=("gray10", "gray90"))
+        row.progress_bar.set(0)
+        row.stats_label.configure(text="")
+
+    def update_job(self, slot: int, job_id: int, fraction: float, fps: float, speed: float):
+        """Обновление прогресса задания (устаревшие события игнорируются)"""
+        row = self.rows[slot]
+        if row.job_id != job_id:
+            return
+        if fraction is not None:
+            row.progress_bar.set(max(0.0, min(1.0, fraction)))
+        parts = []
+        if fps:
+            parts.append(f"{fps:.0f} fps")
+        if speed:
+            parts.append(f"{speed:.2f}x")
+        row.stats_label.configure(text=" · ".join(parts))
+
+    def clear_job(self, slot: int):
+        """Строка свободного потока"""
+        row = self.rows[slot]
+        row.job_id = None
+        row.name_label.configure(text="—", text_color="gray")
+        row.progress_bar.set(0)
+        row.stats_label.configure(text="")
+
+    def set_throughput(self, text: str):
+        """Суммарная производительность всех потоков"""
+        self.throughput_label.configure(text=text)
+
+    def _create_row(self) -> JobRow:
+        frame = ctk.CTkFrame(self, fg_color="transparent")
+        frame.pack(fill="x", padx=10, pady=1)
+
+        name_label = ctk.CTkLabel(frame, text="—", width=300, anchor="w", font=ctk.CTkFont(size=12))
+        name_label.pack(side="left")
+
+        progress_bar = ctk.CTkProgressBar(frame, width=220, height=8)
+        progress_bar.pack(side="left", padx=10)
+        progress_bar.set(0)
+
+        stats_label = ctk.CTkLabel(frame, text="", width=140, anchor="w", font=ctk.CTkFont(size=12))
+        stats_label.pack(side="left")
+
+        return JobRow(frame, name_label, progress_bar, stats_label)
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Панель лога конвертации с ограниченным объемом
+Bounded ring-buffer log view with optional full on-disk log
+"""
+
+import collections
+import time
+import tkinter as tk
+from pathlib import Path
+from typing import List, Tuple
+import logging
+
+import customtkinter as ctk
+
+logger = logging.getLogger(__name__)
+
+# Уровни сообщений лога
+LEVEL_INFO = "info"
+LEVEL_WARNING = "warning"
+LEVEL_ERROR = "error"
+
+DEFAULT_CAPACITY = 5000
+
+
+class LogView(ctk.CTkFrame):
+    """
+    Лог с кольцевым буфером фиксированного размера.
+
+    В памяти хранятся последние capacity строк; из виджета старые строки
+    удаляются пачками, когда их набирается на десятую часть больше лимита,
+    поэтому стоимость добавления не зависит от длины запуска. Полный лог
+    при необходимости пишется в файл.
+    """
+
+    def __init__(self, master, capacity: int = DEFAULT_CAPACITY, filter_text: str = "",
+                 width: int = 800, height: int = 300, **kwargs):
+        """
+        Args:
+            master: Родительский виджет
+            capacity: Максимальное количество хранимых строк
+            filter_text: Подпись переключателя "только ошибки и предупреждения"
+            width: Ширина текстового поля
+            height: Высота текстового поля
+        """
+        super().__init__(master, fg_color="transparent", **kwargs)
+        self.capacity = capacity
+        self.trim_chunk = max(1, capacity // 10)
+        self.lines = collections.deque(maxlen=capacity)
+        self.widget_lines = 0
+        self.log_file = None
+
+        self.errors_only = tk.BooleanVar(value=False)
+        self.filter_check = ctk.CTkCheckBox(
+            self, text=filter_text, variable=self.errors_only, command=self._rebuild
+        )
+        self.filter_check.pack(anchor="w", pady=(0, 5))
+
+        self.textbox = ctk.CTkTextbox(self, width=width, height=height)
+        self.textbox.pack(fill="both", expand=True)
+
+    def set_filter_text(self, text: str):
+        """Смена подписи фильтра (при смене языка)"""
+        self.filter_check.configure(text=text)
+
+    def append(self, entries: List[Tuple[str, str]]):
+        """
+        Добавление пачки строк (только в потоке Tk)
+
+        Args:
+            entries: Список (уровень, сообщение)
+        """
+        if not entries:
+            return
+        self.lines.extend(entries)
+        self._write_to_file(entries)
+
+        shown = [message for level, message in entries if self._is_visible(level)]
+        if not shown:
+            return
+
+        # Прокручиваем вниз, только если пользователь не листает историю
+        at_bottom = self.textbox.yview()[1] >= 0.999
+        self.textbox.insert("end", "\n".join(shown) + "\n")
+        # Удаление идет по строкам текста, а сообщение (traceback, вывод FFmpeg) может быть многострочным
+        self.widget_lines += _text_lines(shown)
+
+        excess = self.widget_lines - self.capacity
+        if excess >= self.trim_chunk:
+            self.textbox.delete("1.0", f"{excess + 1}.0")
+            self.widget_lines = self.capacity
+
+        if at_bottom:
+            self.textbox.see("end")
+
+    def clear(self):
+        """Очистка лога"""
+        self.lines.clear()
+        self.textbox.delete("1.0", "end")
+        self.widget_lines = 0
+
+    def open_log_file(self, path: Path):
+        """Включение записи полного лога в файл"""
+        self.close_log_file()
+        try:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self.log_file = open(path, 'a', encoding='utf-8')
+        except OSError as e:
+            logger.error(f"Не удалось открыть файл лога {path}: {e}")
+            self.log_file = None
+
+    def close_log_file(self):
+        """Завершение записи полного лога"""
+        if self.log_file is not None:
+            self.log_file.close()
+            self.log_file = None
+
+    def _is_visible(self, level: str) -> bool:
+        return not self.errors_only.get() or level in (LEVEL_WARNING, LEVEL_ERROR)
+
+    def _write_to_file(self, entries: List[Tuple[str, str]]):
+        if self.log_file is None:
+            return
+        timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
+        try:
+            self.log_file.write("".join(
+                f"{timestamp} {level.upper()} {message}\n" for level, message in entries
+            ))
+            self.log_file.flush()
+        except OSError as e:
+            logger.error(f"Ошибка записи файла лога: {e}")
+            self.close_log_file()
+
+    def _rebuild(self):
+        """Перерисовка виджета из буфера после смены фильтра"""
+        shown = [message for level, message in self.lines if self._is_visible(level)]
+        self.textbox.delete("1.0", "end")
+        if shown:
+            self.textbox.insert("end", "\n".join(shown) + "\n")
+        self.widget_lines = _text_lines(shown)
+        self.textbox.see("end")
+
+
+def _text_lines(messages: List[str]) -> int:
+    """Количество строк текста, которые займут сообщения в виджете"""
+    return sum(message.count('\n') + 1 for message in messages)
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Фоновая загрузка миниатюр только для видимых строк списка
+Background thumbnail loader that skips rows scrolled out of view
+"""
+
+import collections
+import threading
+from pathlib import Path
+from typing import Callable, Optional, Set
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 2
+
+
+class ThumbnailLoader:
+    """
+    Очередь запросов миниатюр с небольшим пулом потоков.
+
+    Последние запросы обрабатываются первыми; файлы, которые ушли из видимой
+    области до начала обработки, пропускаются.
+    """
+
+    def __init__(self, cache, on_ready: Callable[[str, Optional[Path]], None],
+                 workers: int = DEFAULT_WORKERS):
+        """
+        Args:
+            cache: ThumbnailCache
+            on_ready: Вызывается в рабочем потоке с (путь файла, путь миниатюры или None)
+            workers: Количество потоков генерации
+        """
+        self.cache = cache
+        self.on_ready = on_ready
+        self.workers = workers
+        self.pending = collections.deque()
+        self.queued: Set[str] = set()
+        self.wanted: Set[str] = set()
+        self._condition = threading.Condition()
+        self._threads = []
+
+    def set_wanted(self, paths: Set[str]):
+        """Файлы, видимые сейчас (вызывается после каждой перерисовки списка)"""
+        with self._condition:
+            self.wanted = set(paths)
+
+    def request(self, path: str):
+        """Запрос миниатюры файла"""
+        with self._condition:
+            if path in self.queued:
+                return
+            self.queued.add(path)
+            self.pending.append(path)
+            # Запрос приходит из отрисовки строки, то есть файл сейчас виден
+            self.wanted.add(path)
+            if len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._worker, daemon=True)
+                self._threads.append(thread)
+                thread.start()
+            self._condition.notify()
+
+    def _worker(self):
+        while True:
+            with self._condition:
+                while not self.pending:
+                    self._condition.wait()
+                path = self.pending.pop()
+                if path not in self.wanted:
+                    self.queued.discard(path)
+                    continue
+
+            try:
+                result = self.cache.thumbnail(Path(path))
+            except Exception as e:
+                logger.debug(f"Ошибка миниатюры {path}: {e}")
+                result = None
+            self.on_ready(path, result)
+            # Пока миниатюра строится, повторные запросы того же файла игнорируются
+            with self._condition:
+                self.queued.discard(path)
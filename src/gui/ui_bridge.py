@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Потокобезопасная очередь событий интерфейса
+Thread-safe bridge: workers post events, the Tk thread drains them on a timer
+"""
+
+import queue
+from typing import Any, Callable, Dict, List, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Частота обновления интерфейса по умолчанию (~20 кадров в секунду)
+DEFAULT_INTERVAL_MS = 50
+
+# Сколько событий обрабатывать за один тик, чтобы не блокировать цикл Tk
+MAX_EVENTS_PER_TICK = 20000
+
+
+class UIBridge:
+    """
+    Очередь событий между рабочими потоками и потоком Tk.
+
+    Рабочие потоки только вызывают post(); виджеты меняются исключительно в
+    потоке Tk при разборе очереди в порядке поступления. Обработчик с
+    coalesce=True получает только последнее значение за тик (прогресс, статус),
+    остальные - список идущих подряд значений (строки лога) одним вызовом.
+    """
+
+    def __init__(self, root, interval_ms: int = DEFAULT_INTERVAL_MS,
+                 max_events: int = MAX_EVENTS_PER_TICK):
+        """
+        Args:
+            root: Корневое окно Tk
+            interval_ms: Период разбора очереди в миллисекундах
+            max_events: Ограничение количества событий за один тик
+        """
+        self.root = root
+        self.interval_ms = interval_ms
+        self.max_events = max_events
+        self.queue = queue.SimpleQueue()
+        self.handlers: Dict[str, Callable[[Any], None]] = {}
+        self.coalesce: Dict[str, bool] = {}
+        self._after_id = None
+
+    def register(self, kind: str, handler: Callable[[Any], None], coalesce: bool = False):
+        """
+        Регистрация обработчика событий вида kind (вызывается в потоке Tk)
+
+        Args:
+            kind: Вид события
+            handler: Получает последнее значение (coalesce=True) или список значений
+            coalesce: Оставлять только последнее значение за тик
+        """
+        self.handlers[kind] = handler
+        self.coalesce[kind] = coalesce
+
+    def post(self, kind: str, payload: Any = None):
+        """Отправка события из любого потока"""
+        self.queue.put((kind, payload))
+
+    def call(self, func: Callable[[], None]):
+        """Выполнение функции в потоке Tk"""
+        self.post("call", func)
+
+    def start(self):
+        """Запуск периодического разбора очереди"""
+        if self._after_id is None:
+            self._after_id = self.root.after(self.interval_ms, self._tick)
+
+    def stop(self):
+        """Остановка разбора очереди"""
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def drain(self):
+        """
+        Обработка накопленных событий (только в потоке Tk).
+
+        События обрабатываются в порядке поступления, поэтому конец задания не
+        обгоняет его начало, а вызов call() видит все события до него. Для видов
+        с coalesce=True за тик остается только последнее событие (отдельно для
+        каждого задания, если первым элементом кортежа передан его id) - на месте
+        этого последнего события; идущие подряд события остальных видов
+        передаются обработчику одним списком.
+        """
+        events = []
+        for _ in range(self.max_events):
+            try:
+                events.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+
+        # Позиция последнего события для каждого ключа объединения
+        last = {}
+        for position, (kind, payload) in enumerate(events):
+            if self.coalesce.get(kind):
+                last[self._coalesce_key(kind, payload)] = position
+
+        runs: List[Tuple[str, list]] = []
+        for position, (kind, payload) in enumerate(events):
+            if self.coalesce.get(kind):
+                if last[self._coalesce_key(kind, payload)] == position:
+                    runs.append((kind, [payload]))
+            elif runs and runs[-1][0] == kind and kind != "call":
+                runs[-1][1].append(payload)
+            else:
+                runs.append((kind, [payload]))
+
+        for kind, payloads in runs:
+            if kind == "call":
+                self._dispatch(payloads[0])
+                continue
+
+            handler = self.handlers.get(kind)
+            if handler is None:
+                logger.debug(f"Нет обработчика событий интерфейса '{kind}'")
+                continue
+            value = payloads[-1] if self.coalesce[kind] else payloads
+            self._dispatch(lambda: handler(value))
+
+    @staticmethod
+    def _coalesce_key(kind: str, payload: Any):
+        """Ключ объединения: вид события и id задания (первый элемент кортежа), если он есть"""
+        if isinstance(payload, tuple) and payload:
+            return kind, payload[0]
+        return kind
+
+    def _dispatch(self, func: Callable[[], None]):
+        try:
+            func()
+        except Exception as e:
+            logger.error(f"Ошибка обработки события интерфейса: {e}")
+
+    def _tick(self):
+        self.drain()
+        self._after_id = self.root.after(self.interval_ms, self._tick)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Виртуализированный список для десятков тысяч файлов
+Virtualized list: widgets exist only for visible rows and are recycled on scroll
+"""
+
+from typing import Any, Callable, List, Optional
+
+import customtkinter as ctk
+
+
+class VirtualFileList(ctk.CTkFrame):
+    """
+    Список, который создает виджеты только для видимых строк.
+
+    Данные хранит вызывающий код; список знает только количество элементов
+    и вызывает bind_row(row, index), чтобы показать элемент index в строке row.
+    """
+
+    def __init__(self, master, create_row: Callable[[Any], Any],
+                 bind_row: Callable[[Any, int], None], row_height: int = 60,
+                 on_refresh: Optional[Callable[[range], None]] = None, **kwargs):
+        """
+        Args:
+            master: Родительский виджет
+            create_row: Создает виджеты строки в переданном контейнере; возвращает объект с атрибутом frame
+            bind_row: Заполняет строку данными элемента с указанным индексом
+            row_height: Высота строки в пикселях
+            on_refresh: Вызывается после перерисовки с диапазоном видимых индексов
+        """
+        super().__init__(master, **kwargs)
+        self.create_row = create_row
+        self.bind_row = bind_row
+        self.row_height = row_height
+        self.on_refresh = on_refresh
+
+        self.count = 0
+        self.first_index = 0
+        self.visible_rows = 1
+        self.rows: List[Any] = []
+        # Индекс элемента, показанного в каждой строке (None - строка скрыта)
+        self.row_indices: List[Any] = []
+
+        self.body = ctk.CTkFrame(self, fg_color="transparent")
+        self.body.pack(side="left", fill="both", expand=True)
+
+        self.scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.body.bind("<Configure>", self._on_resize)
+        self.bind_all("<MouseWheel>", self._on_mousewheel, add="+")
+        self.bind_all("<Button-4>", self._on_mousewheel, add="+")
+        self.bind_all("<Button-5>", self._on_mousewheel, add="+")
+
+    def set_count(self, count: int):
+        """Изменение количества элементов с перерисовкой видимых строк"""
+        self.count = count
+        self.refresh()
+
+    def refresh(self):
+        """Перерисовка видимых строк по текущим данным"""
+        self.first_index = max(0, min(self.first_index, self.count - self.visible_rows))
+        needed = max(0, min(self.visible_rows, self.count - self.first_index))
+
+        # Пул строк растет только до количества видимых строк
+        while len(self.rows) < needed:
+            self.rows.append(self.create_row(self.body))
+            self.row_indices.append(None)
+
+        for slot, row in enumerate(self.rows):
+            if slot < needed:
+                index = self.first_index + slot
+                self.bind_row(row, index)
+                if self.row_indices[slot] is None:
+                    row.frame.pack(fill="x", pady=2, padx=10)
+                self.row_indices[slot] = index
+            elif self.row_indices[slot] is not None:
+                row.frame.pack_forget()
+                self.row_indices[slot] = None
+
+        if self.count:
+            self.scrollbar.set(self.first_index / self.count,
+                               min(1.0, (self.first_index + needed) / self.count))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+        if self.on_refresh:
+            self.on_refresh(range(self.first_index, self.first_index + needed))
+
+    def visible_range(self) -> range:
+        """Индексы элементов, показанных сейчас"""
+        return range(self.first_index, min(self.count, self.first_index + self.visible_rows))
+
+    def scroll_to(self, index: int):
+        """Прокрутка так, чтобы элемент index был первой видимой строкой"""
+        self.first_index = index
+        self.refresh()
+
+    def _on_resize(self, event):
+        # Отступы pady=2 сверху и снизу строки
+        visible = max(1, event.height // (self.row_height + 4))
+        if visible != self.visible_rows:
+            self.visible_rows = visible
+            self.refresh()
+
+    def _on_scrollbar(self, *args):
+        if not args:
+            return
+        if args[0] == "moveto":
+            self.first_index = int(float(args[1]) * self.count)
+        elif args[0] == "scroll":
+            step = int(float(args[1]))
+            if len(args) > 2 and args[2] == "pages":
+                step *= self.visible_rows
+            self.first_index += step
+        self.refresh()
+
+    def _on_mousewheel(self, event):
+        # Прокручиваем, только если курсор над строками этого списка
+        # (полоса прокрутки обрабатывает колесо сама)
+        widget, body = str(event.widget), str(self.body)
+        if widget != body and not widget.startswith(body + "."):
+            return
+        if getattr(event, "num", None) == 4:
+            step = -1
+        elif getattr(event, "num", None) == 5:
+            step = 1
+        elif event.delta:
+            # Windows: кратно 120, macOS: небольшие значения
+            step = -int(event.delta / 120) if abs(event.delta) >= 120 else (-1 if event.delta > 0 else 1)
+        else:
+            return
+        self.first_index += step * 3
+        self.refresh()